@@ -0,0 +1,273 @@
+"""
+Read-only JSON API for published projects and achievements
+List endpoints use keyset pagination (?limit=, ?cursor= from the previous
+page's next_cursor) and sparse fieldsets (?fields=id,title); by default lists
+leave out the description/content Text columns. Rows are read with plain
+column SELECTs, like and comment counts come from the same statement, and
+responses carry an ETag built from each row's id, updated_at and counts.
+
+/api/v1/projects/export streams the whole catalog as NDJSON.
+"""
+import json
+import base64
+import hashlib
+from datetime import date, datetime
+
+from flask import Response, jsonify, request, stream_with_context, url_for
+from sqlalchemy import select, func, desc, or_, and_
+
+from app import app, db
+from models import Project, Achievement, Like
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+EXPORT_BATCH = 500
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+def _project_columns():
+    return {
+        'id': Project.id,
+        'title': Project.title,
+        'description': Project.description,
+        'content': Project.content,
+        'image_url': Project.image_url,
+        'deployed_url': Project.deployed_url,
+        'github_url': Project.github_url,
+        'technologies': Project.technologies,
+        'is_featured': Project.is_featured,
+        'category_id': Project.category_id,
+        'created_at': Project.created_at,
+        'updated_at': Project.updated_at,
+        'like_count': select(func.count(Like.id)).where(Like.project_id == Project.id).scalar_subquery(),
+        'comment_count': Project.comment_count,
+    }
+
+
+def _achievement_columns():
+    return {
+        'id': Achievement.id,
+        'title': Achievement.title,
+        'description': Achievement.description,
+        'date_achieved': Achievement.date_achieved,
+        'image_url': Achievement.image_url,
+        'certificate_url': Achievement.certificate_url,
+        'organization': Achievement.organization,
+        'is_featured': Achievement.is_featured,
+        'category_id': Achievement.category_id,
+        'created_at': Achievement.created_at,
+        'updated_at': Achievement.updated_at,
+    }
+
+
+# Per-field converters; anything not listed is already JSON-serializable
+CONVERTERS = {
+    'technologies': _split,
+    'date_achieved': _isoformat,
+    'created_at': _isoformat,
+    'updated_at': _isoformat,
+}
+
+PROJECT_LIST_FIELDS = ('id', 'title', 'image_url', 'deployed_url', 'github_url', 'technologies',
+                       'is_featured', 'category_id', 'created_at', 'updated_at', 'like_count', 'comment_count')
+ACHIEVEMENT_LIST_FIELDS = ('id', 'title', 'date_achieved', 'image_url', 'certificate_url', 'organization',
+                           'is_featured', 'category_id', 'created_at', 'updated_at')
+
+# Columns the ETag and the keyset cursor are built from, fetched even when not requested
+PROJECT_ETAG_FIELDS = ('id', 'updated_at', 'like_count', 'comment_count')
+ACHIEVEMENT_ETAG_FIELDS = ('id', 'updated_at')
+
+
+def _requested_fields(available, default):
+    raw = request.args.get('fields')
+    if not raw:
+        return list(default)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise APIError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _limit():
+    # Not request.args.get(type=int): that quietly turns ?limit=abc into the default
+    raw = request.args.get('limit')
+    try:
+        limit = int(raw) if raw is not None else DEFAULT_LIMIT
+    except ValueError:
+        limit = None
+    if limit is None or not 1 <= limit <= MAX_LIMIT:
+        raise APIError(f'limit must be between 1 and {MAX_LIMIT}')
+    return limit
+
+
+def _encode_cursor(sort_value, row_id):
+    raw = json.dumps([_isoformat(sort_value), row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, parse):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return parse(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise APIError('Invalid cursor')
+
+
+def _select(columns, fields, extra):
+    """SELECT of the requested fields plus the ones needed internally"""
+    names = dict.fromkeys(list(fields) + list(extra))
+    return select(*(columns[name].label(name) for name in names))
+
+
+def _serializer(fields):
+    """Row -> dict for a fixed field list, with converters looked up once"""
+    plan = [(name, CONVERTERS.get(name)) for name in fields]
+
+    def serialize(row):
+        mapping = row._mapping
+        return {name: convert(mapping[name]) if convert else mapping[name] for name, convert in plan}
+    return serialize
+
+
+def _etag(rows, etag_fields):
+    digest = hashlib.sha1(request.full_path.encode('utf-8'))
+    for row in rows:
+        mapping = row._mapping
+        digest.update(repr(tuple(mapping[name] for name in etag_fields)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _conditional_json(payload_fn, etag, headers=None):
+    """304 when the client already has ``etag``, otherwise the JSON payload"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload_fn())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    for key, value in (headers or {}).items():
+        response.headers[key] = value
+    return response
+
+
+def _keyset_page(query, sort_column, id_column, sort_name, parse, fields, etag_fields, endpoint):
+    """Run one keyset page of ``query`` and build the conditional response"""
+    limit = _limit()
+    cursor = request.args.get('cursor')
+    if cursor:
+        sort_value, last_id = _decode_cursor(cursor, parse)
+        query = query.where(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < last_id),
+        ))
+    rows = db.session.execute(query.order_by(desc(sort_column), desc(id_column)).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    headers = {}
+    if has_more:
+        last = rows[-1]._mapping
+        next_cursor = _encode_cursor(last[sort_name], last['id'])
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        headers['Link'] = f'<{url_for(endpoint, _external=True, **args)}>; rel="next"'
+
+    serialize = _serializer(fields)
+    return _conditional_json(
+        lambda: {'data': [serialize(row) for row in rows], 'next_cursor': next_cursor},
+        _etag(rows, etag_fields),
+        headers,
+    )
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value)
+
+
+def _parse_date(value):
+    return date.fromisoformat(value)
+
+
+@app.errorhandler(APIError)
+def handle_api_error(error):
+    return jsonify({'error': error.message}), error.status
+
+
+@app.route('/api/v1/projects')
+def api_projects():
+    """Published projects, newest first"""
+    columns = _project_columns()
+    fields = _requested_fields(columns, PROJECT_LIST_FIELDS)
+    query = _select(columns, fields, PROJECT_ETAG_FIELDS + ('created_at',))
+    query = query.where(Project.is_published.is_(True))
+
+    category_id = request.args.get('category', type=int)
+    if category_id:
+        query = query.where(Project.category_id == category_id)
+
+    return _keyset_page(query, Project.created_at, Project.id, 'created_at', _parse_datetime,
+                        fields, PROJECT_ETAG_FIELDS, 'api_projects')
+
+
+@app.route('/api/v1/projects/<int:id>')
+def api_project(id):
+    """One published project, all fields unless ?fields= is given"""
+    columns = _project_columns()
+    fields = _requested_fields(columns, columns.keys())
+    query = _select(columns, fields, PROJECT_ETAG_FIELDS)
+    row = db.session.execute(query.where(Project.id == id, Project.is_published.is_(True))).first()
+    if row is None:
+        raise APIError('Project not found', 404)
+
+    serialize = _serializer(fields)
+    return _conditional_json(lambda: serialize(row), _etag([row], PROJECT_ETAG_FIELDS))
+
+
+@app.route('/api/v1/projects/export')
+def api_projects_export():
+    """Every published project as NDJSON, streamed in batches"""
+    columns = _project_columns()
+    fields = _requested_fields(columns, columns.keys())
+    query = _select(columns, fields, ())
+    query = query.where(Project.is_published.is_(True)).order_by(Project.id)
+    serialize = _serializer(fields)
+
+    def generate():
+        result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH))
+        for batch in result.partitions():
+            yield ''.join(json.dumps(serialize(row), separators=(',', ':')) + '\n' for row in batch)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/v1/achievements')
+def api_achievements():
+    """Published achievements, most recent first"""
+    columns = _achievement_columns()
+    fields = _requested_fields(columns, ACHIEVEMENT_LIST_FIELDS)
+    query = _select(columns, fields, ACHIEVEMENT_ETAG_FIELDS + ('date_achieved',))
+    query = query.where(Achievement.is_published.is_(True))
+
+    category_id = request.args.get('category', type=int)
+    if category_id:
+        query = query.where(Achievement.category_id == category_id)
+
+    return _keyset_page(query, Achievement.date_achieved, Achievement.id, 'date_achieved', _parse_date,
+                        fields, ACHIEVEMENT_ETAG_FIELDS, 'api_achievements')
@@ -2,6 +2,7 @@ import os
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -16,10 +17,15 @@ db = SQLAlchemy(model_class=Base)
 # Create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "portfolio-secret-key-2024-very-secure-local-development")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+# X-Forwarded-For is only believed for TRUSTED_PROXIES hops (0 by default):
+# with no proxy in front, a client could pick its own address and dodge the
+# per-IP rate limits. Set it to the number of proxies that append to the
+# header (1 behind the Replit deployment proxy).
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=1, x_host=1)
 
-# Configure SQLite database (local file)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///portfolio.db"
+# Configure SQLite database (local file); benchmarks point this at a scratch database
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("SQLALCHEMY_DATABASE_URI", "sqlite:///portfolio.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # File upload configuration
@@ -29,6 +35,14 @@ app.config['UPLOAD_FOLDER'] = 'static/uploads'
 # Initialize the app with the extension
 db.init_app(app)
 
+# Opt-in SQL/template timing (SQL_INSTRUMENTATION=1) with Server-Timing headers
+from instrumentation import init_instrumentation
+init_instrumentation(app)
+
+# Prometheus metrics at /metrics (METRICS_ENABLED=0 to turn off)
+from metrics import init_metrics
+init_metrics(app)
+
 # Create upload directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -51,17 +65,32 @@ with app.app_context():
     import models  # noqa: F401
     db.create_all()
     
+    # Bring databases created by older versions up to the current schema
+    from schema import upgrade_schema
+    upgrade_schema()
+    
+    # Version counter that feeds and cached aggregates are rebuilt from
+    from content_version import ensure_content_version
+    ensure_content_version(db)
+    
     # Create admin user if it doesn't exist
     admin_user = models.User.query.filter_by(email='adm@adm.com').first()
     if not admin_user:
+        # Hashing waits for a host-wide slot instead of failing the worker's start-up
         admin_user = models.User.create_local_user(
             email='adm@adm.com',
             password='adm123',
-            is_admin=True
+            is_admin=True,
+            wait=True
         )
         db.session.add(admin_user)
-        db.session.commit()
-        logging.info("Admin user created: adm@adm.com")
+        try:
+            db.session.commit()
+            logging.info("Admin user created: adm@adm.com")
+        except IntegrityError:
+            # Another worker starting on the same fresh database got there first
+            db.session.rollback()
+            logging.info("Admin user already exists")
     else:
         logging.info("Admin user already exists")
     
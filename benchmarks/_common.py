@@ -0,0 +1,73 @@
+"""
+Shared helpers for the benchmark scripts
+The app reads its configuration at import time, so call scratch_environment()
+before importing app, models or github_sync.
+"""
+import os
+import sys
+import json
+import logging
+import tempfile
+
+from sqlalchemy import event
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def scratch_environment(workdir=None, **extra_env):
+    """Point the app at a throwaway database and caches under ``workdir``"""
+    workdir = workdir or tempfile.mkdtemp(prefix='portfolio-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['GITHUB_CACHE_DIR'] = os.path.join(workdir, 'github_cache')
+    os.environ['GITHUB_TOKEN_CACHE_PATH'] = os.path.join(workdir, 'github_token.json')
+    os.environ['PASSWORD_HASH_SLOT_DIR'] = os.path.join(workdir, 'password-hash-slots')
+    os.environ['METRICS_DIR'] = os.path.join(workdir, 'metrics')
+    os.environ['FEEDS_DIR'] = os.path.join(workdir, 'feeds')
+    # Never talk to the real connector from a benchmark
+    for name in ('REPL_IDENTITY', 'WEB_REPL_RENEWAL', 'REPLIT_CONNECTORS_HOSTNAME', 'GITHUB_SYNC_INTERVAL'):
+        os.environ.pop(name, None)
+    os.environ.update({key: str(value) for key, value in extra_env.items()})
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return workdir
+
+
+def quiet_logging(verbose=False):
+    logging.disable(logging.NOTSET if verbose else logging.WARNING)
+
+
+class StatementCounter:
+    """Counts SQL statements executed on an engine (an executemany counts once)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def reset(self):
+        self.count = 0
+        self.statements = []
+
+    def close(self):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def write_json(path, payload):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, default=str)
+    print(f'Results written to {path}')
+
+
+def print_table(rows, columns):
+    widths = {col: max(len(col), *(len(str(row.get(col, ''))) for row in rows)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    print('  '.join('-' * widths[col] for col in columns))
+    for row in rows:
+        print('  '.join(str(row.get(col, '')).ljust(widths[col]) for col in columns))
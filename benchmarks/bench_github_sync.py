@@ -0,0 +1,89 @@
+"""
+Benchmark sync_github_projects() against the local fake GitHub API
+For each size it runs a cold sync (empty database and cache), a warm sync
+(nothing changed) and a sync after 10% of the repos were pushed to, and
+reports wall time, HTTP calls and SQL statements.
+
+    python benchmarks/bench_github_sync.py --sizes 10 100 1000 --json sync.json
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import scratch_environment, quiet_logging, StatementCounter, write_json, print_table  # noqa: E402
+from fake_github import FakeGitHub  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every fake API response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of fake API responses that are 502')
+    parser.add_argument('--workdir', help='keep the scratch database and cache here')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    fake = FakeGitHub(owner='bench-user', latency=args.latency, error_rate=args.error_rate).serve()
+    workdir = scratch_environment(
+        args.workdir,
+        GITHUB_API_URL=fake.base_url,
+        GITHUB_USERNAMES=fake.owner,
+        GITHUB_HTTP_BACKOFF_BASE=0.01,
+    )
+    quiet_logging(args.verbose)
+
+    from app import app, db
+    import github_sync
+    from github_http import response_cache
+
+    results = []
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+
+        for size in args.sizes:
+            db.drop_all()
+            db.create_all()
+            shutil.rmtree(response_cache.directory, ignore_errors=True)
+            response_cache._total_bytes = None
+            fake.set_repos(size)
+
+            for scenario in ('cold', 'warm', 'touched-10%'):
+                if scenario == 'touched-10%':
+                    fake.touch(max(size // 10, 1))
+                fake.reset_counters()
+                counter.reset()
+                db.session.expire_all()
+
+                started = time.perf_counter()
+                result = github_sync.sync_github_projects([fake.owner])
+                elapsed = time.perf_counter() - started
+
+                results.append({
+                    'repos': size,
+                    'scenario': scenario,
+                    'wall_s': round(elapsed, 3),
+                    'http_calls': fake.total_calls,
+                    'repo_pages': fake.calls['repos'],
+                    'language_calls': fake.calls['languages'],
+                    'db_statements': counter.count,
+                    'inserted': result.get('synced', 0),
+                    'updated': result.get('updated', 0),
+                    'success': result['success'],
+                })
+
+        counter.close()
+
+    fake.shutdown()
+    print_table(results, ['repos', 'scenario', 'wall_s', 'http_calls', 'repo_pages', 'language_calls',
+                          'db_statements', 'inserted', 'updated', 'success'])
+    if args.json:
+        write_json(args.json, {'benchmark': 'github_sync', 'workdir': workdir, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Password hashing throughput
+Measures how many password checks (logins) per second each hash method
+allows, on one thread and on the passwords.HashPool with --threads worker
+threads and --slots host-wide slots, and how a burst larger than the slots
+is turned away with HashingBusy instead of queueing.
+
+    python benchmarks/bench_password_hash.py
+    python benchmarks/bench_password_hash.py --methods scrypt:32768:8:1,pbkdf2:sha256:600000 --seconds 5
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import scratch_environment, quiet_logging, print_table  # noqa: E402
+
+DEFAULT_METHODS = 'scrypt:32768:8:1,scrypt:16384:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:1000000'
+
+
+def checks_per_second(check, threads, seconds):
+    """Run ``check`` on ``threads`` threads for ``seconds``; returns checks/s"""
+    done = []
+    deadline = time.perf_counter() + seconds
+
+    def loop():
+        count = 0
+        while time.perf_counter() < deadline:
+            check()
+            count += 1
+        done.append(count)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(done) / (time.perf_counter() - started)
+
+
+def burst(pool, check, size):
+    """Fire ``size`` concurrent checks at ``pool``; returns (accepted, rejected)"""
+    from passwords import HashingBusy
+
+    results = []
+    gate = threading.Barrier(size)
+
+    def one():
+        gate.wait()
+        try:
+            pool.run(check)
+            results.append(True)
+        except HashingBusy:
+            results.append(False)
+
+    threads = [threading.Thread(target=one) for _ in range(size)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.count(True), results.count(False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', default=DEFAULT_METHODS, help='comma-separated werkzeug hash methods')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1, help='pool worker threads')
+    parser.add_argument('--slots', type=int, default=os.cpu_count() or 1, help='hashes in flight before HashingBusy')
+    parser.add_argument('--seconds', type=float, default=3.0, help='measuring time per method')
+    args = parser.parse_args()
+
+    workdir = scratch_environment(METRICS_ENABLED='0')
+    quiet_logging()
+
+    from werkzeug.security import generate_password_hash, check_password_hash
+    from passwords import HashPool, HostSlots
+
+    cores = os.cpu_count() or 1
+    rows = []
+    for method in args.methods.split(','):
+        stored = generate_password_hash('benchmark-password', method)
+
+        def check():
+            return check_password_hash(stored, 'benchmark-password')
+
+        pool = HashPool(workers=args.threads, slots=HostSlots(os.path.join(workdir, 'slots'), args.slots))
+        # Request threads hand checks to the pool, as concurrent logins would
+        single = checks_per_second(check, 1, args.seconds)
+        pooled = checks_per_second(lambda: pool.run(check, wait=True), args.slots, args.seconds)
+        accepted, rejected = burst(pool, check, 4 * args.slots)
+        rows.append({
+            'method': method,
+            'ms/check': f'{1000 / single:.1f}',
+            'logins/s 1 thread': f'{single:.1f}',
+            f'logins/s pool({args.threads})': f'{pooled:.1f}',
+            'logins/s/core': f'{pooled / min(cores, args.threads, args.slots):.1f}',
+            'burst accepted': accepted,
+            'burst rejected': rejected,
+        })
+
+    print(f'{cores} core(s), pool of {args.threads} thread(s), {args.slots} slot(s)\n')
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Load benchmark for the public routes
+Seeds a scratch SQLite database (or reuses one), then drives index, projects,
+project_detail, achievements and about either in-process through the Flask
+test client or over HTTP against a local gunicorn. Reports p50/p95/p99
+latency, requests/s and, in-process, SQL statements per request.
+
+    python benchmarks/bench_routes.py --workdir /tmp/bench --seed-scale small
+    python benchmarks/bench_routes.py --workdir /tmp/bench --reuse --mode gunicorn --json routes.json
+"""
+import os
+import sys
+import time
+import random
+import socket
+import argparse
+import threading
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import REPO_ROOT, scratch_environment, quiet_logging, StatementCounter, write_json, print_table  # noqa: E402
+
+SCALES = {
+    'tiny': dict(users=100, categories=5, projects=100, achievements=20, comments=1_000, likes=5_000),
+    'small': dict(users=1_000, categories=8, projects=1_000, achievements=200, comments=20_000, likes=100_000),
+    'large': dict(users=10_000, categories=12, projects=10_000, achievements=2_000, comments=200_000, likes=1_000_000),
+}
+
+ROUTES = ['index', 'projects', 'project_detail', 'achievements', 'about']
+
+
+def route_url(route, rng, project_ids):
+    if route == 'index':
+        return '/'
+    if route == 'project_detail':
+        return f'/project/{rng.choice(project_ids)}'
+    return f'/{route}'
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(route, latencies, wall, statements, errors):
+    return {
+        'route': route,
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'req_per_s': round(len(latencies) / wall, 1) if wall else None,
+        'sql_per_req': round(statistics.mean(statements), 1) if statements else None,
+    }
+
+
+def run_in_process(app, db, requests_per_route, project_ids, rng):
+    client = app.test_client()
+    counter = StatementCounter(db.engine)
+    results = []
+
+    for route in ROUTES:
+        client.get(route_url(route, rng, project_ids))  # warm up templates and caches
+        latencies, statements, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(requests_per_route):
+            url = route_url(route, rng, project_ids)
+            counter.reset()
+            t0 = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - t0)
+            statements.append(counter.count)
+            errors += response.status_code >= 400
+        results.append(summarize(route, latencies, time.perf_counter() - started, statements, errors))
+
+    counter.close()
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_gunicorn(requests_per_route, project_ids, rng, workers, concurrency):
+    import requests
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'main:app'],
+        cwd=REPO_ROOT,
+        env=os.environ.copy(),
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base_url + '/about', timeout=5)
+                break
+            except (requests.ConnectionError, requests.Timeout):
+                time.sleep(0.2)
+        else:
+            raise RuntimeError('gunicorn did not start')
+
+        results = []
+        for route in ROUTES:
+            urls = [route_url(route, rng, project_ids) for _ in range(requests_per_route)]
+            local = threading.local()
+
+            def fetch(url):
+                # One keep-alive session per client thread
+                session = getattr(local, 'session', None)
+                if session is None:
+                    session = local.session = requests.Session()
+                t0 = time.perf_counter()
+                response = session.get(base_url + url, timeout=60)
+                return time.perf_counter() - t0, response.status_code
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(fetch, urls))
+            wall = time.perf_counter() - started
+            latencies = [elapsed for elapsed, _ in outcomes]
+            errors = sum(status >= 400 for _, status in outcomes)
+            results.append(summarize(route, latencies, wall, [], errors))
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workdir', required=True, help='directory holding the scratch database')
+    parser.add_argument('--seed-scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--reuse', action='store_true', help='reuse the database already in --workdir')
+    parser.add_argument('--mode', choices=['inprocess', 'gunicorn', 'both'], default='inprocess')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads against gunicorn')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    scratch_environment(args.workdir)
+    quiet_logging()
+
+    from app import app, db
+    import routes  # noqa: F401
+    from models import Project
+    from seed_data import seed
+
+    rng = random.Random(0)
+    with app.app_context():
+        if not args.reuse:
+            db.drop_all()
+            db.create_all()
+            print(f'Seeding {args.seed_scale} dataset...')
+            seed(db, **SCALES[args.seed_scale])
+        project_ids = [row.id for row in db.session.query(Project.id).filter_by(is_published=True)]
+
+    results = {}
+    if args.mode in ('inprocess', 'both'):
+        with app.app_context():
+            results['inprocess'] = run_in_process(app, db, args.requests, project_ids, rng)
+    if args.mode in ('gunicorn', 'both'):
+        results['gunicorn'] = run_gunicorn(args.requests, project_ids, rng, args.workers, args.concurrency)
+
+    columns = ['route', 'requests', 'errors', 'p50_ms', 'p95_ms', 'p99_ms', 'req_per_s', 'sql_per_req']
+    for mode, rows in results.items():
+        print(f'\n{mode}')
+        print_table(rows, columns)
+
+    if args.json:
+        write_json(args.json, {
+            'benchmark': 'routes',
+            'revision': git_revision(),
+            'scale': 'reused' if args.reuse else SCALES[args.seed_scale],
+            'requests_per_route': args.requests,
+            'results': results,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Local stand-in for the parts of the GitHub REST API used by github_sync
+Serves /users/{user}/repos with Link pagination and /repos/{owner}/{repo}/languages,
+with ETag revalidation, X-RateLimit-* headers, configurable latency and 5xx
+injection. Every request is counted so benchmarks can report HTTP calls.
+
+Standalone: python benchmarks/fake_github.py --repos 100 --port 8765
+then run the app with GITHUB_API_URL=http://127.0.0.1:8765
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+LANGUAGES = ['Python', 'JavaScript', 'HTML', 'CSS', 'TypeScript', 'Go', 'Rust', 'Java', 'Shell', 'C']
+TOPICS = ['flask', 'portfolio', 'api', 'cli', 'web', 'data', 'automation', 'game']
+
+
+def make_repo(owner, index, generation=0):
+    """Deterministic fake repository payload"""
+    rng = random.Random(f'{owner}/{index}')
+    name = f'repo-{index:05d}'
+    stamp = f'2025-01-01T00:00:{generation:02d}Z'
+    return {
+        'id': 1_000_000 + index,
+        'name': name,
+        'full_name': f'{owner}/{name}',
+        'html_url': f'https://github.com/{owner}/{name}',
+        'owner': {'login': owner},
+        'description': f'Fake repository number {index}',
+        'homepage': f'https://{name}.example.com' if index % 3 == 0 else '',
+        'language': rng.choice(LANGUAGES),
+        'topics': rng.sample(TOPICS, rng.randint(0, 3)),
+        'stargazers_count': rng.randint(0, 5),
+        'fork': index % 17 == 0,
+        'private': False,
+        'pushed_at': stamp,
+        'updated_at': stamp,
+    }
+
+
+def make_languages(owner, name):
+    rng = random.Random(f'{owner}/{name}/languages')
+    return {language: rng.randint(100, 100_000) for language in rng.sample(LANGUAGES, rng.randint(1, 4))}
+
+
+class FakeGitHub:
+    """Fake GitHub API state; ``serve()`` starts it on a background thread"""
+
+    def __init__(self, repo_count=10, owner='bench-user', per_page_max=100, latency=0.0,
+                 error_rate=0.0, rate_limit=5000, seed=0, error_endpoints=None):
+        self.owner = owner
+        self.per_page_max = per_page_max
+        self.latency = latency
+        self.error_rate = error_rate
+        # 'repos' and/or 'languages'; None injects errors on every endpoint
+        self.error_endpoints = error_endpoints
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset_at = int(time.time()) + 3600
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.set_repos(repo_count)
+        self.server = None
+
+    def set_repos(self, count, generation=0):
+        self.repos = [make_repo(self.owner, i, generation) for i in range(count)]
+        self.repos_by_name = {repo['name']: repo for repo in self.repos}
+
+    def touch(self, count):
+        """Bump pushed_at on the first ``count`` repos, as if they were pushed to"""
+        for repo in self.repos[:count]:
+            repo['pushed_at'] = repo['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+
+    def handle(self, path, query, if_none_match):
+        """Return (status, headers, body) for a GET request"""
+        parts = [part for part in path.split('/') if part]
+        endpoint = self._endpoint(parts)
+        with self._lock:
+            self.calls[endpoint] += 1
+            inject_error = (self.error_rate and self._random.random() < self.error_rate
+                            and (self.error_endpoints is None or endpoint in self.error_endpoints))
+
+        if self.latency:
+            time.sleep(self.latency)
+        if inject_error:
+            return 502, {}, b'{"message": "Server Error"}'
+
+        if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'repos':
+            status, headers, payload = self._repos_page(parts[1], path, query)
+        elif len(parts) == 4 and parts[0] == 'repos' and parts[3] == 'languages':
+            repo = self.repos_by_name.get(parts[2])
+            if repo is None:
+                status, headers, payload = 404, {}, {'message': 'Not Found'}
+            else:
+                status, headers, payload = 200, {}, make_languages(parts[1], parts[2])
+        else:
+            status, headers, payload = 404, {}, {'message': 'Not Found'}
+
+        body = json.dumps(payload).encode('utf-8')
+        if status == 200:
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            headers['ETag'] = etag
+            if if_none_match == etag:
+                # Like GitHub, revalidations don't spend rate limit budget
+                return 304, self._rate_headers(spend=False, extra=headers), b''
+        return status, self._rate_headers(spend=True, extra=headers), body
+
+    def _endpoint(self, parts):
+        if len(parts) == 3 and parts[0] == 'users':
+            return 'repos'
+        if len(parts) == 4 and parts[0] == 'repos':
+            return 'languages'
+        return 'other'
+
+    def _repos_page(self, username, path, query):
+        if username != self.owner:
+            return 200, {}, []
+        per_page = min(int(query.get('per_page', ['30'])[0]), self.per_page_max)
+        page = int(query.get('page', ['1'])[0])
+        start = (page - 1) * per_page
+        items = self.repos[start:start + per_page]
+
+        headers = {}
+        if start + per_page < len(self.repos):
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query['page'] = page + 1
+            headers['Link'] = f'<{self.base_url}{path}?{urlencode(next_query)}>; rel="next"'
+        return 200, headers, items
+
+    def _rate_headers(self, spend, extra):
+        with self._lock:
+            if spend:
+                self.remaining = max(self.remaining - 1, 0)
+            headers = dict(extra)
+            headers['X-RateLimit-Limit'] = str(self.rate_limit)
+            headers['X-RateLimit-Remaining'] = str(self.remaining)
+            headers['X-RateLimit-Reset'] = str(self.reset_at)
+        return headers
+
+    def serve(self, host='127.0.0.1', port=0):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body in one write; otherwise Nagle plus delayed
+            # ACKs add ~40ms to every keep-alive response
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                status, headers, body = fake.handle(
+                    parsed.path, parse_qs(parsed.query), self.headers.get('If-None-Match')
+                )
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repos', type=int, default=100)
+    parser.add_argument('--owner', default='bench-user')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 502')
+    args = parser.parse_args()
+
+    fake = FakeGitHub(args.repos, owner=args.owner, latency=args.latency, error_rate=args.error_rate)
+    fake.serve(port=args.port)
+    print(f'Fake GitHub API for {args.owner} ({args.repos} repos) on {fake.base_url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.shutdown()
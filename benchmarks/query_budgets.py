@@ -0,0 +1,170 @@
+"""
+SQL statement budgets for the routes in routes.py, api.py and suggest.py
+Seeds a scratch database at N rows and again at FACTOR * N rows, requests
+every page through the Flask test client and counts the SQL statements each
+one runs. Exits non-zero if a page goes over its budget or runs more
+statements on the bigger dataset, i.e. if an N+1 (a lazy='dynamic' count or
+relationship loaded per row in a template) has crept back in.
+
+    python benchmarks/query_budgets.py --workdir /tmp/budgets
+    python benchmarks/query_budgets.py --workdir /tmp/budgets --factor 20 --verbose
+
+tests/test_query_budgets.py enforces the same BUDGETS table under pytest;
+this script prints the whole table at once, with --verbose statements.
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import scratch_environment, quiet_logging, StatementCounter, print_table  # noqa: E402
+
+BASE_SCALE = dict(users=50, categories=5, projects=60, achievements=20, comments=600, likes=1_500)
+
+ADMIN_EMAIL = 'budget-admin@bench.local'
+USER_EMAIL = 'user0@bench.local'  # created by seed_data
+
+# (url, client, budget); {project} is the published project with most comments.
+# Logged-in pages pay one extra statement for Flask-Login's user loader.
+BUDGETS = [
+    ('/', 'anonymous', 3),
+    ('/', 'user', 5),
+    ('/projects', 'anonymous', 3),
+    ('/projects', 'user', 4),
+    ('/projects/liked?ids=1,2,3,4,5,6,7,8,9,10', 'user', 2),
+    ('/projects?category=1', 'anonymous', 3),
+    ('/projects?search=lorem', 'anonymous', 3),
+    ('/projects?tech=python', 'anonymous', 3),
+    ('/project/{project}', 'anonymous', 5),
+    ('/project/{project}', 'user', 6),
+    ('/project/{project}/comments', 'anonymous', 2),
+    ('/project/{project}/comments?format=json', 'anonymous', 2),
+    ('/project/{project}/share', 'user', 2),
+    ('/achievements', 'anonymous', 2),
+    ('/about', 'anonymous', 2),
+    ('/login', 'anonymous', 0),
+    ('/register', 'anonymous', 0),
+    ('/admin', 'admin', 5),
+    ('/admin/projects', 'admin', 3),
+    ('/admin/projects/new', 'admin', 2),
+    ('/admin/projects/{project}/edit', 'admin', 3),
+    ('/admin/achievements', 'admin', 2),
+    ('/admin/achievements/new', 'admin', 2),
+    ('/admin/achievements/1/edit', 'admin', 3),
+    ('/admin/categories', 'admin', 4),
+    ('/admin/about', 'admin', 2),
+    ('/admin/education', 'admin', 2),
+    ('/admin/education/new', 'admin', 1),
+    ('/admin/slow-queries', 'admin', 1),
+    ('/api/v1/projects', 'anonymous', 1),
+    ('/api/v1/projects?fields=id,title,description&limit=100', 'anonymous', 1),
+    ('/api/v1/projects/{project}', 'anonymous', 1),
+    ('/api/v1/achievements', 'anonymous', 1),
+    ('/search/suggest?q=py', 'anonymous', 0),
+]
+
+
+def prepare(app, db, scale):
+    from sqlalchemy import func
+    from models import User, Project, Comment
+    from seed_data import seed
+
+    db.drop_all()
+    db.create_all()
+    seed(db, **scale, verbose=False)
+    admin = User.create_local_user(email=ADMIN_EMAIL, password='benchmark', is_admin=True, wait=True)
+    db.session.add(admin)
+    db.session.commit()
+
+    project_id = db.session.query(Comment.project_id).join(Project).filter(Project.is_published.is_(True)) \
+        .group_by(Comment.project_id).order_by(func.count(Comment.id).desc()).limit(1).scalar()
+    user_ids = {'user': User.query.filter_by(email=USER_EMAIL).one().id, 'admin': admin.id}
+    return project_id, user_ids
+
+
+def clients(app, user_ids):
+    result = {'anonymous': app.test_client()}
+    for name, user_id in user_ids.items():
+        client = app.test_client()
+        # Log in through the session: the login form's email validator
+        # rejects the .local addresses used by the seeded users
+        with client.session_transaction() as session:
+            session['_user_id'] = user_id
+            session['_fresh'] = True
+        result[name] = client
+    return result
+
+
+def measure(app, engine, project_id, user_ids, verbose=False):
+    """Statements per page; runs outside an app context so that every request
+    gets a fresh session, as it would in production"""
+    counter = StatementCounter(engine)
+    counts = {}
+    try:
+        by_name = clients(app, user_ids)
+        for url, who, _ in BUDGETS:
+            client = by_name[who]
+            path = url.format(project=project_id)
+            client.get(path)  # warm up: first render of a template may query
+            counter.reset()
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} as {who} returned {response.status_code}')
+            counts[(url, who)] = counter.count
+            if verbose:
+                print(f'\n{who} {path}: {counter.count} statements')
+                for statement in counter.statements:
+                    print('   ', ' '.join(statement.split())[:160])
+    finally:
+        counter.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workdir', required=True, help='directory for the scratch database')
+    parser.add_argument('--factor', type=int, default=10, help='size of the second dataset relative to the first')
+    parser.add_argument('--verbose', action='store_true', help='print the statements each page runs')
+    args = parser.parse_args()
+
+    scratch_environment(args.workdir, METRICS_ENABLED='0')
+    quiet_logging()
+
+    from app import app, db
+    import routes  # noqa: F401
+    import api  # noqa: F401
+    import suggest  # noqa: F401
+
+    big_scale = {name: value * args.factor for name, value in BASE_SCALE.items()}
+    big_scale['categories'] = BASE_SCALE['categories']
+
+    results = []
+    for label, scale in (('n', BASE_SCALE), (f'{args.factor}n', big_scale)):
+        with app.app_context():
+            project_id, user_ids = prepare(app, db, scale)
+            engine = db.engine
+        results.append(measure(app, engine, project_id, user_ids, verbose=args.verbose and label == 'n'))
+
+    small, big = results
+    rows, failures = [], []
+    for url, who, budget in BUDGETS:
+        key = (url, who)
+        problems = []
+        if big[key] > small[key]:
+            problems.append('grows with data')
+        if max(small[key], big[key]) > budget:
+            problems.append('over budget')
+        rows.append({'route': url, 'client': who, 'budget': budget, 'n': small[key],
+                     f'{args.factor}n': big[key], 'status': ', '.join(problems) or 'ok'})
+        if problems:
+            failures.append(key)
+
+    print_table(rows, ['route', 'client', 'budget', 'n', f'{args.factor}n', 'status'])
+    if failures:
+        print(f'\n{len(failures)} route(s) failed their query budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Synthetic data generator for benchmarks
+Fills a scratch database with users, categories, projects, achievements,
+comments and likes using executemany batches.
+
+    python benchmarks/seed_data.py --workdir /tmp/bench --projects 10000 \\
+        --likes 1000000 --comments 200000 --users 10000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import scratch_environment, quiet_logging  # noqa: E402
+
+BATCH_SIZE = 20_000
+
+TECHNOLOGIES = ['Python', 'Flask', 'JavaScript', 'TypeScript', 'React', 'Vue', 'SQL', 'SQLite',
+                'PostgreSQL', 'Docker', 'Go', 'Rust', 'Java', 'C#', 'HTML', 'CSS', 'Bootstrap', 'Redis']
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut '
+         'labore et dolore magna aliqua portfolio project terminal hacker matrix api web').split()
+
+DEFAULT_SCALE = {
+    'users': 10_000,
+    'categories': 12,
+    'projects': 10_000,
+    'achievements': 2_000,
+    'comments': 200_000,
+    'likes': 1_000_000,
+}
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _insert(db, table, rows):
+    """Insert an iterable of dicts in executemany batches"""
+    from sqlalchemy import insert
+
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+        total += len(batch)
+    db.session.commit()
+    return total
+
+
+def seed(db, users, categories, projects, achievements, comments, likes, seed=0, verbose=True):
+    """Generate the given number of rows per table into an empty database"""
+    from sqlalchemy import text
+    from werkzeug.security import generate_password_hash
+    from models import User, Category, Project, Achievement, Comment, Like
+    from related import rebuild_related
+
+    if likes > users * projects:
+        raise ValueError('likes cannot exceed users * projects (one like per user and project)')
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    # Hash once; hashing per user would dominate seeding time
+    password_hash = generate_password_hash('benchmark')
+
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text('PRAGMA synchronous = OFF'))
+
+    def step(name, table, rows):
+        started = time.perf_counter()
+        count = _insert(db, table.__table__, rows)
+        if verbose:
+            print(f'  {name:<13} {count:>9} rows in {time.perf_counter() - started:6.2f}s')
+
+    step('users', User, ({
+        'id': f'bench-user-{i}',
+        'email': f'user{i}@bench.local',
+        'password_hash': password_hash,
+        'first_name': f'User{i}',
+        'auth_type': 'local',
+        'is_admin': False,
+        'created_at': now,
+        'updated_at': now,
+    } for i in range(users)))
+
+    step('categories', Category, ({
+        'id': i + 1,
+        'name': f'Category {i + 1}',
+        'color': f'#{rng.randrange(0x1000000):06x}',
+        'created_at': now,
+    } for i in range(categories)))
+
+    def project_rows():
+        for i in range(projects):
+            created = now - timedelta(minutes=i)
+            yield {
+                'id': i + 1,
+                'title': f'Project {i + 1} {_text(rng, 2)}',
+                'description': _text(rng, 40),
+                'content': _text(rng, 300),
+                'github_url': f'https://github.com/bench-user/project-{i + 1}',
+                'technologies': ', '.join(rng.sample(TECHNOLOGIES, rng.randint(1, 6))),
+                'is_published': rng.random() < 0.9,
+                'is_featured': rng.random() < 0.05,
+                'category_id': rng.randint(1, categories) if categories and rng.random() < 0.8 else None,
+                'created_at': created,
+                'updated_at': created,
+            }
+    step('projects', Project, project_rows())
+
+    step('achievements', Achievement, ({
+        'id': i + 1,
+        'title': f'Achievement {i + 1}',
+        'description': _text(rng, 30),
+        'date_achieved': date.today() - timedelta(days=i),
+        'organization': _text(rng, 2),
+        'is_published': rng.random() < 0.9,
+        'is_featured': rng.random() < 0.05,
+        'category_id': rng.randint(1, categories) if categories and rng.random() < 0.5 else None,
+        'created_at': now,
+        'updated_at': now,
+    } for i in range(achievements)))
+
+    step('comments', Comment, ({
+        'content': _text(rng, rng.randint(5, 60)),
+        'user_id': f'bench-user-{rng.randrange(users)}',
+        # Skew towards the first projects so some pages get very long threads
+        'project_id': min(int(rng.paretovariate(1.2)), projects),
+        'is_approved': True,
+        'created_at': now - timedelta(seconds=i),
+    } for i in range(comments)))
+
+    # Like k goes to user k % users and the (k // users)-th project in that
+    # user's rotated order, so (user, project) pairs never repeat
+    step('likes', Like, ({
+        'user_id': f'bench-user-{k % users}',
+        'project_id': (k // users + (k % users) * 31) % projects + 1,
+        'created_at': now,
+    } for k in range(likes)))
+
+    # Core inserts bypass what normally maintains these: the comment counter
+    # listeners, the technology links and related-project lists written by
+    # the admin forms and sync
+    started = time.perf_counter()
+    Project.recount_comments()
+    Project.sync_technologies()
+    rebuild_related()
+    db.session.commit()
+    if verbose:
+        print(f'  {"derived":<13} {"":>9}      in {time.perf_counter() - started:6.2f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workdir', required=True, help='directory for the scratch database')
+    for name, default in DEFAULT_SCALE.items():
+        parser.add_argument(f'--{name}', type=int, default=default)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    scratch_environment(args.workdir)
+    quiet_logging()
+
+    from app import app, db
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        print(f"Seeding {os.environ['SQLALCHEMY_DATABASE_URI']}")
+        seed(db, **{name: getattr(args, name) for name in DEFAULT_SCALE}, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
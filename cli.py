@@ -0,0 +1,54 @@
+"""
+Flask CLI commands
+Run with FLASK_APP=main, e.g. flask sync-github --full
+"""
+import click
+
+from app import app
+
+
+@app.cli.command('sync-github')
+@click.option('--full', is_flag=True, help='Refresh every repository, not only the ones that changed.')
+def sync_github_command(full):
+    """Sync GitHub repositories into projects in the foreground"""
+    from app import db
+    from sync_jobs import enqueue_sync_job, run_job
+    
+    job, created = enqueue_sync_job(full=full, spawn=False)
+    if not created:
+        raise click.ClickException(f'Sync job {job.id} is already {job.status}')
+    
+    run_job(job.id)
+    
+    db.session.refresh(job)
+    click.echo(f'Sync job {job.id} {job.status}: {job.message}')
+    if job.status != 'succeeded':
+        raise SystemExit(1)
+
+
+@app.cli.command('export-static')
+@click.option('--output', default=None, help='Target directory (default: instance/static_site).')
+@click.option('--workers', type=int, default=None, help='Render processes (default: one per CPU).')
+@click.option('--full', is_flag=True, help='Render every page, not only the ones whose content changed.')
+def export_static_command(output, workers, full):
+    """Render the public pages in every language to static HTML"""
+    import os
+    from static_export import export_static
+    
+    output = output or os.path.join(app.instance_path, 'static_site')
+    result = export_static(output, workers=workers, full=full)
+    click.echo(f"Exported to {output}: {result['rendered']} of {result['pages']} page(s) rendered, "
+               f"{result['removed']} removed, {result['static_files_copied']} static file(s) copied")
+    if result['failed']:
+        raise click.ClickException(f"{result['failed']} page(s) failed to render")
+
+
+@app.cli.command('rebuild-related')
+def rebuild_related_command():
+    """Recompute every project's related-projects list"""
+    from app import db
+    from related import rebuild_related
+    
+    rebuild_related()
+    db.session.commit()
+    click.echo('Related projects rebuilt')
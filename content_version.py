@@ -0,0 +1,98 @@
+"""
+Content version counter
+A single row in content_versions is incremented in the same transaction as
+any write to public content (projects, achievements, categories and project
+technologies), whether it goes through the unit of work or an ORM bulk
+insert/update such as the ones in github_sync. Anything derived from that
+content (feeds, the static export, cached aggregates) stores the version it
+was built from and rebuilds when current_version() moves on.
+"""
+import time
+import logging
+from datetime import datetime
+
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CONTENT = 'content'
+
+# Tables whose changes invalidate derived content
+TRACKED_TABLES = {'projects', 'achievements', 'categories', 'technologies', 'project_technologies'}
+
+_cached = {'version': None, 'checked': 0.0}
+
+
+def _table_name(obj):
+    table = getattr(obj, '__table__', None)
+    return table.name if table is not None else None
+
+
+def _bump(connection):
+    from models import ContentVersion
+
+    connection.execute(
+        update(ContentVersion.__table__)
+        .where(ContentVersion.__table__.c.name == CONTENT)
+        .values(version=ContentVersion.__table__.c.version + 1, changed_at=datetime.now())
+    )
+
+
+def _before_flush(session, flush_context, instances):
+    changed = [*session.new, *session.deleted, *(obj for obj in session.dirty if session.is_modified(obj))]
+    if any(_table_name(obj) in TRACKED_TABLES for obj in changed):
+        session.info['content_changed'] = True
+
+
+def _after_flush(session, flush_context):
+    if session.info.pop('content_changed', False):
+        _bump(session.connection())
+
+
+def _on_orm_execute(state):
+    """Bulk INSERT/UPDATE/DELETE statements bypass flush, catch them here"""
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return None
+    table = getattr(state.statement, 'table', None)
+    if table is None or table.name not in TRACKED_TABLES:
+        return None
+    result = state.invoke_statement()
+    _bump(state.session.connection())
+    return result
+
+
+def ensure_content_version(db):
+    """Create the version row on first start"""
+    from models import ContentVersion
+
+    if db.session.get(ContentVersion, CONTENT) is None:
+        db.session.execute(insert(ContentVersion).values(name=CONTENT, version=1, changed_at=datetime.now()))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker booting at the same time created it
+            db.session.rollback()
+
+
+def current_version(max_age=0.0):
+    """Current content version; with ``max_age`` the value is reused for that
+    many seconds instead of querying on every call"""
+    from app import db
+    from models import ContentVersion
+
+    now = time.monotonic()
+    if max_age and _cached['version'] is not None and now - _cached['checked'] < max_age:
+        return _cached['version']
+
+    version = db.session.execute(
+        select(ContentVersion.version).where(ContentVersion.name == CONTENT)
+    ).scalar() or 0
+    _cached.update(version=version, checked=now)
+    return version
+
+
+event.listen(Session, 'before_flush', _before_flush)
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'do_orm_execute', _on_orm_execute)
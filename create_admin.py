@@ -21,7 +21,8 @@ def create_admin_user():
             email='lucgarcbeni@gmail.com',
             password='Pitanga13*',
             first_name='Lucas',
-            last_name='Garcia'
+            last_name='Garcia',
+            wait=True
         )
         admin.is_admin = True
         
@@ -21,7 +21,7 @@ def create_admin():
         
         if existing_admin:
             # Update existing admin password
-            existing_admin.set_password(admin_password)
+            existing_admin.set_password(admin_password, wait=True)
             existing_admin.is_admin = True
             db.session.commit()
             print(f"Admin user updated!")
@@ -34,7 +34,8 @@ def create_admin():
                 password=admin_password,
                 first_name="Lucas",
                 last_name="Admin",
-                is_admin=True
+                is_admin=True,
+                wait=True
             )
             db.session.add(admin)
             db.session.commit()
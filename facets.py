@@ -0,0 +1,106 @@
+"""
+Facet counts for the projects page
+How many published projects fall in each category and use each technology,
+under the filters currently applied. Each facet ignores its own filter, so
+picking a category still shows the counts for the other categories.
+
+Both facets come from one statement (two GROUP BYs joined with UNION ALL).
+Results are kept per worker in a small LRU keyed by the filters and thrown
+away when the content version moves (see content_version.py).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select, func, literal, literal_column, cast, union_all, String
+
+import metrics
+from app import db
+from models import Project, Technology, project_technologies
+from content_version import current_version
+
+CACHE_SIZE = int(os.environ.get('FACETS_CACHE_SIZE', 256))
+# The version check costs a query; reuse it for this many seconds
+VERSION_CHECK_SECONDS = float(os.environ.get('FACETS_VERSION_CHECK_SECONDS', 5))
+
+
+class FacetCache:
+    """LRU of computed facets, emptied whenever the content version changes"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, version, key, compute):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        if value is not None:
+            metrics.inc('cache_requests_total', cache='facets', result='hit')
+            return value
+
+        metrics.inc('cache_requests_total', cache='facets', result='miss')
+        value = compute()
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = FacetCache()
+
+
+def _compute(category_id, search, tech):
+    filters = Project.listing_filters(category_id, search, tech)
+
+    def where(facet):
+        return [Project.is_published.is_(True), *(clause for name, clause in filters.items() if name != facet)]
+
+    by_category = select(
+        literal('category').label('facet'),
+        cast(Project.category_id, String).label('key'),
+        literal_column('NULL').label('name'),
+        func.count().label('count'),
+    ).where(*where('category')).group_by(Project.category_id)
+
+    by_technology = select(
+        literal('tech'),
+        Technology.slug,
+        Technology.name,
+        func.count(),
+    ).select_from(project_technologies) \
+        .join(Technology, Technology.id == project_technologies.c.technology_id) \
+        .join(Project, Project.id == project_technologies.c.project_id) \
+        .where(*where('tech')).group_by(Technology.id)
+
+    categories = {}
+    technologies = []
+    for facet, key, name, count in db.session.execute(union_all(by_category, by_technology)):
+        if facet == 'category':
+            if key is not None:
+                categories[int(key)] = count
+        else:
+            technologies.append((key, name, count))
+    technologies.sort(key=lambda item: (-item[2], item[0]))
+    return {'categories': categories, 'technologies': technologies}
+
+
+def facet_counts(category_id=None, search='', tech=''):
+    """{'categories': {category_id: count}, 'technologies': [(slug, name, count)]}
+    with technologies most used first; don't mutate, the value is shared"""
+    # The search is matched with LIKE, which is case-sensitive outside SQLite
+    key = (category_id or None, search, Technology.slugify(tech))
+    return cache.get(current_version(max_age=VERSION_CHECK_SECONDS), key,
+                     lambda: _compute(category_id, search, tech))
@@ -0,0 +1,321 @@
+"""
+sitemap.xml and Atom feed
+Both files are written to FEEDS_DIR and served with send_file, so crawlers
+get ETag/Last-Modified validators and 304s. They are rebuilt only when the
+content version (see content_version.py) or SITE_URL differs from the one
+recorded in the manifest; one worker rebuilds under a file lock while the
+others keep serving the previous files.
+
+Nothing from the request goes into the files. Without SITE_URL they are
+written with a placeholder that is replaced by the request's URL in each
+response, so a client sending odd Host headers can neither force a rebuild
+nor get its host into what other clients are served.
+
+Rows are read with plain column SELECTs in batches and written straight to
+the file, so a large catalog never sits in memory.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, time as dt_time
+from xml.sax.saxutils import escape
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from flask import Response, abort, request, send_file, url_for
+from sqlalchemy import select, desc
+
+from app import app, db
+from models import Project, Achievement
+from content_version import current_version
+
+logger = logging.getLogger(__name__)
+
+FEEDS_DIR = os.environ.get(
+    'FEEDS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'feeds')
+)
+# Public base URL used in the files; without it each response gets the request's URL
+SITE_URL = os.environ.get('SITE_URL')
+URL_PLACEHOLDER = 'urn:portfolio:site-url'
+FEED_SIZE = int(os.environ.get('FEED_SIZE', 50))
+# Checking the version costs a query; reuse it for this many seconds
+VERSION_CHECK_SECONDS = float(os.environ.get('FEEDS_VERSION_CHECK_SECONDS', 5))
+
+SITEMAP_LIMIT = 50_000  # URLs per sitemap file, per the sitemaps.org protocol
+BATCH_SIZE = 1_000
+
+STATIC_PAGES = ('index', 'projects', 'achievements', 'about')
+
+
+def _as_datetime(value):
+    """Dates are taken as midnight"""
+    if value is not None and not isinstance(value, datetime):
+        value = datetime.combine(value, dt_time())
+    return value
+
+
+def _w3c(value):
+    """W3C/RFC 3339 datetime; stored datetimes are naive server-local time"""
+    if value is None:
+        return None
+    return _as_datetime(value).replace(microsecond=0).astimezone().isoformat()
+
+
+def _write_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _project_rows():
+    query = (select(Project.id, Project.updated_at)
+             .where(Project.is_published.is_(True))
+             .order_by(Project.id)
+             .execution_options(yield_per=BATCH_SIZE))
+    return db.session.execute(query)
+
+
+def _write_sitemaps(directory, base_url):
+    """sitemap.xml, or a sitemap index plus sitemap-N.xml for big catalogs"""
+    def static_urls():
+        for endpoint in STATIC_PAGES:
+            yield base_url + url_for(endpoint), None
+
+    def project_urls():
+        for row in _project_rows():
+            yield base_url + url_for('project_detail', id=row.id), row.updated_at
+
+    parts = []
+    current = None
+
+    def open_part():
+        index = len(parts) + 1
+        path = os.path.join(directory, f'sitemap-{index}.xml')
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        handle = os.fdopen(fd, 'w', encoding='utf-8')
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        parts.append({'index': index, 'path': path, 'tmp': tmp_path, 'handle': handle, 'count': 0, 'lastmod': None})
+        return parts[-1]
+
+    def close_part(part):
+        part['handle'].write('</urlset>\n')
+        part['handle'].close()
+        os.replace(part['tmp'], part['path'])
+
+    try:
+        for generator in (static_urls(), project_urls()):
+            for loc, lastmod in generator:
+                if current is None or current['count'] >= SITEMAP_LIMIT:
+                    if current is not None:
+                        close_part(current)
+                    current = open_part()
+                entry = f'  <url><loc>{escape(loc)}</loc>'
+                if lastmod:
+                    entry += f'<lastmod>{_w3c(lastmod)}</lastmod>'
+                    if current['lastmod'] is None or lastmod > current['lastmod']:
+                        current['lastmod'] = lastmod
+                current['handle'].write(entry + '</url>\n')
+                current['count'] += 1
+        close_part(current)
+    except BaseException:
+        for part in parts:
+            if not part['handle'].closed:
+                part['handle'].close()
+                os.unlink(part['tmp'])
+        raise
+
+    sitemap_path = os.path.join(directory, 'sitemap.xml')
+    if len(parts) == 1:
+        os.replace(parts[0]['path'], sitemap_path)
+        part_names = []
+    else:
+        def write_index(f):
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for part in parts:
+                entry = f'  <sitemap><loc>{escape(base_url + url_for("sitemap_part", index=part["index"]))}</loc>'
+                if part['lastmod']:
+                    entry += f'<lastmod>{_w3c(part["lastmod"])}</lastmod>'
+                f.write(entry + '</sitemap>\n')
+            f.write('</sitemapindex>\n')
+        _write_atomic(sitemap_path, write_index)
+        part_names = [os.path.basename(part['path']) for part in parts]
+
+    # Drop parts left over from a bigger catalog
+    for name in os.listdir(directory):
+        if name.startswith('sitemap-') and name.endswith('.xml') and name not in part_names:
+            os.remove(os.path.join(directory, name))
+    return len(parts)
+
+
+def _feed_entries(base_url):
+    """Latest projects and achievements, newest update first"""
+    projects = db.session.execute(
+        select(Project.id, Project.title, Project.description, Project.created_at, Project.updated_at)
+        .where(Project.is_published.is_(True))
+        .order_by(desc(Project.updated_at)).limit(FEED_SIZE)
+    ).all()
+    achievements = db.session.execute(
+        select(Achievement.id, Achievement.title, Achievement.description, Achievement.organization,
+               Achievement.date_achieved, Achievement.updated_at)
+        .where(Achievement.is_published.is_(True))
+        .order_by(desc(Achievement.updated_at)).limit(FEED_SIZE)
+    ).all()
+
+    entries = []
+    for row in projects:
+        entries.append({
+            'id': f'{base_url}/project/{row.id}',
+            'link': base_url + url_for('project_detail', id=row.id),
+            'title': row.title,
+            'summary': row.description,
+            'published': row.created_at,
+            'updated': row.updated_at or row.created_at,
+        })
+    for row in achievements:
+        summary = f'{row.organization}: {row.description}' if row.organization else row.description
+        entries.append({
+            'id': f'{base_url}/achievements#achievement-{row.id}',
+            'link': base_url + url_for('achievements'),
+            'title': row.title,
+            'summary': summary,
+            'published': row.date_achieved,
+            'updated': row.updated_at or row.date_achieved,
+        })
+    entries.sort(key=lambda entry: _as_datetime(entry['updated']), reverse=True)
+    return entries[:FEED_SIZE]
+
+
+def _write_feed(directory, base_url):
+    entries = _feed_entries(base_url)
+
+    def write(f):
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n')
+        f.write('  <title>Lucas Beni - Portfolio</title>\n')
+        f.write(f'  <id>{escape(base_url)}/</id>\n')
+        f.write(f'  <link href="{escape(base_url)}/"/>\n')
+        f.write(f'  <link rel="self" href="{escape(base_url + url_for("atom_feed"))}"/>\n')
+        updated = entries[0]['updated'] if entries else datetime.now()
+        f.write(f'  <updated>{_w3c(updated)}</updated>\n')
+        for entry in entries:
+            f.write('  <entry>\n')
+            f.write(f'    <id>{escape(entry["id"])}</id>\n')
+            f.write(f'    <title>{escape(entry["title"] or "")}</title>\n')
+            f.write(f'    <link href="{escape(entry["link"])}"/>\n')
+            if entry['published']:
+                f.write(f'    <published>{_w3c(entry["published"])}</published>\n')
+            f.write(f'    <updated>{_w3c(entry["updated"])}</updated>\n')
+            f.write(f'    <summary>{escape(entry["summary"] or "")}</summary>\n')
+            f.write('  </entry>\n')
+        f.write('</feed>\n')
+
+    _write_atomic(os.path.join(directory, 'feed.xml'), write)
+    return len(entries)
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def generate_feeds(base_url, version, directory=FEEDS_DIR):
+    """Write sitemap(s) and the Atom feed for ``version`` of the content"""
+    os.makedirs(directory, exist_ok=True)
+    sitemaps = _write_sitemaps(directory, base_url)
+    entries = _write_feed(directory, base_url)
+    _write_atomic(os.path.join(directory, 'manifest.json'), lambda f: json.dump({
+        'version': version,
+        'base_url': base_url,
+        'generated_at': datetime.now().isoformat(),
+    }, f))
+    logger.info(f"Feeds regenerated for content version {version}: {sitemaps} sitemap file(s), {entries} feed entries")
+
+
+def ensure_feeds(base_url, directory=FEEDS_DIR):
+    """Regenerate the files if the content changed since they were written"""
+    version = current_version(max_age=VERSION_CHECK_SECONDS)
+    manifest = _read_manifest(directory)
+    if manifest.get('version') == version and manifest.get('base_url') == base_url:
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is rebuilding; serve the previous files if there are any
+                if manifest:
+                    return
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            manifest = _read_manifest(directory)
+            if manifest.get('version') != version or manifest.get('base_url') != base_url:
+                generate_feeds(base_url, version, directory)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _base_url():
+    """Base URL written into the files; never taken from the request"""
+    return SITE_URL.rstrip('/') if SITE_URL else URL_PLACEHOLDER
+
+
+def _send_with_request_url(path, mimetype):
+    """The file with the placeholder replaced by the request's URL; the ETag
+    covers that URL too"""
+    base_url = request.host_url.rstrip('/')
+    stat = os.stat(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        body = f.read().replace(URL_PLACEHOLDER, escape(base_url))
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(hashlib.sha256(f'{stat.st_mtime_ns}:{stat.st_size}:{base_url}'.encode('utf-8')).hexdigest()[:32])
+    response.last_modified = datetime.fromtimestamp(stat.st_mtime)
+    return response.make_conditional(request)
+
+
+def _serve(name, mimetype):
+    try:
+        ensure_feeds(_base_url())
+    except Exception as e:
+        logger.error(f"Error regenerating feeds: {e}")
+    path = os.path.join(FEEDS_DIR, name)
+    if not os.path.exists(path):
+        abort(404)
+    if SITE_URL:
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True, max_age=0)
+    else:
+        response = _send_with_request_url(path, mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/sitemap.xml')
+def sitemap():
+    return _serve('sitemap.xml', 'application/xml')
+
+
+@app.route('/sitemap-<int:index>.xml')
+def sitemap_part(index):
+    return _serve(f'sitemap-{index}.xml', 'application/xml')
+
+
+@app.route('/feed.xml')
+def atom_feed():
+    return _serve('feed.xml', 'application/atom+xml')
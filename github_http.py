@@ -0,0 +1,402 @@
+"""
+HTTP helpers for the GitHub API client
+One pooled requests.Session shared by every GitHub and connector call, with
+jittered exponential backoff, rate-limit aware throttling and per-endpoint
+latency stats, plus a persistent conditional-request cache on top of it.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import tempfile
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import parse_header_links
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get(
+    'GITHUB_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'github_cache')
+)
+CACHE_MAX_BYTES = int(os.environ.get('GITHUB_CACHE_MAX_BYTES', 20 * 1024 * 1024))
+
+# Response headers worth keeping alongside the cached body
+STORED_HEADERS = ('ETag', 'Last-Modified', 'Link')
+
+POOL_SIZE = int(os.environ.get('GITHUB_HTTP_POOL_SIZE', 10))
+MAX_RETRIES = int(os.environ.get('GITHUB_HTTP_MAX_RETRIES', 4))
+BACKOFF_BASE = float(os.environ.get('GITHUB_HTTP_BACKOFF_BASE', 0.5))
+BACKOFF_MAX = float(os.environ.get('GITHUB_HTTP_BACKOFF_MAX', 30))
+# Start spacing requests out once fewer than this many calls are left
+RATE_LIMIT_LOW_WATER = int(os.environ.get('GITHUB_RATE_LIMIT_LOW_WATER', 100))
+# Never sleep longer than this for a single request while throttling
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('GITHUB_RATE_LIMIT_MAX_WAIT', 120))
+# Longest gap between heartbeats while requests run or wait
+HEARTBEAT_INTERVAL = float(os.environ.get('GITHUB_HEARTBEAT_SECONDS', 15))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _build_session():
+    session = requests.Session()
+    # Keep-alive connections are reused across calls; retries are handled in get()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+session = _build_session()
+
+
+class RateLimitTracker:
+    """Remembers the last X-RateLimit-* values seen per host"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limits = {}
+
+    def update(self, host, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        try:
+            with self._lock:
+                self._limits[host] = (int(remaining), float(reset))
+        except ValueError:
+            pass
+
+    def delay(self, host):
+        """Seconds to wait before the next call so the budget lasts until reset"""
+        with self._lock:
+            limit = self._limits.get(host)
+        if not limit:
+            return 0.0
+        remaining, reset = limit
+        until_reset = max(reset - time.time(), 0.0)
+        if until_reset == 0 or remaining >= RATE_LIMIT_LOW_WATER:
+            return 0.0
+        if remaining <= 0:
+            return min(until_reset, RATE_LIMIT_MAX_WAIT)
+        return min(until_reset / remaining, RATE_LIMIT_MAX_WAIT)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._limits)
+
+
+class LatencyStats:
+    """Per-endpoint call count, error count and latency totals"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {'calls': 0, 'errors': 0, 'total': 0.0, 'max': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+
+    def summary(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'avg_ms': round(stats['total'] / stats['calls'] * 1000, 1),
+                    'max_ms': round(stats['max'] * 1000, 1),
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class Heartbeat:
+    """Tells a long-running caller (the sync job) that requests are still
+    moving: ``callback`` runs at most every ``interval`` seconds, on every
+    request attempt and during throttling and backoff sleeps"""
+
+    def __init__(self, interval=HEARTBEAT_INTERVAL):
+        self.interval = interval
+        self.callback = None
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def beat(self):
+        if self.callback is None or time.monotonic() - self._last < self.interval:
+            return
+        # The page prefetch thread may beat too; one caller at a time is enough
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last = time.monotonic()
+            self.callback()
+        except Exception as e:
+            logger.warning(f"Heartbeat callback failed: {e}")
+        finally:
+            self._lock.release()
+
+    def sleep(self, seconds):
+        """time.sleep() cut into slices so the heartbeat keeps firing"""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.beat()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, self.interval))
+
+
+rate_limits = RateLimitTracker()
+latency = LatencyStats()
+heartbeat = Heartbeat()
+
+
+def _retry_after(response):
+    """Seconds GitHub asked us to wait, from Retry-After or a spent rate limit"""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        reset = response.headers.get('X-RateLimit-Reset')
+        if reset:
+            try:
+                return max(float(reset) - time.time(), 0.0)
+            except ValueError:
+                pass
+    return None
+
+
+def http_get(url, headers=None, params=None, timeout=10, endpoint=None):
+    """GET through the shared session, retrying 5xx/429 with jittered backoff
+
+    Requests are spaced out as the X-RateLimit budget for the host runs low,
+    and a 403/429 carrying Retry-After or an exhausted budget is retried once
+    the wait is over instead of failing. ``endpoint`` names the call in the
+    latency stats; it defaults to the URL path.
+    """
+    parsed = urlparse(url)
+    host = parsed.netloc
+    endpoint = endpoint or f'{host}{parsed.path}'
+
+    for attempt in range(MAX_RETRIES + 1):
+        heartbeat.beat()
+        wait = rate_limits.delay(host)
+        if wait:
+            logger.info(f"GitHub rate limit running low, waiting {wait:.1f}s before {endpoint}")
+            heartbeat.sleep(wait)
+
+        started = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            latency.record(endpoint, time.perf_counter() - started, error=True)
+            if attempt == MAX_RETRIES:
+                raise
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            logger.warning(f"{endpoint} failed ({e}), retrying in {delay:.1f}s")
+            heartbeat.sleep(delay)
+            continue
+
+        rate_limits.update(host, response.headers)
+        retry_after = _retry_after(response)
+        retryable = response.status_code in RETRY_STATUSES or (
+            response.status_code == 403 and retry_after is not None
+        )
+        latency.record(endpoint, time.perf_counter() - started, error=response.status_code >= 400)
+
+        if not retryable or attempt == MAX_RETRIES:
+            return response
+
+        backoff = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        delay = min(max(retry_after or 0.0, backoff), RATE_LIMIT_MAX_WAIT)
+        logger.warning(f"{endpoint} returned {response.status_code}, retrying in {delay:.1f}s")
+        heartbeat.sleep(delay)
+
+    return response
+
+
+class CachedResponse:
+    """Minimal response object returned by ResponseCache.get"""
+
+    def __init__(self, status_code, text, headers=None, from_cache=False):
+        self.status_code = status_code
+        self.text = text
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.text)
+
+    @property
+    def links(self):
+        link_header = self.headers.get('Link')
+        if not link_header:
+            return {}
+        links = {}
+        for link in parse_header_links(link_header):
+            key = link.get('rel') or link.get('url')
+            links[key] = link
+        return links
+
+
+class ResponseCache:
+    """On-disk cache of GitHub GET responses keyed by URL and credentials,
+    revalidated with ETags.
+
+    A 304 answer is not counted against the GitHub rate limit, so unchanged
+    payloads cost nothing but a round trip. Entries are evicted least recently
+    used first once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _key(self, url, headers):
+        headers = headers or {}
+        accept = headers.get('Accept', '')
+        # Responses depend on who asks (private repos), so the credentials are
+        # part of the key; only their hash is used, the token never hits disk
+        authorization = hashlib.sha256(headers.get('Authorization', '').encode('utf-8')).hexdigest()
+        return hashlib.sha256(f'{authorization}\n{accept}\n{url}'.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used for eviction
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+    def _store(self, key, url, response):
+        entry = {
+            'url': url,
+            'stored_at': time.time(),
+            'headers': {h: response.headers[h] for h in STORED_HEADERS if h in response.headers},
+            'body': response.text,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        # Write to a temp file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry for {url}: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += os.path.getsize(path) - old_size
+        self._evict_if_needed()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _scan(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.endswith('.json'):
+                        stat = item.stat()
+                        entries.append((stat.st_mtime, stat.st_size, item.path))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            # Another worker may share the directory, so re-scan before evicting
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            # Evict down to 90% so we don't scan again on the very next write
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+            self._total_bytes = total
+
+    def get(self, url, headers=None, params=None, timeout=10, endpoint=None, fetch=None):
+        """GET ``url`` with conditional headers, serving the cached body on 304"""
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        key = self._key(full_url, headers)
+        entry = self._load(key)
+
+        request_headers = dict(headers or {})
+        if entry:
+            cached_headers = entry.get('headers', {})
+            if cached_headers.get('ETag'):
+                request_headers['If-None-Match'] = cached_headers['ETag']
+            if cached_headers.get('Last-Modified'):
+                request_headers['If-Modified-Since'] = cached_headers['Last-Modified']
+
+        response = (fetch or http_get)(full_url, headers=request_headers, timeout=timeout, endpoint=endpoint)
+
+        if response.status_code == 304 and entry:
+            self.hits += 1
+            metrics.inc('cache_requests_total', cache='github', result='hit')
+            logger.debug(f"GitHub cache hit (304) for {full_url}")
+            return CachedResponse(200, entry['body'], entry.get('headers'), from_cache=True)
+
+        self.misses += 1
+        metrics.inc('cache_requests_total', cache='github', result='miss')
+        if response.status_code == 200 and (
+            'ETag' in response.headers or 'Last-Modified' in response.headers
+        ):
+            self._store(key, full_url, response)
+
+        return CachedResponse(response.status_code, response.text, response.headers)
+
+
+response_cache = ResponseCache()
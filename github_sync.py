@@ -2,29 +2,52 @@
 GitHub Sync Module for Portfolio
 Fetches repositories from Lucas-Beni GitHub profile and syncs them to the database
 Uses Replit's GitHub connector integration
+API responses go through the pooled session and conditional-request cache in github_http
 """
 import os
 import json
 import logging
-import requests
-from datetime import datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from github_http import response_cache, http_get, latency, heartbeat as http_heartbeat
+from token_cache import TokenCache
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 GITHUB_USERNAME = "Lucas-Beni"
 
-connection_settings = None
+# Overridable so the sync can run against a local stand-in (see benchmarks/fake_github.py)
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
 
-def get_access_token():
-    """Get GitHub access token from Replit connector"""
-    global connection_settings
-    
-    if connection_settings and connection_settings.get('settings', {}).get('expires_at'):
-        expires_at = connection_settings['settings']['expires_at']
-        if datetime.fromisoformat(expires_at.replace('Z', '+00:00')) > datetime.now():
-            return connection_settings['settings'].get('access_token')
+# Comma-separated list of accounts synced in one run, e.g. "Lucas-Beni,other-user"
+GITHUB_USERNAMES = [
+    name.strip() for name in os.environ.get('GITHUB_USERNAMES', GITHUB_USERNAME).split(',') if name.strip()
+]
+
+TOKEN_CACHE_PATH = os.environ.get(
+    'GITHUB_TOKEN_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'github_token.json')
+)
+
+def _parse_expires_at(value):
+    """Convert the connector's ISO expires_at into a Unix timestamp"""
+    if not value:
+        return None
+    try:
+        expires_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        logger.warning(f"Unrecognised token expiry: {value}")
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at.timestamp()
+
+def _fetch_connector_token():
+    """Fetch a GitHub access token from the Replit connector
     
+    Returns (access_token, expires_at) or (None, None).
+    """
     hostname = os.environ.get('REPLIT_CONNECTORS_HOSTNAME')
     repl_identity = os.environ.get('REPL_IDENTITY')
     web_repl_renewal = os.environ.get('WEB_REPL_RENEWAL')
@@ -35,153 +58,445 @@ def get_access_token():
         x_replit_token = f'depl {web_repl_renewal}'
     else:
         logger.warning("No Replit token found, will use public API")
-        return None
+        return None, None
     
     if not hostname:
         logger.warning("No connector hostname found")
-        return None
+        return None, None
     
     try:
-        response = requests.get(
+        response = http_get(
             f'https://{hostname}/api/v2/connection?include_secrets=true&connector_names=github',
             headers={
                 'Accept': 'application/json',
                 'X_REPLIT_TOKEN': x_replit_token
             },
-            timeout=10
+            timeout=10,
+            endpoint='connectors/connection'
         )
         
         if response.status_code == 200:
             data = response.json()
             connection_settings = data.get('items', [{}])[0] if data.get('items') else {}
+            settings = connection_settings.get('settings', {})
             
             access_token = (
-                connection_settings.get('settings', {}).get('access_token') or
-                connection_settings.get('settings', {}).get('oauth', {}).get('credentials', {}).get('access_token')
+                settings.get('access_token') or
+                settings.get('oauth', {}).get('credentials', {}).get('access_token')
             )
             
             if access_token:
-                return access_token
+                return access_token, _parse_expires_at(settings.get('expires_at'))
                 
     except Exception as e:
         logger.error(f"Error getting access token: {e}")
     
-    return None
+    return None, None
 
-def fetch_github_repos(username=GITHUB_USERNAME):
-    """Fetch public repositories from GitHub"""
-    access_token = get_access_token()
-    
+token_cache = TokenCache(TOKEN_CACHE_PATH, _fetch_connector_token)
+
+def get_access_token():
+    """Get GitHub access token from Replit connector, cached across workers"""
+    return token_cache.get()
+
+def github_headers(access_token=None):
+    """Build the standard headers for GitHub API requests"""
     headers = {
         'Accept': 'application/vnd.github.v3+json',
         'User-Agent': 'Portfolio-App'
     }
-    
     if access_token:
         headers['Authorization'] = f'Bearer {access_token}'
+    return headers
+
+def _fetch_repo_page(url, headers, params=None):
+    """Fetch one page of repositories, returning (repos, next_page_url)
     
-    try:
-        url = f'https://api.github.com/users/{username}/repos'
-        params = {
-            'sort': 'updated',
-            'direction': 'desc',
-            'per_page': 100
-        }
-        
-        response = requests.get(url, headers=headers, params=params, timeout=15)
-        
-        if response.status_code == 200:
-            repos = response.json()
-            logger.info(f"Fetched {len(repos)} repositories from GitHub")
-            return repos
-        else:
-            logger.error(f"GitHub API error: {response.status_code} - {response.text}")
-            return []
+    repos is None when GitHub answered with an error.
+    """
+    response = response_cache.get(url, headers=headers, params=params, timeout=15, endpoint='users/{user}/repos')
+    
+    if response.status_code != 200:
+        logger.error(f"GitHub API error: {response.status_code} - {response.text}")
+        return None, None
+    
+    repos = response.json()
+    source = 'cache' if response.from_cache else 'GitHub'
+    logger.info(f"Fetched {len(repos)} repositories from {source}")
+    return repos, response.links.get('next', {}).get('url')
+
+def iter_github_repo_pages(usernames=GITHUB_USERNAMES, headers=None, completed=None):
+    """Yield public repositories page by page for one or more GitHub users
+    
+    Follows the Link rel="next" header, and downloads the next page in the
+    background while the caller is still processing the current one. When a
+    ``completed`` set is given, each username whose listing was read to the
+    last page without errors is added to it.
+    """
+    if isinstance(usernames, str):
+        usernames = [usernames]
+    if headers is None:
+        headers = github_headers(get_access_token())
+    
+    params = {
+        'sort': 'updated',
+        'direction': 'desc',
+        'per_page': 100
+    }
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for username in usernames:
+            url = f'{GITHUB_API_URL}/users/{username}/repos'
+            future = executor.submit(_fetch_repo_page, url, headers, params)
             
-    except Exception as e:
-        logger.error(f"Error fetching repos: {e}")
-        return []
+            while future is not None:
+                try:
+                    repos, next_url = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching repos for {username}: {e}")
+                    break
+                if repos is None:
+                    break
+                
+                future = executor.submit(_fetch_repo_page, next_url, headers) if next_url else None
+                if repos:
+                    yield repos
+                if future is None and completed is not None:
+                    completed.add(username)
+
+def iter_github_repos(usernames=GITHUB_USERNAMES, headers=None):
+    """Yield public repositories one at a time across every page"""
+    for page in iter_github_repo_pages(usernames, headers):
+        yield from page
+
+def fetch_github_repos(username=GITHUB_USERNAME):
+    """Fetch all public repositories from GitHub as a list"""
+    return list(iter_github_repos(username))
 
 def get_repo_languages(username, repo_name, headers):
-    """Get languages used in a repository"""
+    """Get languages used in a repository, or None if GitHub didn't answer"""
     try:
-        url = f'https://api.github.com/repos/{username}/{repo_name}/languages'
-        response = requests.get(url, headers=headers, timeout=10)
+        url = f'{GITHUB_API_URL}/repos/{username}/{repo_name}/languages'
+        response = response_cache.get(url, headers=headers, timeout=10, endpoint='repos/{owner}/{repo}/languages')
         
         if response.status_code == 200:
             languages = response.json()
             return list(languages.keys())
-        return []
+        logger.error(f"Error fetching languages for {repo_name}: HTTP {response.status_code}")
+        return None
     except Exception as e:
         logger.error(f"Error fetching languages for {repo_name}: {e}")
-        return []
+        return None
 
-def sync_github_projects():
-    """Sync GitHub repositories to the database as projects"""
-    from app import db
-    from models import Project
-    
-    repos = fetch_github_repos(GITHUB_USERNAME)
+def _repo_fields(repo, languages):
+    """Map a GitHub repository payload onto Project column values"""
+    topics = repo.get('topics', [])
+    technologies = ', '.join(languages + topics) if languages or topics else (repo.get('language') or '')
+    description = repo.get('description') or f"Repository: {repo['name']}"
     
-    if not repos:
-        return {'success': False, 'message': 'No repositories found or API error', 'synced': 0}
-    
-    access_token = get_access_token()
-    headers = {
-        'Accept': 'application/vnd.github.v3+json',
-        'User-Agent': 'Portfolio-App'
+    return {
+        'title': repo['name'],
+        'description': description[:500],
+        'technologies': technologies,
+        'deployed_url': repo.get('homepage') or '',
     }
-    if access_token:
-        headers['Authorization'] = f'Bearer {access_token}'
+
+def _repo_unchanged(repo, state, existing):
+    """True when the repo's watermarks match the last successful sync"""
+    return (
+        state is not None
+        and state['html_url'] == repo['html_url']
+        and state['repo_pushed_at'] == repo.get('pushed_at')
+        and state['repo_updated_at'] == repo.get('updated_at')
+        and repo['html_url'] in existing
+    )
+
+def _apply_page(db, Project, GitHubRepoState, existing, states, seen_ids, repos, headers, full=False, touched=None):
+    """Bulk insert new repositories and update the ones whose fields changed
     
-    synced_count = 0
-    updated_count = 0
+    ``existing`` maps github_url to the current column values and is kept up
+    to date so repeated repos across pages are not inserted twice. ``states``
+    holds the pushed_at/updated_at watermarks per GitHub repo id; repos whose
+    watermarks did not move are skipped without fetching their languages
+    unless ``full`` is set. Ids of new projects and of those whose
+    technologies changed are added to ``touched``.
+    """
+    from sqlalchemy import insert, update, select
+    
+    inserts = []
+    updates = []
+    state_inserts = []
+    state_updates = []
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+    now = datetime.now()
     
     for repo in repos:
         if repo.get('fork') or repo.get('private'):
             continue
         
-        github_url = repo.get('html_url', '')
+        repo_id = repo.get('id')
+        seen_ids.add(repo_id)
+        state = states.get(repo_id)
+        
+        if not full and _repo_unchanged(repo, state, existing):
+            stats['unchanged'] += 1
+            continue
         
-        existing_project = Project.query.filter_by(github_url=github_url).first()
+        try:
+            github_url = repo['html_url']
+            owner = repo.get('owner', {}).get('login', GITHUB_USERNAME)
+            languages = get_repo_languages(owner, repo['name'], headers)
+            if languages is None:
+                # Leave the project and its watermark alone so the next run retries it
+                stats['failed'] += 1
+                continue
+            fields = _repo_fields(repo, languages)
+        except Exception as e:
+            logger.error(f"Skipping repository {repo.get('full_name') or repo.get('name')}: {e}")
+            stats['failed'] += 1
+            continue
         
-        languages = get_repo_languages(GITHUB_USERNAME, repo['name'], headers)
-        topics = repo.get('topics', [])
-        technologies = ', '.join(languages + topics) if languages or topics else repo.get('language', '')
+        # A renamed repo keeps its id, so move its project to the new URL
+        if state and state['html_url'] != github_url and state['html_url'] in existing and github_url not in existing:
+            logger.info(f"Repository renamed: {state['html_url']} -> {github_url}")
+            existing[github_url] = existing.pop(state['html_url'])
         
-        description = repo.get('description') or f"Repository: {repo['name']}"
+        current = existing.get(github_url)
         
-        if existing_project:
-            existing_project.title = repo['name']
-            existing_project.description = description[:500]
-            existing_project.technologies = technologies
-            existing_project.demo_url = repo.get('homepage') or ''
-            existing_project.updated_at = datetime.now()
-            updated_count += 1
+        if current is None:
+            description = repo.get('description') or f"Repository: {repo['name']}"
+            inserts.append(dict(
+                fields,
+                github_url=github_url,
+                content=f"This project was automatically imported from GitHub.\n\nRepository: {github_url}\n\nDescription: {description}",
+                is_published=True,
+                is_featured=repo.get('stargazers_count', 0) >= 1,
+                created_at=now,
+                updated_at=now,
+            ))
+            existing[github_url] = dict(fields, id=None, github_url=github_url)
         else:
-            new_project = Project()
-            new_project.title = repo['name']
-            new_project.description = description[:500]
-            new_project.content = f"This project was automatically imported from GitHub.\n\nRepository: {github_url}\n\nDescription: {description}"
-            new_project.github_url = github_url
-            new_project.demo_url = repo.get('homepage') or ''
-            new_project.technologies = technologies
-            new_project.is_published = True
-            new_project.is_featured = repo.get('stargazers_count', 0) >= 1
+            # Keep a manually entered deployed URL when the repo has no homepage
+            if not fields['deployed_url']:
+                fields['deployed_url'] = current['deployed_url'] or ''
+            fields['github_url'] = github_url
             
-            db.session.add(new_project)
-            synced_count += 1
+            changed = {key: value for key, value in fields.items() if (current[key] or '') != value}
+            if changed and current['id'] is not None:
+                updates.append(dict(changed, id=current['id'], updated_at=now))
+                current.update(changed)
+        
+        state_row = {
+            'repo_id': repo_id,
+            'owner': owner,
+            'full_name': repo.get('full_name') or f"{owner}/{repo['name']}",
+            'html_url': github_url,
+            'repo_pushed_at': repo.get('pushed_at'),
+            'repo_updated_at': repo.get('updated_at'),
+        }
+        (state_updates if state else state_inserts).append(state_row)
+        states[repo_id] = state_row
+    
+    if inserts:
+        db.session.execute(insert(Project), inserts)
+    if updates:
+        # ORM bulk UPDATE by primary key, grouped into executemany batches
+        db.session.execute(update(Project), updates)
+    
+    # Re-link technologies for new projects and the ones whose list changed
+    retagged = [row['id'] for row in updates if 'technologies' in row]
+    if inserts:
+        inserted_urls = [row['github_url'] for row in inserts]
+        retagged += db.session.scalars(select(Project.id).where(Project.github_url.in_(inserted_urls))).all()
+    if retagged:
+        Project.sync_technologies(retagged)
+    if touched is not None:
+        touched.update(retagged)
+    
+    if state_inserts:
+        db.session.execute(insert(GitHubRepoState), state_inserts)
+    if state_updates:
+        db.session.execute(update(GitHubRepoState), state_updates)
     
+    stats['inserted'] = len(inserts)
+    stats['updated'] = len(updates)
+    return stats
+
+def _unpublish_removed(db, Project, GitHubRepoState, states, seen_ids, completed, touched=None):
+    """Unpublish projects whose repository disappeared from a fully listed account
+    
+    Only accounts in ``completed`` were read to the last page, so a missing
+    repo there really was deleted, renamed away or made private/forked.
+    """
+    completed = {username.lower() for username in completed}
+    removed = [
+        (repo_id, state['html_url']) for repo_id, state in states.items()
+        if repo_id not in seen_ids and (state['owner'] or '').lower() in completed
+    ]
+    if not removed:
+        return 0
+    
+    removed_ids = [repo_id for repo_id, _ in removed]
+    removed_urls = [url for _, url in removed]
+    for url in removed_urls:
+        logger.info(f"Repository no longer available, unpublishing: {url}")
+    
+    from sqlalchemy import update, delete, select
+    
+    if touched is not None:
+        touched.update(db.session.scalars(
+            select(Project.id).where(Project.github_url.in_(removed_urls), Project.is_published.is_(True))
+        ))
+    result = db.session.execute(
+        update(Project)
+        .where(Project.github_url.in_(removed_urls), Project.is_published.is_(True))
+        .values(is_published=False, updated_at=datetime.now())
+    )
+    db.session.execute(delete(GitHubRepoState).where(GitHubRepoState.repo_id.in_(removed_ids)))
+    for repo_id in removed_ids:
+        states.pop(repo_id, None)
+    return result.rowcount
+
+def _refresh_related(db, touched):
+    """Patch the related-project lists around the projects a sync changed;
+    once per sync, as every page can move the same neighbours"""
+    if not touched:
+        return
+    from related import update_related
     try:
+        update_related(touched)
         db.session.commit()
-        logger.info(f"GitHub sync complete: {synced_count} new, {updated_count} updated")
-        return {
-            'success': True,
-            'message': f'Synced {synced_count} new projects, updated {updated_count} existing',
-            'synced': synced_count,
-            'updated': updated_count
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Could not update related projects: {e}")
+
+def sync_github_projects(usernames=GITHUB_USERNAMES, progress=None, full=False, heartbeat=None):
+    """Sync GitHub repositories to the database as projects
+    
+    Only repositories whose pushed_at/updated_at changed since the last run
+    are refreshed; pass ``full=True`` to refresh every repository.
+    ``progress`` is called after every page with the running totals
+    (processed, inserted, updated, failed). ``heartbeat`` is called at least
+    every GITHUB_HEARTBEAT_SECONDS while GitHub requests run or wait on rate
+    limits and retries, possibly from the page prefetch thread.
+    """
+    http_heartbeat.callback = heartbeat
+    try:
+        return _sync_github_projects(usernames, progress, full)
+    finally:
+        http_heartbeat.callback = None
+
+def _sync_github_projects(usernames, progress, full):
+    from sqlalchemy import func
+    from app import db
+    from models import Project, GitHubRepoState, GitHubSyncState
+    
+    if isinstance(usernames, str):
+        usernames = [usernames]
+    headers = github_headers(get_access_token())
+    latency.reset()
+    
+    # One query for every project already linked to a repository
+    existing = {
+        row.github_url: {
+            'id': row.id,
+            'github_url': row.github_url,
+            'title': row.title,
+            'description': row.description,
+            'technologies': row.technologies,
+            'deployed_url': row.deployed_url,
         }
+        for row in db.session.query(
+            Project.id, Project.github_url, Project.title, Project.description,
+            Project.technologies, Project.deployed_url
+        ).filter(Project.github_url.isnot(None), Project.github_url != '')
+    }
+    
+    # ...and one for the watermarks recorded by previous runs
+    lowered = [username.lower() for username in usernames]
+    states = {
+        row.repo_id: {
+            'repo_id': row.repo_id,
+            'owner': row.owner,
+            'full_name': row.full_name,
+            'html_url': row.html_url,
+            'repo_pushed_at': row.repo_pushed_at,
+            'repo_updated_at': row.repo_updated_at,
+        }
+        for row in GitHubRepoState.query.filter(func.lower(GitHubRepoState.owner).in_(lowered))
+    }
+    
+    totals = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+    seen_count = 0
+    seen_ids = set()
+    completed = set()
+    touched = set()
+    unpublished = 0
+    
+    try:
+        for repos in iter_github_repo_pages(usernames, headers, completed=completed):
+            seen_count += len(repos)
+            stats = _apply_page(db, Project, GitHubRepoState, existing, states, seen_ids, repos, headers, full, touched)
+            # Commit per page so SQLite readers are not locked out for the whole sync
+            db.session.commit()
+            for key, value in stats.items():
+                totals[key] += value
+            
+            if progress:
+                progress({
+                    'processed': seen_count,
+                    'inserted': totals['inserted'],
+                    'updated': totals['updated'],
+                    'failed': totals['failed'],
+                })
+        
+        if completed:
+            unpublished = _unpublish_removed(db, Project, GitHubRepoState, states, seen_ids, completed, touched)
+            now = datetime.now()
+            for username in completed:
+                sync_state = db.session.get(GitHubSyncState, username) or GitHubSyncState(username=username)
+                sync_state.last_synced_at = now
+                if full:
+                    sync_state.last_full_sync_at = now
+                db.session.add(sync_state)
+            db.session.commit()
     except Exception as e:
         db.session.rollback()
         logger.error(f"Database error during sync: {e}")
-        return {'success': False, 'message': str(e), 'synced': 0}
+        # Pages committed before the error still changed projects
+        _refresh_related(db, touched)
+        return {
+            'success': False,
+            'message': str(e),
+            'synced': totals['inserted'],
+            'updated': totals['updated'],
+            'processed': seen_count,
+            'failed': totals['failed']
+        }
+    
+    _refresh_related(db, touched)
+    
+    if not seen_count and not completed:
+        return {'success': False, 'message': 'No repositories found or API error', 'synced': 0}
+    
+    for endpoint, stats in latency.summary().items():
+        logger.info(f"GitHub {endpoint}: {stats['calls']} calls, {stats['errors']} errors, "
+                    f"avg {stats['avg_ms']}ms, max {stats['max_ms']}ms")
+    
+    logger.info(
+        f"GitHub sync complete: {totals['inserted']} new, {totals['updated']} updated, "
+        f"{totals['unchanged']} unchanged, {unpublished} unpublished, {totals['failed']} failed"
+    )
+    return {
+        'success': True,
+        'message': (
+            f"Synced {totals['inserted']} new projects, updated {totals['updated']} existing, "
+            f"{totals['unchanged']} unchanged, {unpublished} unpublished, {totals['failed']} failed"
+        ),
+        'synced': totals['inserted'],
+        'updated': totals['updated'],
+        'unchanged': totals['unchanged'],
+        'unpublished': unpublished,
+        'processed': seen_count,
+        'failed': totals['failed']
+    }
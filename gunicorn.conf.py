@@ -0,0 +1,19 @@
+"""
+gunicorn settings, read from the working directory when gunicorn starts
+The periodic GitHub sync starts here, once per served worker, and not on
+import of main, so flask CLI commands and scripts never run the scheduler.
+The worker count is exported as WEB_CONCURRENCY before the workers fork, so
+passwords.py can size the host-wide hashing slots from it.
+"""
+import os
+
+
+def on_starting(server):
+    os.environ['WEB_CONCURRENCY'] = str(server.cfg.workers)
+
+
+def post_worker_init(worker):
+    from main import app
+    from scheduler import start_scheduler
+
+    start_scheduler(app)
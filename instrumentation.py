@@ -0,0 +1,273 @@
+"""
+Opt-in per-request SQL and template timing
+Enable with SQL_INSTRUMENTATION=1. Every request then gets a Server-Timing
+header (visible in the browser devtools network tab) and a structured log
+line with the statement count, total DB time, slowest statement and template
+render time.
+
+Statements slower than SLOW_QUERY_MS are kept (with route, parameter types
+and, when viewed, the query plan) in a per-process ring buffer shown at
+/admin/slow-queries whenever the cursor hooks are installed: with
+SQL_INSTRUMENTATION=1 or METRICS_DB_TIMING=1. Without either, nothing is
+registered on the engine.
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('portfolio.requests')
+
+ENABLED = os.environ.get('SQL_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+# 0 turns the slow query recorder off
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_QUERY_BUFFER = int(os.environ.get('SLOW_QUERY_BUFFER', 200))
+
+
+class RequestStats:
+    """Timings collected while handling one request"""
+
+    __slots__ = ('started', 'db_count', 'db_time', 'slowest_time', 'slowest_sql',
+                 'template_time', '_template_starts')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.template_time = 0.0
+        self._template_starts = []
+
+    def record_query(self, statement, elapsed):
+        self.db_count += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_sql = statement
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} queries"',
+            f'db-slowest;dur={self.slowest_time * 1000:.1f}',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'app;dur={total * 1000:.1f}',
+        ])
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """Statement with literals and IN-list lengths removed, for grouping"""
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    return _PLACEHOLDER_LIST.sub('(?, ...)', normalized)
+
+
+def _redact(parameters):
+    """Type names in place of bound values; writes to users carry password
+    hashes and tokens, and the buffer is shown in the admin"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in (parameters or ())]
+
+
+def _unbound(parameters):
+    """NULL for every parameter, in the shape the driver expects"""
+    if isinstance(parameters, dict):
+        return {key: None for key in parameters}
+    return tuple(None for _ in (parameters or ()))
+
+
+def explain(engine, statement, parameters):
+    """Query plan for a SELECT with ``parameters`` (values don't matter, see
+    _unbound). Runs on a pooled connection of its own, never the one of the
+    request that was slow, and on a raw cursor so no events fire."""
+    if statement.lstrip()[:6].upper() not in ('SELECT', 'WITH'):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        # Back to the pool, which rolls back whatever a failed EXPLAIN left
+        connection.close()
+
+
+class SlowQueryLog:
+    """Bounded ring buffer of statements slower than ``threshold`` seconds"""
+
+    def __init__(self, threshold, maxlen):
+        self.threshold = threshold
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, conn, statement, parameters, elapsed, executemany):
+        route = None
+        if has_request_context():
+            route = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        # Only the parameters' types are kept; the plan is worked out later,
+        # outside the request, when someone looks at it (see grouped)
+        entry = {
+            'at': datetime.now(),
+            'sql': statement,
+            'normalized': normalize_sql(statement),
+            'params': f'{len(parameters)} parameter sets' if executemany else _redact(parameters),
+            'route': route,
+            'duration_ms': round(elapsed * 1000, 2),
+            'plan': None,
+            '_explain': None if executemany else (conn.engine, _unbound(parameters)),
+        }
+        with self._lock:
+            self._entries.append(entry)
+        logger.warning(f"Slow query ({entry['duration_ms']}ms) on {route or 'no request'}: {statement[:300]}")
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def plan(self, entry):
+        """Query plan of ``entry``, computed on first use"""
+        if entry['_explain'] is not None:
+            engine, parameters = entry['_explain']
+            entry['plan'] = explain(engine, entry['sql'], parameters)
+            entry['_explain'] = None
+        return entry['plan']
+
+    def grouped(self):
+        """Entries grouped by normalized statement, most total time first,
+        with the plan of each group's latest entry"""
+        groups = {}
+        for entry in self.entries():
+            group = groups.setdefault(entry['normalized'], {
+                'normalized': entry['normalized'], 'count': 0, 'total_ms': 0.0,
+                'max_ms': 0.0, 'routes': set(), 'latest': None,
+            })
+            group['count'] += 1
+            group['total_ms'] += entry['duration_ms']
+            group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+            if entry['route']:
+                group['routes'].add(entry['route'])
+            group['latest'] = entry
+        for group in groups.values():
+            group['total_ms'] = round(group['total_ms'], 2)
+            group['routes'] = sorted(group['routes'])
+            self.plan(group['latest'])
+        return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = SlowQueryLog(SLOW_QUERY_MS / 1000, SLOW_QUERY_BUFFER)
+
+
+def current_stats():
+    """RequestStats for the active request, or None outside a request"""
+    if not has_request_context():
+        return None
+    return g.get('_request_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record_query(statement, elapsed)
+    if slow_queries.threshold and elapsed >= slow_queries.threshold:
+        slow_queries.record(conn, statement, parameters, elapsed, executemany)
+
+
+def _before_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None:
+        stats._template_starts.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None and stats._template_starts:
+        stats.template_time += time.perf_counter() - stats._template_starts.pop()
+
+
+def _start_request():
+    g._request_stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+
+    total = time.perf_counter() - stats.started
+    response.headers['Server-Timing'] = stats.server_timing(total)
+
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total * 1000, 2),
+        'db_count': stats.db_count,
+        'db_ms': round(stats.db_time * 1000, 2),
+        'db_slowest_ms': round(stats.slowest_time * 1000, 2),
+        'db_slowest_sql': (stats.slowest_sql or '')[:300] or None,
+        'template_ms': round(stats.template_time * 1000, 2),
+    }))
+    return response
+
+
+def enable_collection(app):
+    """Collect RequestStats for every request without reporting them
+
+    Used by other modules (e.g. metrics) that need DB timings; safe to call
+    more than once.
+    """
+    if app.extensions.get('request_stats'):
+        return
+    app.extensions['request_stats'] = True
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+
+
+def init_instrumentation(app, enabled=ENABLED):
+    """Register the SQL and template timing hooks on ``app`` when enabled"""
+    if not enabled:
+        return False
+
+    enable_collection(app)
+    app.after_request(_finish_request)
+    return True
@@ -1,5 +1,16 @@
 from app import app
 import routes  # noqa: F401
+import api  # noqa: F401
+import feeds  # noqa: F401
+import suggest  # noqa: F401
+import cli  # noqa: F401
 
 if __name__ == "__main__":
+    import os
+    from scheduler import start_scheduler
+
+    # Periodic GitHub sync, enabled by GITHUB_SYNC_INTERVAL; under gunicorn it
+    # is started by gunicorn.conf.py. With the reloader only the child serves.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_scheduler(app)
     app.run(host="0.0.0.0", port=5000, debug=True)
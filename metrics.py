@@ -0,0 +1,316 @@
+"""
+Prometheus metrics for the portfolio app
+Each process (gunicorn worker, sync runner) keeps its counters and histograms
+in memory and periodically writes a snapshot to METRICS_DIR/<host>-<pid>.json;
+/metrics adds up every snapshot, so the numbers are correct no matter which
+worker answers the scrape. Snapshots of processes that have exited are folded
+into archive.json so totals stay monotonic.
+
+Request metrics are labelled with the route template (/project/<int:id>),
+never the raw path, to keep label cardinality bounded. Request counters and
+latencies cost a few dict updates; per-request SQL time and statement counts
+need the cursor hooks from instrumentation.py and are only recorded with
+METRICS_DB_TIMING=1 (or when SQL_INSTRUMENTATION=1 installs them anyway).
+
+/metrics answers with METRICS_TOKEN as a bearer token, or without one only to
+requests from this host, unless METRICS_PUBLIC=1.
+"""
+import os
+import json
+import time
+import atexit
+import socket
+import logging
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from flask import Response, request, abort
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics')
+)
+# Bearer token for /metrics; without it only local scrapers are answered
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '').lower() in ('1', 'true', 'yes')
+DB_TIMING = os.environ.get('METRICS_DB_TIMING', '').lower() in ('1', 'true', 'yes')
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests by route template, method and status', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by route template', LATENCY_BUCKETS),
+    'http_request_db_seconds': ('histogram', 'Time spent in SQL per request by route template', LATENCY_BUCKETS),
+    'http_request_db_statements_total': ('counter', 'SQL statements executed by route template', None),
+    'cache_requests_total': ('counter', 'Cache lookups by cache name and result (hit/miss)', None),
+    'rate_limited_total': ('counter', 'Requests rejected with 429 by rate limit name', None),
+    'password_hash_rejected_total': ('counter', 'Password hashes refused because the hashing pool was full', None),
+    'job_duration_seconds': ('histogram', 'Background job and upload durations by job and status', JOB_BUCKETS),
+}
+
+
+def _label_key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+class Registry:
+    """In-process metric values; one short lock per update"""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # bucket counts (non-cumulative), then sum and count
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    values[i] += 1
+                    break
+            values[-2] += value
+            values[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': {name: dict(series) for name, series in self._counters.items()},
+                'histograms': {name: {key: list(values) for key, values in series.items()}
+                               for name, series in self._histograms.items()},
+            }
+
+    def _path(self, pid=None):
+        return os.path.join(self.directory, f'{socket.gethostname()}-{pid or os.getpid()}.json')
+
+    def flush(self, force=False):
+        """Write this process's snapshot, at most once per FLUSH_INTERVAL"""
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            _write_json(self._path(), self.snapshot())
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+
+def _write_json(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(total, snapshot):
+    for name, series in snapshot.get('counters', {}).items():
+        merged = total['counters'].setdefault(name, {})
+        for key, value in series.items():
+            merged[key] = merged.get(key, 0) + value
+    for name, series in snapshot.get('histograms', {}).items():
+        merged = total['histograms'].setdefault(name, {})
+        for key, values in series.items():
+            if key in merged:
+                merged[key] = [a + b for a, b in zip(merged[key], values)]
+            else:
+                merged[key] = list(values)
+    return total
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _compact_dead_snapshots(directory):
+    """Fold snapshots of exited processes on this host into archive.json"""
+    prefix = f'{socket.gethostname()}-'
+    dead = []
+    for filename in os.listdir(directory):
+        if filename.startswith(prefix) and filename.endswith('.json'):
+            pid = filename[len(prefix):-5]
+            if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                dead.append(os.path.join(directory, filename))
+    if not dead:
+        return
+
+    with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            archive_path = os.path.join(directory, 'archive.json')
+            archive = _read_json(archive_path) or {'counters': {}, 'histograms': {}}
+            merged_paths = []
+            for path in dead:
+                snapshot = _read_json(path)
+                if snapshot is not None:
+                    _merge(archive, snapshot)
+                    merged_paths.append(path)
+            _write_json(archive_path, archive)
+            for path in merged_paths:
+                os.remove(path)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def collect(reg=None):
+    """Aggregate every process's snapshot plus this process's live values"""
+    reg = reg or registry
+    reg.flush(force=True)
+    total = {'counters': {}, 'histograms': {}}
+    try:
+        _compact_dead_snapshots(reg.directory)
+        filenames = os.listdir(reg.directory)
+    except OSError:
+        filenames = []
+    for filename in filenames:
+        if filename.endswith('.json'):
+            snapshot = _read_json(os.path.join(reg.directory, filename))
+            if snapshot:
+                _merge(total, snapshot)
+    return total
+
+
+def _format_labels(key, extra=None):
+    items = json.loads(key) + (extra or [])
+    if not items:
+        return ''
+    escaped = []
+    for name, value in items:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_text(total):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for key, value in sorted(total['counters'].get(name, {}).items()):
+                lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+        else:
+            for key, values in sorted(total['histograms'].get(name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(key, [["le", bound]])} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(key, [["le", "+Inf"]])} {values[-1]}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(float(values[-2]))}')
+                lines.append(f'{name}_count{_format_labels(key)} {values[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def inc(name, amount=1, **labels):
+    if ENABLED:
+        registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    if ENABLED:
+        registry.observe(name, value, **labels)
+
+
+def _start_timer():
+    request._metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = getattr(request, '_metrics_started', None)
+    if started is None:
+        return response
+
+    from instrumentation import current_stats
+
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - started
+    registry.inc('http_requests_total', endpoint=endpoint, method=request.method, status=str(response.status_code))
+    registry.observe('http_request_duration_seconds', elapsed, endpoint=endpoint, method=request.method)
+
+    stats = current_stats()
+    if stats is not None:
+        registry.observe('http_request_db_seconds', stats.db_time, endpoint=endpoint)
+        registry.inc('http_request_db_statements_total', stats.db_count, endpoint=endpoint)
+
+    registry.flush()
+    return response
+
+
+def metrics_view():
+    if METRICS_TOKEN:
+        if request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            abort(403)
+    elif not METRICS_PUBLIC and request.remote_addr not in LOCAL_ADDRESSES:
+        abort(403)
+    return Response(render_text(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app, enabled=ENABLED, db_timing=DB_TIMING):
+    """Record request metrics and expose them at /metrics"""
+    if not enabled:
+        return False
+
+    if db_timing:
+        from instrumentation import enable_collection
+
+        enable_collection(app)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    return True
+
+
+# Short-lived processes such as the sync runner publish their numbers on exit
+if ENABLED:
+    atexit.register(registry.flush, force=True)
@@ -2,7 +2,9 @@ from datetime import datetime
 from app import db
 from flask_dance.consumer.storage.sqla import OAuthConsumerMixin
 from flask_login import UserMixin
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, select, func, update, insert, delete, event, inspect, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 # (IMPORTANT) This table is mandatory for Replit Auth, don't drop it.
 class User(UserMixin, db.Model):
@@ -36,18 +38,22 @@ class User(UserMixin, db.Model):
             return self.email.split('@')[0]
         return "Anonymous User"
     
-    def set_password(self, password):
-        from werkzeug.security import generate_password_hash
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, wait=False):
+        from passwords import hash_password
+        self.password_hash = hash_password(password, wait=wait)
     
     def check_password(self, password):
-        from werkzeug.security import check_password_hash
+        from passwords import verify_password
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        from passwords import needs_rehash
+        return bool(self.password_hash) and needs_rehash(self.password_hash)
     
     @staticmethod
-    def create_local_user(email, password, first_name=None, last_name=None, is_admin=False):
+    def create_local_user(email, password, first_name=None, last_name=None, is_admin=False, wait=False):
         import uuid
         user = User()
         user.id = str(uuid.uuid4())
@@ -56,7 +62,7 @@ class User(UserMixin, db.Model):
         user.last_name = last_name
         user.auth_type = 'local'
         user.is_admin = is_admin
-        user.set_password(password)
+        user.set_password(password, wait=wait)
         return user
 
 # (IMPORTANT) This table is mandatory for Replit Auth, don't drop it.
@@ -86,6 +92,60 @@ class Category(db.Model):
     def __repr__(self):
         return f'<Category {self.name}>'
 
+# Many-to-many between projects and technologies; the primary key serves
+# lookups by project, the index lookups by technology
+project_technologies = db.Table(
+    'project_technologies',
+    db.Column('project_id', db.Integer, db.ForeignKey('projects.id'), primary_key=True),
+    db.Column('technology_id', db.Integer, db.ForeignKey('technologies.id'), primary_key=True),
+    db.Index('ix_project_technologies_technology_id', 'technology_id', 'project_id'),
+)
+
+
+def split_technologies(value):
+    """'Python, Flask,,python' -> ['Python', 'Flask'], first spelling of each wins"""
+    names = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())
+        if name and Technology.slugify(name) not in names:
+            names[Technology.slugify(name)] = name
+    return list(names.values())
+
+
+class Technology(db.Model):
+    __tablename__ = 'technologies'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)  # lower-cased name, used in ?tech=
+
+    def __repr__(self):
+        return f'<Technology {self.name}>'
+
+    @staticmethod
+    def slugify(name):
+        return ' '.join(name.split()).lower()
+
+    @classmethod
+    def ids_for(cls, names):
+        """slug -> id for ``names`` (slug -> display name), creating missing rows"""
+        def lookup(slugs):
+            ids = {}
+            for start in range(0, len(slugs), 500):
+                ids.update(db.session.execute(
+                    select(cls.slug, cls.id).where(cls.slug.in_(slugs[start:start + 500]))).all())
+            return ids
+        
+        ids = lookup(list(names))
+        missing = [slug for slug in names if slug not in ids]
+        if missing:
+            # Another worker may add the same slug between the lookup and the
+            # insert; its row is kept and picked up by the second lookup
+            db.session.execute(sqlite_insert(cls).on_conflict_do_nothing(index_elements=[cls.slug]),
+                               [{'slug': slug, 'name': names[slug]} for slug in missing])
+            ids.update(lookup(missing))
+        return ids
+
+
 class Project(db.Model):
     __tablename__ = 'projects'
     id = db.Column(db.Integer, primary_key=True)
@@ -94,11 +154,13 @@ class Project(db.Model):
     content = db.Column(db.Text)  # Detailed content/overview
     image_url = db.Column(db.String(500))
     deployed_url = db.Column(db.String(500))
-    github_url = db.Column(db.String(500))
+    github_url = db.Column(db.String(500), index=True)
     technologies = db.Column(db.String(500))  # Comma-separated list
     is_published = db.Column(db.Boolean, default=False)
     is_featured = db.Column(db.Boolean, default=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
+    # Approved comments, kept up to date by the listeners below Comment
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
@@ -106,28 +168,131 @@ class Project(db.Model):
     # Relationships
     comments = db.relationship('Comment', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='project', lazy='dynamic', cascade='all, delete-orphan')
+    # Rebuilt from the technologies column by sync_technologies(); the
+    # relationship is here so deleting a project removes its links
+    technology_tags = db.relationship('Technology', secondary=project_technologies,
+                                      backref=db.backref('projects', lazy='dynamic'))
+
+    # Published listings and the API's keyset pagination, newest first
+    __table_args__ = (db.Index('ix_projects_is_published_created_at', 'is_published', 'created_at'),)
+
+    # Filled in by with_counts() so listings don't run a COUNT per project
+    _like_count = None
 
     def __repr__(self):
         return f'<Project {self.title}>'
 
+    @classmethod
+    def with_counts(cls, query):
+        """Run a Project query, loading like counts in the same SELECT"""
+        like_count = select(func.count(Like.id)).where(Like.project_id == cls.id).scalar_subquery()
+        
+        projects = []
+        for project, likes in query.add_columns(like_count):
+            project._like_count = likes
+            projects.append(project)
+        return projects
+
+    @classmethod
+    def recount_comments(cls):
+        """Recompute comment_count from the comments table, for rows written
+        around the session (schema upgrades, bulk imports)"""
+        approved = select(func.count(Comment.id)) \
+            .where(Comment.project_id == cls.id, Comment.is_approved.is_(True)).scalar_subquery()
+        db.session.execute(update(cls.__table__).values(comment_count=approved, updated_at=cls.__table__.c.updated_at))
+
     @property
     def like_count(self):
+        if self._like_count is not None:
+            return self._like_count
         return self.likes.count()
 
-    @property
-    def comment_count(self):
-        return self.comments.count()
-
     def is_liked_by(self, user):
-        if not user or not user.is_authenticated:
-            return False
-        return self.likes.filter_by(user_id=user.id).first() is not None
+        return self.id in Project.liked_ids(user, [self.id])
+
+    @staticmethod
+    def liked_ids(user, project_ids):
+        """Ids among ``project_ids`` that ``user`` has liked, in one query"""
+        if not user or not user.is_authenticated or not project_ids:
+            return set()
+        project_ids = set(project_ids)
+        query = select(Like.project_id).where(Like.user_id == user.id)
+        # Long listings would exceed SQLite's bound parameter limit; the
+        # user's own likes are then the smaller set to read
+        if len(project_ids) <= 500:
+            query = query.where(Like.project_id.in_(project_ids))
+        return set(db.session.scalars(query)) & project_ids
+
+    @classmethod
+    def sync_technologies(cls, project_ids=None):
+        """Rebuild the project_technologies links of the given projects (all
+        when None) from their technologies column; a handful of set-based
+        statements per 500 projects"""
+        if project_ids is None:
+            project_ids = db.session.scalars(select(cls.id)).all()
+        project_ids = list(project_ids)
+        
+        for start in range(0, len(project_ids), 500):
+            batch = project_ids[start:start + 500]
+            rows = db.session.execute(select(cls.id, cls.technologies).where(cls.id.in_(batch))).all()
+            names = {row.id: split_technologies(row.technologies) for row in rows}
+            technology_ids = Technology.ids_for({
+                Technology.slugify(name): name for project_names in names.values() for name in project_names
+            })
+            
+            db.session.execute(delete(project_technologies).where(project_technologies.c.project_id.in_(batch)))
+            links = [{'project_id': project_id, 'technology_id': technology_ids[Technology.slugify(name)]}
+                     for project_id, project_names in names.items() for name in project_names]
+            if links:
+                db.session.execute(insert(project_technologies), links)
+
+    @staticmethod
+    def tagged_with(tech):
+        """Ids of projects tagged with ``tech`` (exact, case-insensitive), for Project.id.in_()"""
+        return select(project_technologies.c.project_id) \
+            .join(Technology, Technology.id == project_technologies.c.technology_id) \
+            .where(Technology.slug == Technology.slugify(tech))
+
+    @classmethod
+    def listing_filters(cls, category_id=None, search='', tech=''):
+        """WHERE clauses for the /projects filters, keyed by filter name so
+        facet counts can leave their own filter out"""
+        filters = {}
+        if category_id:
+            filters['category'] = cls.category_id == category_id
+        if tech:
+            filters['tech'] = cls.id.in_(cls.tagged_with(tech))
+        if search:
+            # Technologies match exactly, so "Java" doesn't find JavaScript projects
+            filters['search'] = or_(
+                cls.title.contains(search),
+                cls.description.contains(search),
+                cls.id.in_(cls.tagged_with(search))
+            )
+        return filters
 
     @property
     def tech_list(self):
-        if self.technologies:
-            return [tech.strip() for tech in self.technologies.split(',')]
-        return []
+        # Templates read this several times per card; split once per value
+        cached = self.__dict__.get('_tech_list')
+        if cached is None or cached[0] != self.technologies:
+            cached = (self.technologies, split_technologies(self.technologies))
+            self.__dict__['_tech_list'] = cached
+        return cached[1]
+
+class RelatedProject(db.Model):
+    """Precomputed neighbours of a project, best first; maintained by related.py"""
+    __tablename__ = 'related_projects'
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    related_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+    # Finding the lists a changed project appears in
+    __table_args__ = (db.Index('ix_related_projects_related_id', 'related_id'),)
+
+    def __repr__(self):
+        return f'<RelatedProject {self.project_id} #{self.rank}: {self.related_id}>'
 
 class Achievement(db.Model):
     __tablename__ = 'achievements'
@@ -145,6 +310,8 @@ class Achievement(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
+    __table_args__ = (db.Index('ix_achievements_is_published_date_achieved', 'is_published', 'date_achieved'),)
+
     def __repr__(self):
         return f'<Achievement {self.title}>'
 
@@ -154,18 +321,58 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
-    is_approved = db.Column(db.Boolean, default=True)  # For moderation if needed
+    # For moderation if needed; the old value is loaded on change so the counter can follow it
+    is_approved = db.column_property(db.Column(db.Boolean, default=True), active_history=True)
     
     created_at = db.Column(db.DateTime, default=datetime.now)
 
+    # A project's thread in date order
+    __table_args__ = (db.Index('ix_comments_project_id_created_at', 'project_id', 'created_at'),)
+
     def __repr__(self):
         return f'<Comment by {self.user_id} on Project {self.project_id}>'
 
+
+def _count_deleted_comments(session, flush_context, instances):
+    """Deleted and (un)approved comments; their state is gone after the flush"""
+    deltas = session.info['comment_count_deltas'] = {}
+    for obj in session.deleted:
+        if isinstance(obj, Comment) and obj.is_approved is not False:
+            deltas[obj.project_id] = deltas.get(obj.project_id, 0) - 1
+    for obj in session.dirty:
+        if isinstance(obj, Comment):
+            history = inspect(obj).attrs.is_approved.history
+            if history.deleted:
+                was_approved, approved = history.deleted[0] is not False, obj.is_approved is not False
+                if was_approved != approved:
+                    deltas[obj.project_id] = deltas.get(obj.project_id, 0) + (1 if approved else -1)
+
+
+def _apply_comment_counts(session, flush_context):
+    """New comments only have a project_id once inserted, so they are counted here"""
+    deltas = session.info.pop('comment_count_deltas', {})
+    for obj in session.new:
+        if isinstance(obj, Comment) and obj.is_approved is not False:
+            deltas[obj.project_id] = deltas.get(obj.project_id, 0) + 1
+
+    projects = Project.__table__
+    for project_id, delta in deltas.items():
+        if delta and project_id is not None:
+            # Keep updated_at: a new comment is not an edit of the project
+            session.connection().execute(
+                update(projects).where(projects.c.id == project_id)
+                .values(comment_count=projects.c.comment_count + delta, updated_at=projects.c.updated_at)
+            )
+
+
+event.listen(Session, 'before_flush', _count_deleted_comments)
+event.listen(Session, 'after_flush', _apply_comment_counts)
+
 class Like(db.Model):
     __tablename__ = 'likes'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
     
     created_at = db.Column(db.DateTime, default=datetime.now)
 
@@ -208,3 +415,89 @@ class Education(db.Model):
 
     def __repr__(self):
         return f'<Education {self.institution} - {self.degree}>'
+
+class SyncJob(db.Model):
+    __tablename__ = 'sync_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, default='github')
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed, skipped
+    processed = db.Column(db.Integer, default=0)
+    inserted = db.Column(db.Integer, default=0)
+    updated = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    message = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<SyncJob {self.id} {self.status}>'
+
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or datetime.now()
+        return round((end - self.started_at).total_seconds(), 1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'processed': self.processed or 0,
+            'inserted': self.inserted or 0,
+            'updated': self.updated or 0,
+            'failed': self.failed or 0,
+            'message': self.message,
+            'elapsed_seconds': self.elapsed_seconds,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+class GitHubSyncState(db.Model):
+    __tablename__ = 'github_sync_state'
+    username = db.Column(db.String(100), primary_key=True)
+    last_synced_at = db.Column(db.DateTime)  # last successful sync of this account
+    last_full_sync_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<GitHubSyncState {self.username}>'
+
+class GitHubRepoState(db.Model):
+    __tablename__ = 'github_repo_state'
+    # GitHub's numeric repo id survives renames, unlike the URL
+    repo_id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    owner = db.Column(db.String(100), nullable=False, index=True)
+    full_name = db.Column(db.String(200), nullable=False)
+    html_url = db.Column(db.String(500), nullable=False)
+    # Watermarks exactly as returned by the GitHub API (ISO 8601 strings)
+    repo_pushed_at = db.Column(db.String(40))
+    repo_updated_at = db.Column(db.String(40))
+
+    def __repr__(self):
+        return f'<GitHubRepoState {self.full_name}>'
+
+class Lease(db.Model):
+    __tablename__ = 'leases'
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)  # host:pid of the worker holding it
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<Lease {self.name} held by {self.holder}>'
+
+class ContentVersion(db.Model):
+    __tablename__ = 'content_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every change to public content
+    changed_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f'<ContentVersion {self.name} v{self.version}>'
@@ -0,0 +1,132 @@
+"""
+Password hashing
+scrypt and pbkdf2 are deliberately slow, so a login burst must not be able to
+tie up every gunicorn worker. Each hash first takes one of PASSWORD_HASH_SLOTS
+slots shared by all processes on the host (a lock file per slot under
+instance/password-hash-slots, held with flock; the kernel drops it if the
+process dies). When every slot is taken, HashingBusy is raised and the request
+gets a 503 right away instead of waiting. The default is half the gunicorn
+workers (WEB_CONCURRENCY, exported by gunicorn.conf.py), at least one, so
+other pages keep being served during a burst. Inside a process the hash runs
+on a small thread pool (OpenSSL releases the GIL while hashing).
+
+PASSWORD_HASH_METHOD takes werkzeug's method string, e.g. scrypt:32768:8:1
+(the default) or pbkdf2:sha256:600000. Stored hashes made with other
+parameters still verify; login replaces them (see needs_rehash).
+"""
+import os
+import fcntl
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+SLOTS = int(os.environ.get('PASSWORD_HASH_SLOTS', max(1, int(os.environ.get('WEB_CONCURRENCY', 1)) // 2)))
+SLOT_DIR = os.environ.get('PASSWORD_HASH_SLOT_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'instance', 'password-hash-slots')
+
+
+class HashingBusy(ServiceUnavailable):
+    """Every hashing slot is taken"""
+
+    def __init__(self):
+        super().__init__(retry_after=1)
+
+
+class HostSlots:
+    """Counting semaphore shared by every process on the host: ``count`` lock
+    files in ``directory``, one flock per holder"""
+
+    def __init__(self, directory=SLOT_DIR, count=SLOTS):
+        self.directory = directory
+        self.count = count
+
+    def _open(self, slot):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.open(os.path.join(self.directory, f'slot-{slot}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+
+    def acquire(self, wait=False):
+        """A held slot (pass it to release), or None if all are taken and
+        ``wait`` is false"""
+        for slot in range(self.count):
+            fd = self._open(slot)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        if not wait:
+            return None
+        fd = self._open(0)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def release(self, fd):
+        # Closing the descriptor drops its lock
+        os.close(fd)
+
+
+class HashPool:
+    """Runs hashes on a thread pool once a host-wide slot is held; refuses
+    work instead of queueing when there is none"""
+
+    def __init__(self, workers=WORKERS, slots=None):
+        self.workers = workers
+        self.slots = slots or HostSlots()
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Threads don't survive a fork; start the pool in the process using it
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, fn, *args, wait=False):
+        """``fn(*args)`` under a slot; with ``wait`` block for one rather than
+        raise HashingBusy (for scripts and start-up, never for requests)"""
+        slot = self.slots.acquire(wait=wait)
+        if slot is None:
+            metrics.inc('password_hash_rejected_total')
+            logger.warning("Password hashing slots all taken, rejecting request")
+            raise HashingBusy()
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self.slots.release(slot)
+
+
+pool = HashPool()
+
+
+def hash_password(password, wait=False):
+    return pool.run(generate_password_hash, password, METHOD, wait=wait)
+
+
+def verify_password(password_hash, password):
+    return pool.run(check_password_hash, password_hash, password)
+
+
+_current_prefix = None
+
+
+def needs_rehash(password_hash):
+    """True if ``password_hash`` was made with other parameters than METHOD;
+    the first call hashes once, through the pool"""
+    global _current_prefix
+    if _current_prefix is None:
+        # werkzeug fills in defaults ('scrypt' -> 'scrypt:32768:8:1'); read them off a real hash
+        _current_prefix = pool.run(generate_password_hash, '', METHOD).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _current_prefix
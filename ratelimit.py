@@ -0,0 +1,203 @@
+"""
+Token-bucket rate limiting for write and auth endpoints
+Each limited endpoint has a bucket per client IP and, for logged-in users,
+one per user. A bucket holds up to ``capacity`` tokens and refills at
+capacity / period. A request takes one token from every bucket that applies,
+or none at all if one of them is empty: it then gets a 429 with Retry-After,
+and the other buckets are left alone, so requests refused on an attacker's
+IP don't eat into the account's own budget.
+
+The client IP is request.remote_addr, which only comes from X-Forwarded-For
+for as many proxies as TRUSTED_PROXIES says (see app.py).
+
+Buckets live in the worker's memory by default. With several workers set
+RATELIMIT_STORAGE=sqlite (or sqlite:///path/to/file.db) so that all of them
+share one small SQLite file next to the app database. RATELIMIT_ENABLED=0
+turns limiting off.
+
+    @app.route('/project/<int:id>/comment', methods=['POST'])
+    @rate_limit('comment', per_user='5/minute', per_ip='20/minute')
+    def add_comment(id): ...
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from functools import wraps
+
+from flask import request
+from flask_login import current_user
+from werkzeug.exceptions import TooManyRequests
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') != '0'
+STORAGE = os.environ.get('RATELIMIT_STORAGE', 'memory')
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+PRUNE_EVERY = 1000  # consume() calls between sweeps of idle buckets
+
+
+def parse_limit(limit):
+    """'5/minute' -> (capacity, tokens refilled per second)"""
+    count, _, period = limit.partition('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period.strip().rstrip('s')]
+
+
+def _take(tokens, updated, now, capacity, refill):
+    """Refill a bucket up to ``now`` and take a token if there is one.
+    Returns (allowed, tokens left, seconds until the next token)"""
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / refill
+
+
+def _take_all(states, buckets, now):
+    """Refill every bucket and take a token from each if all have one.
+    ``states`` holds the stored (tokens, updated) per key, or None for a new
+    bucket. Returns (allowed, {key: tokens left} to store, seconds to wait)"""
+    results = {}
+    retry_after = 0.0
+    for key, capacity, refill in buckets:
+        tokens, updated = states.get(key) or (capacity, now)
+        allowed, tokens, wait = _take(tokens, updated, now, capacity, refill)
+        results[key] = tokens
+        if not allowed:
+            retry_after = max(retry_after, wait)
+    if retry_after:
+        return False, {}, retry_after
+    return True, results, 0.0
+
+
+class MemoryStore:
+    """Buckets in a dict; limits are per worker process"""
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def consume(self, buckets):
+        """Take a token from every (key, capacity, refill) bucket, or from none;
+        returns (allowed, retry_after)"""
+        now = self.clock()
+        with self._lock:
+            states = {key: self._buckets.get(key) for key, _, _ in buckets}
+            allowed, taken, retry_after = _take_all(states, buckets, now)
+            for key, tokens in taken.items():
+                self._buckets[key] = (tokens, now)
+
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now):
+        # A bucket idle for a day is full again for any limit used here
+        cutoff = now - PERIODS['day']
+        for key in [key for key, (_, updated) in self._buckets.items() if updated < cutoff]:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteStore:
+    """Buckets in a SQLite file shared by every worker on the host; each
+    take is one short IMMEDIATE transaction, so workers never race"""
+    clock = staticmethod(time.time)
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connection(self):
+        # One connection per thread, and new ones after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS buckets '
+                               '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def consume(self, buckets):
+        connection = self._connection()
+        now = self.clock()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            states = {}
+            for key, _, _ in buckets:
+                states[key] = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?',
+                                                 (key,)).fetchone()
+            allowed, taken, retry_after = _take_all(states, buckets, now)
+            connection.executemany('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                                   [(key, tokens, now) for key, tokens in taken.items()])
+
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                connection.execute('DELETE FROM buckets WHERE updated < ?', (now - PERIODS['day'],))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+    def clear(self):
+        self._connection().execute('DELETE FROM buckets')
+
+
+def create_store(storage=STORAGE):
+    if storage == 'memory':
+        return MemoryStore()
+    if storage == 'sqlite' or storage.startswith('sqlite:///'):
+        path = storage[len('sqlite:///'):] if storage != 'sqlite' else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'instance', 'ratelimit.db')
+        return SQLiteStore(path)
+    raise ValueError(f'Unknown RATELIMIT_STORAGE: {storage}')
+
+
+store = create_store()
+
+
+def check(name, per_user=None, per_ip=None):
+    """Take a token from each bucket that applies, or from none of them;
+    raises TooManyRequests with the longest wait among the empty ones"""
+    buckets = []
+    if per_user and current_user.is_authenticated:
+        buckets.append((f'{name}:user:{current_user.id}', *parse_limit(per_user)))
+    if per_ip:
+        buckets.append((f'{name}:ip:{request.remote_addr}', *parse_limit(per_ip)))
+    if not buckets:
+        return
+
+    allowed, retry_after = store.consume(buckets)
+    if not allowed:
+        metrics.inc('rate_limited_total', limit=name)
+        logger.warning(f"Rate limit {name} hit by {request.remote_addr}, retry in {retry_after:.1f}s")
+        raise TooManyRequests(retry_after=max(1, int(retry_after + 0.999)))
+
+
+def rate_limit(name, per_user=None, per_ip=None, methods=('POST',)):
+    """Limit a view; only requests with one of ``methods`` (POST by default,
+    so rendering a login form is free) take tokens"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if ENABLED and request.method in methods:
+                check(name, per_user=per_user, per_ip=per_ip)
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
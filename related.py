@@ -0,0 +1,221 @@
+"""
+Related projects
+The project page lists the published projects most similar to the one shown:
+the Jaccard index of their technology sets, plus CATEGORY_WEIGHT when they
+share a category. The RELATED_PROJECTS best neighbours of every project are
+computed ahead of time into the related_projects table, so a page view reads
+a handful of rows by primary key instead of comparing against every project.
+
+Candidates come from inverted indexes (technology -> projects, the
+project_technologies table, and category -> projects), so scoring a project
+only looks at the projects it has something in common with. When projects
+change, update_related() recomputes their lists and patches the lists of
+their candidates: a neighbour is merged in when it now beats the last entry,
+and a list is only recomputed from scratch when one of its entries changed.
+It only loads the projects that share a technology or the category with the
+ones it recomputes, so an admin save doesn't read the whole catalog.
+"""
+import os
+import time
+import heapq
+import logging
+from itertools import chain
+from collections import Counter, defaultdict
+
+from sqlalchemy import select, insert, delete, or_
+from sqlalchemy.orm import joinedload
+
+from app import db
+from models import Project, RelatedProject, project_technologies
+
+logger = logging.getLogger(__name__)
+
+K = int(os.environ.get('RELATED_PROJECTS', 6))
+CATEGORY_WEIGHT = 0.25
+
+
+class Catalog:
+    """Technology sets and categories of the published projects, with the
+    inverted indexes used to find candidates"""
+
+    def __init__(self, techs, categories):
+        self.techs = techs  # project id -> frozenset of technology ids
+        self.categories = categories  # project id -> category id or None
+        self.by_tech = defaultdict(set)
+        self.by_category = defaultdict(set)
+        for project_id, technology_ids in techs.items():
+            for technology_id in technology_ids:
+                self.by_tech[technology_id].add(project_id)
+            if categories[project_id] is not None:
+                self.by_category[categories[project_id]].add(project_id)
+
+    @classmethod
+    def load(cls, around=None):
+        """Every published project, or with ``around`` only those sharing a
+        technology or the category with one of these ids (and the ids
+        themselves): enough for candidates() and neighbors() of ``around``"""
+        techs = defaultdict(set)
+        categories = {}
+        query = select(Project.id, Project.category_id, project_technologies.c.technology_id) \
+            .outerjoin(project_technologies, project_technologies.c.project_id == Project.id) \
+            .where(Project.is_published.is_(True))
+        if around is not None:
+            around = list(around)
+            shared_techs = select(project_technologies.c.technology_id) \
+                .where(project_technologies.c.project_id.in_(around))
+            shared_categories = select(Project.category_id) \
+                .where(Project.id.in_(around), Project.category_id.isnot(None))
+            query = query.where(or_(
+                Project.id.in_(around),
+                Project.id.in_(select(project_technologies.c.project_id)
+                               .where(project_technologies.c.technology_id.in_(shared_techs))),
+                Project.category_id.in_(shared_categories),
+            ))
+        rows = db.session.execute(query)
+        for project_id, category_id, technology_id in rows:
+            categories[project_id] = category_id
+            if technology_id is not None:
+                techs[project_id].add(technology_id)
+        return cls({project_id: frozenset(techs[project_id]) for project_id in categories}, categories)
+
+    def __contains__(self, project_id):
+        return project_id in self.categories
+
+    def score(self, a, b):
+        techs_a, techs_b = self.techs[a], self.techs[b]
+        union = len(techs_a | techs_b)
+        score = len(techs_a & techs_b) / union if union else 0.0
+        if self.categories[a] is not None and self.categories[a] == self.categories[b]:
+            score += CATEGORY_WEIGHT
+        return score
+
+    def candidates(self, project_id):
+        """Projects sharing a technology or the category with ``project_id``"""
+        found = set(chain.from_iterable(self.by_tech[technology_id] for technology_id in self.techs[project_id]))
+        category = self.categories[project_id]
+        if category is not None:
+            found |= self.by_category[category]
+        found.discard(project_id)
+        return found
+
+    def neighbors(self, project_id, k=K):
+        """The ``k`` best [(score, id)] for ``project_id``, best first; ties go to the newer project"""
+        techs = self.techs[project_id]
+        category = self.categories[project_id]
+        best = []  # min-heap of the k best so far
+
+        def offer(entry):
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        shared = Counter(chain.from_iterable(self.by_tech[technology_id] for technology_id in techs))
+        shared.pop(project_id, None)
+        same_category = self.by_category[category] if category is not None else ()
+        for other, count in shared.most_common():
+            if len(best) == k:
+                # With ``count`` shared technologies the Jaccard index is at most count / len(techs)
+                bound = count / len(techs)
+                if bound + CATEGORY_WEIGHT < best[0][0]:
+                    break
+                if bound < best[0][0] and other not in same_category:
+                    continue
+            score = count / (len(techs) + len(self.techs[other]) - count)
+            if other in same_category:
+                score += CATEGORY_WEIGHT
+            offer((score, other))
+
+        if category is not None and (len(best) < k or CATEGORY_WEIGHT >= best[0][0]):
+            # Same category, no technology in common: all score CATEGORY_WEIGHT
+            for other in sorted(self.by_category[category] - shared.keys() - {project_id}, reverse=True):
+                if len(best) == k and (CATEGORY_WEIGHT, other) < best[0]:
+                    break
+                offer((CATEGORY_WEIGHT, other))
+
+        return sorted(best, reverse=True)
+
+
+def _load_lists(project_ids=None):
+    """Stored lists as {project_id: [(score, related_id)]}, best first"""
+    query = select(RelatedProject.project_id, RelatedProject.score, RelatedProject.related_id) \
+        .order_by(RelatedProject.project_id, RelatedProject.rank)
+    if project_ids is not None:
+        query = query.where(RelatedProject.project_id.in_(project_ids))
+    lists = defaultdict(list)
+    for project_id, score, related_id in db.session.execute(query):
+        lists[project_id].append((score, related_id))
+    return lists
+
+
+def _write(lists):
+    """Replace the stored lists of the projects in ``lists``"""
+    project_ids = list(lists)
+    for start in range(0, len(project_ids), 500):
+        batch = project_ids[start:start + 500]
+        db.session.execute(delete(RelatedProject).where(RelatedProject.project_id.in_(batch)))
+    rows = [{'project_id': project_id, 'rank': rank, 'related_id': related_id, 'score': score}
+            for project_id, entries in lists.items()
+            for rank, (score, related_id) in enumerate(entries)]
+    if rows:
+        db.session.execute(insert(RelatedProject), rows)
+
+
+def rebuild_related():
+    """Recompute every list; for schema upgrades and bulk imports"""
+    started = time.perf_counter()
+    catalog = Catalog.load()
+    db.session.execute(delete(RelatedProject))
+    _write({project_id: catalog.neighbors(project_id) for project_id in catalog.categories})
+    logger.info(f"Related projects rebuilt for {len(catalog.categories)} projects "
+                f"in {time.perf_counter() - started:.3f}s")
+
+
+def update_related(project_ids):
+    """Bring the lists up to date after ``project_ids`` were added, deleted,
+    (un)published, re-tagged or moved to another category. Run it after
+    sync_technologies() and before committing."""
+    changed = set(project_ids)
+    if not changed:
+        return
+    if len(changed) > 500:
+        # Most lists will move anyway
+        rebuild_related()
+        return
+    # Lists that may move: the changed projects' candidates now, and
+    # whoever listed one of them before
+    listing = set(db.session.scalars(
+        select(RelatedProject.project_id).where(RelatedProject.related_id.in_(changed))
+    ))
+    # Only the neighbourhood of the projects whose lists are recomputed
+    catalog = Catalog.load(around=changed | listing)
+    present = [project_id for project_id in changed if project_id in catalog]
+    affected = set(chain.from_iterable(catalog.candidates(project_id) for project_id in present))
+    affected = (affected | listing) - changed
+
+    lists = {project_id: catalog.neighbors(project_id) if project_id in catalog else [] for project_id in changed}
+    stored = _load_lists(affected) if len(affected) <= 500 else _load_lists()
+    for project_id in affected:
+        if project_id not in catalog:
+            continue
+        if project_id in listing:
+            # An entry may have dropped out; only a full pass finds its replacement
+            lists[project_id] = catalog.neighbors(project_id)
+            continue
+        entries = stored.get(project_id, [])
+        offers = [(catalog.score(project_id, other), other) for other in present]
+        merged = sorted(entries + [entry for entry in offers if entry[0] > 0], reverse=True)[:K]
+        if merged != entries:
+            lists[project_id] = merged
+
+    _write(lists)
+    logger.info(f"Related projects updated for {len(changed)} changed project(s), "
+                f"{len(lists) - len(changed)} neighbour list(s) patched")
+
+
+def related_projects(project_id, limit=K):
+    """Published neighbours of ``project_id``, best first; one indexed query"""
+    return Project.query.options(joinedload(Project.category)) \
+        .join(RelatedProject, RelatedProject.related_id == Project.id) \
+        .filter(RelatedProject.project_id == project_id, Project.is_published.is_(True)) \
+        .order_by(RelatedProject.rank).limit(limit).all()
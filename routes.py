@@ -1,15 +1,21 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, session
+from flask import render_template, redirect, url_for, flash, request, jsonify, session, abort, make_response
 from flask_login import current_user, login_user, logout_user
-from sqlalchemy import desc, or_
+from sqlalchemy import desc, or_, and_, select, func
+from sqlalchemy.orm import joinedload
 from datetime import datetime
+import os
 import urllib.parse
 
 from app import app, db
 from auth_decorators import login_required, admin_required
-from models import User, Project, Achievement, Category, Comment, Like, AboutMe, Education
+from ratelimit import rate_limit
+from passwords import HashingBusy
+from models import User, Project, Achievement, Category, Comment, Like, AboutMe, Education, SyncJob
 from forms import ProjectForm, AchievementForm, CategoryForm, CommentForm, AboutMeForm, LoginForm, RegisterForm, ShareForm, EducationForm
 from utils import save_uploaded_file, delete_file
 from translations import get_translation
+from facets import facet_counts
+from related import related_projects, update_related
 
 # Register authentication blueprint
 
@@ -42,6 +48,7 @@ def inject_translations():
 
 # Authentication Routes (Local Login/Register)
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limit('login', per_ip='10/minute')
 def login():
     """Local login page"""
     if current_user.is_authenticated:
@@ -51,6 +58,14 @@ def login():
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         if user and user.check_password(form.password.data):
+            # Move hashes made with older PASSWORD_HASH_METHOD settings to the current one;
+            # with every hashing slot taken, leave it for a later login
+            try:
+                if user.password_needs_rehash():
+                    user.set_password(form.password.data)
+                    db.session.commit()
+            except HashingBusy:
+                pass
             login_user(user)
             next_page = request.args.get('next')
             flash('Login successful!', 'success')
@@ -61,6 +76,7 @@ def login():
     return render_template('auth/login.html', form=form)
 
 @app.route('/register', methods=['GET', 'POST'])
+@rate_limit('register', per_ip='10/hour')
 def register():
     """Local registration page"""
     if current_user.is_authenticated:
@@ -92,7 +108,7 @@ def logout():
 @app.route('/')
 def index():
     """Homepage showing featured projects and certifications"""
-    featured_projects = Project.query.filter_by(is_published=True, is_featured=True).limit(6).all()
+    featured_projects = Project.with_counts(Project.query.filter_by(is_published=True, is_featured=True).limit(6))
     featured_certifications = Achievement.query.filter_by(is_published=True, is_featured=True).limit(4).all()
     
     # Get about me info for homepage
@@ -101,52 +117,100 @@ def index():
     return render_template('index.html', 
                          featured_projects=featured_projects,
                          featured_certifications=featured_certifications,
-                         about_me=about_me)
+                         about_me=about_me,
+                         liked_ids=Project.liked_ids(current_user, [p.id for p in featured_projects]))
 
 @app.route('/projects')
 def projects():
     """View all published projects with filtering"""
     category_id = request.args.get('category', type=int)
     search = request.args.get('search', '').strip()
+    tech = request.args.get('tech', '').strip()
     
-    query = Project.query.filter_by(is_published=True)
+    query = Project.query.options(joinedload(Project.category)).filter_by(is_published=True) \
+        .filter(*Project.listing_filters(category_id, search, tech).values())
     
-    if category_id:
-        query = query.filter_by(category_id=category_id)
-    
-    if search:
-        query = query.filter(or_(
-            Project.title.contains(search),
-            Project.description.contains(search),
-            Project.technologies.contains(search)
-        ))
-    
-    projects = query.order_by(desc(Project.created_at)).all()
+    projects = Project.with_counts(query.order_by(desc(Project.created_at)))
     categories = Category.query.all()
     
     return render_template('projects.html', 
                          projects=projects, 
                          categories=categories,
                          selected_category=category_id,
-                         search_term=search)
+                         search_term=search,
+                         selected_tech=tech,
+                         facets=facet_counts(category_id, search, tech),
+                         liked_ids=Project.liked_ids(current_user, [p.id for p in projects]))
 
 @app.route('/project/<int:id>')
 def project_detail(id):
     """View individual project with comments"""
-    project = Project.query.get_or_404(id)
+    project = Project.query.options(joinedload(Project.category)).filter_by(id=id).first_or_404()
     
     if not project.is_published:
         if not current_user.is_authenticated or not current_user.is_admin:
             flash('Project not found.', 'error')
             return redirect(url_for('projects'))
     
-    comments = Comment.query.filter_by(project_id=id, is_approved=True).order_by(Comment.created_at).all()
+    comments, next_cursor = comment_page(id)
     comment_form = CommentForm()
     
     return render_template('project_detail.html', 
                          project=project, 
                          comments=comments,
-                         comment_form=comment_form)
+                         next_cursor=next_cursor,
+                         related=related_projects(id),
+                         comment_form=comment_form,
+                         liked=project.is_liked_by(current_user))
+
+COMMENTS_PAGE_SIZE = int(os.environ.get('COMMENTS_PAGE_SIZE', 20))
+
+def comment_page(project_id, cursor=None, limit=COMMENTS_PAGE_SIZE):
+    """One page of a project's approved comments in date order, and the
+    cursor for the next page (None on the last one)"""
+    query = Comment.query.options(joinedload(Comment.author)) \
+        .filter_by(project_id=project_id, is_approved=True)
+    
+    if cursor:
+        # Keyset on (created_at, id): the cursor is the last comment shown
+        try:
+            created_at, comment_id = cursor.rsplit('_', 1)
+            created_at, comment_id = datetime.fromisoformat(created_at), int(comment_id)
+        except ValueError:
+            abort(400)
+        query = query.filter(or_(Comment.created_at > created_at,
+                                 and_(Comment.created_at == created_at, Comment.id > comment_id)))
+    
+    comments = query.order_by(Comment.created_at, Comment.id).limit(limit + 1).all()
+    if len(comments) <= limit:
+        return comments, None
+    comments = comments[:limit]
+    return comments, f'{comments[-1].created_at.isoformat()}_{comments[-1].id}'
+
+@app.route('/project/<int:id>/comments')
+def project_comments(id):
+    """Next page of comments, as an HTML fragment or as JSON with ?format=json"""
+    is_published = db.session.scalar(select(Project.is_published).where(Project.id == id))
+    if is_published is None or (not is_published and not (current_user.is_authenticated and current_user.is_admin)):
+        abort(404)
+    
+    comments, next_cursor = comment_page(id, request.args.get('after'))
+    
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'comments': [{
+                'id': comment.id,
+                'author': comment.author.display_name,
+                'content': comment.content,
+                'created_at': comment.created_at.isoformat(),
+            } for comment in comments],
+            'next_cursor': next_cursor
+        })
+    
+    response = make_response(render_template('comment_list.html', comments=comments))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/achievements')
 def achievements():
@@ -181,6 +245,7 @@ def about():
 # Interactive Routes (require login)
 @app.route('/project/<int:id>/comment', methods=['POST'])
 @login_required
+@rate_limit('comment', per_user='5/minute', per_ip='20/minute')
 def add_comment(id):
     """Add comment to project"""
     project = Project.query.get_or_404(id)
@@ -201,6 +266,7 @@ def add_comment(id):
 
 @app.route('/project/<int:id>/like', methods=['POST'])
 @login_required
+@rate_limit('like', per_user='30/minute', per_ip='120/minute')
 def toggle_like(id):
     """Toggle like for project"""
     project = Project.query.get_or_404(id)
@@ -224,6 +290,15 @@ def toggle_like(id):
         'like_count': project.like_count
     })
 
+@app.route('/projects/liked')
+def liked_projects():
+    """Which of ?ids=1,2,3 the current user has liked, for hydrating like buttons"""
+    ids = [int(value) for value in request.args.get('ids', '').split(',')[:200] if value.strip().isdigit()]
+    return jsonify({
+        'authenticated': current_user.is_authenticated,
+        'liked': sorted(Project.liked_ids(current_user, ids))
+    })
+
 # LinkedIn Sharing Route
 @app.route('/project/<int:id>/share', methods=['GET', 'POST'])
 @login_required
@@ -269,26 +344,41 @@ def share_project(id):
 @admin_required
 def admin_dashboard():
     """Admin dashboard"""
-    stats = {
-        'projects': Project.query.count(),
-        'published_projects': Project.query.filter_by(is_published=True).count(),
-        'achievements': Achievement.query.count(),
-        'categories': Category.query.count(),
-        'comments': Comment.query.count(),
-        'likes': Like.query.count(),
-        'education': Education.query.count()
-    }
-    
-    recent_comments = Comment.query.order_by(desc(Comment.created_at)).limit(5).all()
-    
-    return render_template('admin/dashboard.html', stats=stats, recent_comments=recent_comments)
+    # All counters in one SELECT
+    stats = db.session.execute(select(
+        select(func.count(Project.id)).scalar_subquery().label('projects'),
+        select(func.count(Project.id)).where(Project.is_published.is_(True)).scalar_subquery().label('published_projects'),
+        select(func.count(Achievement.id)).scalar_subquery().label('achievements'),
+        select(func.count(Category.id)).scalar_subquery().label('categories'),
+        select(func.count(Comment.id)).scalar_subquery().label('comments'),
+        select(func.count(Like.id)).scalar_subquery().label('likes'),
+        select(func.count(Education.id)).scalar_subquery().label('education'),
+    )).one()._asdict()
+    
+    recent_comments = Comment.query.options(joinedload(Comment.author), joinedload(Comment.project)) \
+        .order_by(desc(Comment.created_at)).limit(5).all()
+    
+    # GitHub sync history (manual and scheduled runs)
+    from scheduler import SYNC_INTERVAL, LEASE_NAME, get_lease
+    recent_sync_jobs = SyncJob.query.order_by(desc(SyncJob.id)).limit(5).all()
+    sync_lease = get_lease(LEASE_NAME) if SYNC_INTERVAL else None
+    
+    return render_template('admin/dashboard.html', stats=stats, recent_comments=recent_comments,
+                           recent_sync_jobs=recent_sync_jobs, sync_interval=SYNC_INTERVAL,
+                           sync_lease=sync_lease)
 
 @app.route('/admin/projects')
 @admin_required
 def admin_projects():
     """Admin projects list"""
-    projects = Project.query.order_by(desc(Project.created_at)).all()
-    return render_template('admin/projects.html', projects=projects)
+    projects = Project.with_counts(
+        Project.query.options(joinedload(Project.category)).order_by(desc(Project.created_at))
+    )
+    
+    sync_job_id = request.args.get('sync_job', type=int)
+    sync_job = SyncJob.query.get(sync_job_id) if sync_job_id else None
+    
+    return render_template('admin/projects.html', projects=projects, sync_job=sync_job)
 
 @app.route('/admin/projects/new', methods=['GET', 'POST'])
 @admin_required
@@ -315,6 +405,9 @@ def admin_project_new():
                 project.image_url = filename
         
         db.session.add(project)
+        db.session.flush()
+        Project.sync_technologies([project.id])
+        update_related([project.id])
         db.session.commit()
         flash('Project created successfully!', 'success')
         return redirect(url_for('admin_projects'))
@@ -343,6 +436,9 @@ def admin_project_edit(id):
                     delete_file(old_image)
                 project.image_url = filename
         
+        db.session.flush()
+        Project.sync_technologies([project.id])
+        update_related([project.id])
         db.session.commit()
         flash('Project updated successfully!', 'success')
         return redirect(url_for('admin_projects'))
@@ -360,6 +456,8 @@ def admin_project_delete(id):
         delete_file(project.image_url)
     
     db.session.delete(project)
+    db.session.flush()
+    update_related([id])
     db.session.commit()
     flash('Project deleted successfully!', 'success')
     return redirect(url_for('admin_projects'))
@@ -368,7 +466,8 @@ def admin_project_delete(id):
 @admin_required
 def admin_achievements():
     """Admin achievements list"""
-    achievements = Achievement.query.order_by(desc(Achievement.date_achieved)).all()
+    achievements = Achievement.query.options(joinedload(Achievement.category)) \
+        .order_by(desc(Achievement.date_achieved)).all()
     return render_template('admin/achievements.html', achievements=achievements)
 
 @app.route('/admin/achievements/new', methods=['GET', 'POST'])
@@ -449,8 +548,13 @@ def admin_achievement_delete(id):
 def admin_categories():
     """Admin categories list"""
     categories = Category.query.all()
+    project_counts = dict(db.session.query(Project.category_id, func.count(Project.id)).group_by(Project.category_id))
+    achievement_counts = dict(
+        db.session.query(Achievement.category_id, func.count(Achievement.id)).group_by(Achievement.category_id)
+    )
     form = CategoryForm()
-    return render_template('admin/categories.html', categories=categories, form=form)
+    return render_template('admin/categories.html', categories=categories, form=form,
+                           project_counts=project_counts, achievement_counts=achievement_counts)
 
 @app.route('/admin/categories/new', methods=['POST'])
 @admin_required
@@ -522,21 +626,53 @@ def admin_about_edit():
     
     return render_template('admin/about_edit.html', form=form, about_me=about_me)
 
-# GitHub Sync Route
-@app.route('/admin/sync-github')
+# GitHub Sync Routes
+@app.route('/admin/sync-github', methods=['GET', 'POST'])
 @admin_required
 def admin_sync_github():
-    """Sync projects from GitHub"""
-    from github_sync import sync_github_projects
+    """Start a background GitHub sync and return its job id"""
+    from sync_jobs import enqueue_sync_job
     
-    result = sync_github_projects()
+    full = request.values.get('full', type=int) == 1
+    job, created = enqueue_sync_job(full=full)
     
-    if result['success']:
-        flash(f"GitHub sincronizado! {result['synced']} novos projetos, {result.get('updated', 0)} atualizados.", 'success')
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job.to_dict()), 202
+    
+    if created:
+        flash('Sincronização com o GitHub iniciada em segundo plano.', 'info')
     else:
-        flash(f"Erro ao sincronizar GitHub: {result['message']}", 'error')
+        flash('Já existe uma sincronização com o GitHub em andamento.', 'info')
     
-    return redirect(url_for('admin_projects'))
+    return redirect(url_for('admin_projects', sync_job=job.id))
+
+@app.route('/admin/sync-github/status/<int:job_id>')
+@admin_required
+def admin_sync_github_status(job_id):
+    """Progress of a GitHub sync job"""
+    job = SyncJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+# Slow Query Log
+@app.route('/admin/slow-queries')
+@admin_required
+def admin_slow_queries():
+    """Slow statements recorded by this worker, grouped by normalized SQL"""
+    from instrumentation import slow_queries
+    
+    return render_template('admin/slow_queries.html', groups=slow_queries.grouped(),
+                           threshold_ms=slow_queries.threshold * 1000, pid=os.getpid(),
+                           collecting=bool(app.extensions.get('request_stats')))
+
+@app.route('/admin/slow-queries/clear', methods=['POST'])
+@admin_required
+def admin_slow_queries_clear():
+    """Empty this worker's slow query buffer"""
+    from instrumentation import slow_queries
+    
+    slow_queries.clear()
+    flash('Registro de consultas lentas limpo.', 'info')
+    return redirect(url_for('admin_slow_queries'))
 
 # Education Admin Routes
 @app.route('/admin/education')
@@ -608,6 +744,25 @@ def not_found_error(error):
 def forbidden_error(error):
     return render_template('403.html'), 403
 
+@app.errorhandler(429)
+def too_many_requests_error(error):
+    retry_after = getattr(error, 'retry_after', None) or 1
+    # The like button posts JSON and expects JSON back
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        response = jsonify({'error': 'Too many requests', 'retry_after': retry_after})
+    else:
+        response = make_response(render_template('429.html', retry_after=retry_after))
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.errorhandler(503)
+def service_unavailable_error(error):
+    retry_after = getattr(error, 'retry_after', None) or 1
+    response = make_response(render_template('503.html'), 503)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
 @app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
@@ -0,0 +1,124 @@
+"""
+Periodic GitHub sync
+Every gunicorn worker runs a small scheduler thread, but a run only starts in
+the worker that wins the 'github-sync' lease in the database, and only when
+the last sync was queued at least one interval ago (less DUE_MARGIN). The
+lease stops two workers from starting at the same moment; the check against
+the last sync stops a worker that takes an expired lease from starting a
+second one within the same interval.
+The thread is started from the post_worker_init hook in gunicorn.conf.py,
+never on import, so flask CLI commands don't run one.
+Enable with GITHUB_SYNC_INTERVAL (seconds); GITHUB_SYNC_JITTER is the random
+fraction added to or removed from each wait.
+"""
+import os
+import socket
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, select, func
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = int(os.environ.get('GITHUB_SYNC_INTERVAL', 0))
+SYNC_JITTER = float(os.environ.get('GITHUB_SYNC_JITTER', 0.1))
+LEASE_NAME = 'github-sync'
+DUE_MARGIN = 0.05  # fraction of the interval a run may come early
+
+_started = False
+
+
+def _holder_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def acquire_lease(name, ttl, holder=None):
+    """Take the named lease for ``ttl`` seconds if it is free or expired"""
+    from app import db
+    from models import Lease
+
+    holder = holder or _holder_id()
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=ttl)
+
+    result = db.session.execute(
+        update(Lease)
+        .where(Lease.name == name, Lease.expires_at < now)
+        .values(holder=holder, expires_at=expires_at)
+    )
+    if result.rowcount == 1:
+        db.session.commit()
+        return True
+
+    lease = Lease(name=name, holder=holder, expires_at=expires_at)
+    db.session.add(lease)
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Someone else holds a live lease
+        db.session.rollback()
+        return False
+
+
+def get_lease(name):
+    from app import db
+    from models import Lease
+
+    return db.session.get(Lease, name)
+
+
+def sync_due(interval, now=None):
+    """True if no sync was queued in the last ``interval`` seconds, less the margin"""
+    from app import db
+    from models import SyncJob
+
+    now = now or datetime.now()
+    last = db.session.scalar(select(func.max(SyncJob.created_at)))
+    return last is None or now - last >= timedelta(seconds=interval * (1 - DUE_MARGIN))
+
+
+def _next_wait(interval):
+    return max(interval * (1 + random.uniform(-SYNC_JITTER, SYNC_JITTER)), 1)
+
+
+def _run(app, interval):
+    from sync_jobs import enqueue_sync_job
+
+    stop = threading.Event()
+    # Spread the first tick so workers that boot together don't all race at once
+    wait = random.uniform(0, interval)
+    while not stop.wait(wait):
+        wait = _next_wait(interval)
+        try:
+            with app.app_context():
+                # Slightly shorter than the interval so the next tick finds it expired
+                if not acquire_lease(LEASE_NAME, ttl=interval * (1 - SYNC_JITTER) * 0.9):
+                    continue
+                if not sync_due(interval):
+                    logger.debug("Scheduled GitHub sync not due yet")
+                    continue
+                job, created = enqueue_sync_job()
+                if created:
+                    logger.info(f"Scheduled GitHub sync started as job {job.id}")
+                else:
+                    logger.info(f"Scheduled GitHub sync skipped, job {job.id} is still {job.status}")
+        except Exception:
+            logger.exception("Scheduled GitHub sync failed to start")
+
+
+def start_scheduler(app, interval=SYNC_INTERVAL):
+    """Start the periodic sync thread for this worker, if enabled"""
+    global _started
+
+    if interval <= 0 or _started or app.config.get('TESTING'):
+        return False
+    _started = True
+
+    thread = threading.Thread(target=_run, args=(app, interval), name='github-sync-scheduler', daemon=True)
+    thread.start()
+    logger.info(f"GitHub sync scheduler running every ~{interval}s")
+    return True
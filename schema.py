@@ -0,0 +1,89 @@
+"""
+Schema upgrades for existing databases
+db.create_all() only creates missing tables, so indexes and columns added to
+models after a database was created are applied here. Every statement is
+idempotent and runs at startup.
+"""
+import logging
+from sqlalchemy import inspect, text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# (table, index name, columns)
+INDEXES = [
+    ('projects', 'ix_projects_github_url', 'github_url'),
+    ('likes', 'ix_likes_project_id', 'project_id'),
+    ('comments', 'ix_comments_project_id_created_at', 'project_id, created_at'),
+    ('projects', 'ix_projects_is_published_created_at', 'is_published, created_at'),
+    ('achievements', 'ix_achievements_is_published_date_achieved', 'is_published, date_achieved'),
+]
+
+
+def _backfill_comment_count():
+    from models import Project
+    Project.recount_comments()
+
+
+# (table, column, column DDL, backfill run once after the column is added)
+COLUMNS = [
+    ('projects', 'comment_count', 'INTEGER NOT NULL DEFAULT 0', _backfill_comment_count),
+]
+
+
+def _technologies_need_backfill():
+    # Links are empty but projects list technologies: the table is newer than the rows
+    return db.session.execute(text(
+        "SELECT NOT EXISTS (SELECT 1 FROM project_technologies) "
+        "AND EXISTS (SELECT 1 FROM projects WHERE technologies IS NOT NULL AND technologies != '')"
+    )).scalar()
+
+
+def _backfill_technologies():
+    from models import Project
+    Project.sync_technologies()
+
+
+def _related_need_backfill():
+    return db.session.execute(text(
+        "SELECT NOT EXISTS (SELECT 1 FROM related_projects) "
+        "AND (SELECT COUNT(*) FROM projects WHERE is_published) > 1"
+    )).scalar()
+
+
+def _backfill_related():
+    from related import rebuild_related
+    rebuild_related()
+
+
+# (description, check, backfill) for tables derived from rows that predate them
+BACKFILLS = [
+    ('project technologies', _technologies_need_backfill, _backfill_technologies),
+    ('related projects', _related_need_backfill, _backfill_related),
+]
+
+
+def upgrade_schema():
+    """Add columns and indexes missing from tables created before they were declared"""
+    inspector = inspect(db.engine)
+    
+    for table, column, ddl, backfill in COLUMNS:
+        existing = {col['name'] for col in inspector.get_columns(table)}
+        if column not in existing:
+            logger.info(f"Adding column {table}.{column}")
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+            backfill()
+    
+    for table, name, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            logger.info(f"Creating index {name} on {table}({columns})")
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
+    
+    for description, needed, backfill in BACKFILLS:
+        if needed():
+            logger.info(f"Backfilling {description}")
+            backfill()
+    
+    db.session.commit()
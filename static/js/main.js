@@ -15,9 +15,11 @@ function initializeApp() {
     initializeAnimations();
     initializeFormEnhancements();
     initializeImageLazyLoading();
-    initializeSearchDebounce();
+    initializeSearchSuggestions();
     initializeThemeToggle();
     initializeLanguageSwitch();
+    initializeLikeButtons();
+    initializeCommentThreads();
 }
 
 /**
@@ -147,23 +149,106 @@ function initializeImageLazyLoading() {
 }
 
 /**
- * Initialize search with debounce
+ * Typeahead for search inputs: debounced lookups against /search/suggest,
+ * shown in a dropdown; arrow keys move, Enter opens the highlighted
+ * suggestion or submits the form as before
  */
-function initializeSearchDebounce() {
+function initializeSearchSuggestions() {
     const searchInputs = document.querySelectorAll('input[name="search"]');
-    let searchTimeout;
+    const icons = { project: 'fa-folder', technology: 'fa-code', category: 'fa-tag' };
 
     searchInputs.forEach(input => {
-        input.addEventListener('input', function() {
-            clearTimeout(searchTimeout);
-            searchTimeout = setTimeout(() => {
-                // Auto-submit search after 500ms of no typing
-                const form = input.closest('form');
-                if (form && input.value.length >= 3) {
-                    form.submit();
+        let searchTimeout;
+        let controller = null;
+        let active = -1;
+
+        input.setAttribute('autocomplete', 'off');
+        input.parentElement.classList.add('position-relative');
+        const menu = document.createElement('div');
+        menu.className = 'dropdown-menu w-100';
+        input.after(menu);
+
+        const items = () => Array.from(menu.querySelectorAll('.dropdown-item'));
+        const close = () => {
+            menu.classList.remove('show');
+            active = -1;
+        };
+        const highlight = index => {
+            const list = items();
+            list.forEach((item, i) => item.classList.toggle('active', i === index));
+            active = index;
+        };
+
+        function render(suggestions) {
+            menu.innerHTML = '';
+            suggestions.forEach(suggestion => {
+                const item = document.createElement('a');
+                item.className = 'dropdown-item d-flex justify-content-between align-items-center';
+                item.href = suggestion.url;
+
+                const label = document.createElement('span');
+                const icon = document.createElement('i');
+                icon.className = `fas ${icons[suggestion.type] || 'fa-search'} me-2 text-muted`;
+                label.append(icon, suggestion.label);
+                item.append(label);
+
+                if (suggestion.count !== undefined) {
+                    const count = document.createElement('span');
+                    count.className = 'badge bg-secondary';
+                    count.textContent = suggestion.count;
+                    item.append(count);
                 }
-            }, 500);
+                menu.append(item);
+            });
+            active = -1;
+            menu.classList.toggle('show', suggestions.length > 0);
+        }
+
+        function lookup() {
+            const query = input.value.trim();
+            if (query.length < 2) {
+                close();
+                return;
+            }
+            // Only the answer to the latest keystroke matters
+            if (controller) controller.abort();
+            controller = new AbortController();
+
+            fetch(`/search/suggest?q=${encodeURIComponent(query)}`, { signal: controller.signal })
+                .then(response => response.json())
+                .then(data => {
+                    if (input.value.trim() === query) render(data.suggestions);
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') console.error('Error:', error);
+                });
+        }
+
+        input.addEventListener('input', () => {
+            clearTimeout(searchTimeout);
+            searchTimeout = setTimeout(lookup, 150);
+        });
+
+        input.addEventListener('keydown', event => {
+            const list = items();
+            if (!menu.classList.contains('show') || !list.length) return;
+
+            if (event.key === 'ArrowDown') {
+                event.preventDefault();
+                highlight((active + 1) % list.length);
+            } else if (event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight(active <= 0 ? list.length - 1 : active - 1);
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                window.location.href = list[active].href;
+            } else if (event.key === 'Escape') {
+                close();
+            }
         });
+
+        // Let a click on a suggestion land before the menu closes
+        input.addEventListener('blur', () => setTimeout(close, 150));
     });
 }
 
@@ -331,33 +416,127 @@ function handleLikeButton(button, projectId) {
             'Content-Type': 'application/json',
         }
     })
-    .then(response => response.json())
-    .then(data => {
-        const likeCount = button.querySelector('.like-count');
-        const likeText = button.querySelector('.like-text');
-        
-        if (likeCount) likeCount.textContent = data.like_count;
-        if (likeText) likeText.textContent = data.liked ? 'Liked' : 'Like';
-        
-        if (data.liked) {
-            button.classList.remove('btn-outline-danger');
-            button.classList.add('btn-danger');
-        } else {
-            button.classList.remove('btn-danger');
-            button.classList.add('btn-outline-danger');
+    .then(response => {
+        if (response.status === 429) {
+            hideLoading(button);
+            showToast(`Too many likes, try again in ${response.headers.get('Retry-After') || 'a few'} seconds`, 'warning');
+            return null;
         }
+        return response.json();
+    })
+    .then(data => {
+        if (!data) return;
+        // Restore the button first, the count lives inside its original HTML
+        hideLoading(button);
+        setLikeState(button, data.liked, data.like_count);
         
         showToast(data.liked ? 'Project liked!' : 'Like removed', 'success');
     })
     .catch(error => {
+        hideLoading(button);
         console.error('Error:', error);
         showToast('Failed to update like', 'danger');
-    })
-    .finally(() => {
-        hideLoading(button);
     });
 }
 
+/**
+ * Update a like button's style, text and count
+ */
+function setLikeState(button, liked, likeCount) {
+    const count = button.querySelector('.like-count');
+    const text = button.querySelector('.like-text');
+    
+    if (count && likeCount !== undefined) count.textContent = likeCount;
+    if (text) text.textContent = liked ? (button.dataset.likedText || 'Liked') : (button.dataset.likeText || 'Like');
+    
+    button.classList.toggle('btn-danger', liked);
+    button.classList.toggle('btn-outline-danger', !liked);
+    button.dataset.liked = liked ? 'true' : 'false';
+}
+
+/**
+ * Wire up like buttons and fetch the liked state, in one request, for
+ * buttons rendered without it (data-liked missing, e.g. cached pages)
+ */
+function initializeLikeButtons() {
+    const buttons = Array.from(document.querySelectorAll('.like-btn[data-project-id]'));
+    if (!buttons.length) return;
+    
+    buttons.forEach(button => {
+        button.addEventListener('click', () => handleLikeButton(button, button.dataset.projectId));
+    });
+    
+    const pending = buttons.filter(button => button.dataset.liked === undefined);
+    if (!pending.length) return;
+    
+    const ids = [...new Set(pending.map(button => button.dataset.projectId))];
+    fetch(`/projects/liked?ids=${ids.join(',')}`, { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(data => {
+            const liked = new Set(data.liked.map(String));
+            pending.forEach(button => setLikeState(button, liked.has(button.dataset.projectId)));
+        })
+        .catch(error => {
+            console.error('Error:', error);
+        });
+}
+
+/**
+ * Load further pages of a project's comments when the "load more" button
+ * is clicked or scrolled into view
+ */
+function initializeCommentThreads() {
+    const list = document.querySelector('.comments-list[data-comments-url]');
+    const button = document.querySelector('.load-more-comments');
+    if (!list || !button) return;
+    
+    let loading = false;
+    let observer = null;
+    
+    function loadMore() {
+        const cursor = list.dataset.nextCursor;
+        if (loading || !cursor) return;
+        loading = true;
+        showLoading(button);
+        
+        fetch(`${list.dataset.commentsUrl}?after=${encodeURIComponent(cursor)}`, { credentials: 'same-origin' })
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                list.dataset.nextCursor = response.headers.get('X-Next-Cursor') || '';
+                return response.text();
+            })
+            .then(html => {
+                list.insertAdjacentHTML('beforeend', html);
+                hideLoading(button);
+                if (!list.dataset.nextCursor) {
+                    if (observer) observer.disconnect();
+                    button.parentElement.remove();
+                } else if (observer) {
+                    // Re-observe so a button still in view loads the next page too
+                    observer.unobserve(button);
+                    observer.observe(button);
+                }
+            })
+            .catch(error => {
+                hideLoading(button);
+                console.error('Error:', error);
+                showToast('Failed to load comments', 'danger');
+            })
+            .finally(() => {
+                loading = false;
+            });
+    }
+    
+    button.addEventListener('click', loadMore);
+    
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadMore();
+        }, { rootMargin: '200px' });
+        observer.observe(button);
+    }
+}
+
 /**
  * Initialize smooth scrolling for anchor links
  */
@@ -464,6 +643,7 @@ window.Portfolio = {
     isValidEmail,
     isValidURL,
     handleLikeButton,
+    setLikeState,
     addToFavorites,
     removeFromFavorites,
     getFavorites,
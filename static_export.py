@@ -0,0 +1,254 @@
+"""
+Static export of the public site
+Renders index, projects, every published project, achievements and about in
+English (at the root) and Portuguese (under /pt/) as anonymous visitors see
+them, and copies static/ (including uploads) next to them, so a CDN can serve
+the read-only side without app servers. Login, likes, comments and the admin
+stay on the app; filtered listings (?category=, ?search=) are not exported.
+
+Export is incremental: manifest.json stores a fingerprint of the rows each
+page was rendered from (plus a hash of templates and translations), and only
+pages whose fingerprint changed are rendered again, in a process pool.
+
+    flask export-static --output build/site [--workers 4] [--full]
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select, func
+
+from app import app, db
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = ('en', 'pt')
+DEFAULT_LANGUAGE = 'en'
+CHUNK_SIZE = 50
+
+# Paths of exported pages; links to anything else are left pointing at the app
+_EXPORTED_PATH = re.compile(r'^/(projects|achievements|about|project/\d+)?$')
+_HREF = re.compile(r'href="(/[^"]*)"')
+
+
+def page_url(language, path):
+    """Public URL of an exported page"""
+    if language == DEFAULT_LANGUAGE:
+        return path
+    return f'/{language}' + ('' if path == '/' else path)
+
+
+def page_file(output, language, path):
+    return os.path.join(output, page_url(language, path).lstrip('/'), 'index.html')
+
+
+def _localize(html, language, path):
+    """Point page links at this language's copies and the language switch at the other one"""
+    def replace(match):
+        url = match.group(1)
+        if url.startswith('/set_language/'):
+            target = url.rsplit('/', 1)[1]
+            if target in LANGUAGES:
+                return f'href="{page_url(target, path)}"'
+            return match.group(0)
+        if language != DEFAULT_LANGUAGE and _EXPORTED_PATH.match(url):
+            return f'href="{page_url(language, url)}"'
+        return match.group(0)
+    return _HREF.sub(replace, html)
+
+
+def _code_fingerprint():
+    """Templates and translations; a change re-renders every page"""
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(root, 'translations.py')]
+    for directory, _, filenames in sorted(os.walk(os.path.join(root, 'templates'))):
+        paths.extend(os.path.join(directory, name) for name in sorted(filenames))
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(path.encode('utf-8'))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def source_fingerprints():
+    """Fingerprint of the rows behind every public page, keyed by path"""
+    from sqlalchemy.orm import aliased
+    from models import Project, Category, Comment, Like, AboutMe, Education, RelatedProject
+    from content_version import current_version
+
+    # Listings also show like and comment counts, which don't bump the content version
+    listing = repr((
+        current_version(),
+        db.session.scalar(select(func.count(Like.id))),
+        db.session.scalar(select(func.sum(Project.comment_count))),
+    ))
+    about = repr(db.session.execute(select(
+        select(func.max(AboutMe.updated_at)).scalar_subquery(),
+        select(func.count(Education.id)).scalar_subquery(),
+        select(func.max(Education.updated_at)).scalar_subquery(),
+    )).one())
+    pages = {'/': listing, '/projects': listing, '/achievements': listing, '/about': about}
+
+    like_count = select(func.count(Like.id)).where(Like.project_id == Project.id).scalar_subquery()
+    last_comment = select(func.max(Comment.created_at)).where(Comment.project_id == Project.id).scalar_subquery()
+    # The related projects section: which ones, in order, and their versions.
+    # Read as ordered rows rather than a string aggregate, which differs per dialect
+    other = aliased(Project)
+    related = {}
+    for project_id, related_id, updated_at in db.session.execute(
+        select(RelatedProject.project_id, RelatedProject.related_id, other.updated_at)
+        .join(other, other.id == RelatedProject.related_id)
+        .order_by(RelatedProject.project_id, RelatedProject.rank)
+    ):
+        related.setdefault(project_id, []).append((related_id, updated_at))
+
+    rows = db.session.execute(
+        select(Project.id, Project.updated_at, Category.name, Category.color,
+               like_count, Project.comment_count, last_comment)
+        .outerjoin(Category, Project.category_id == Category.id)
+        .where(Project.is_published.is_(True))
+    )
+    for row in rows:
+        pages[f'/project/{row[0]}'] = repr((*row[1:], related.get(row[0], [])))
+    return pages
+
+
+def _init_worker():
+    import routes  # noqa: F401
+    import api  # noqa: F401
+    import feeds  # noqa: F401
+
+    # Connections opened by the parent must not be shared with forked workers
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def render_pages(output, pages):
+    """Render (language, path) pairs to files; runs in a pool worker"""
+    client = app.test_client()
+    rendered, failed = [], []
+    for language, path in pages:
+        with client.session_transaction() as session:
+            session['language'] = language
+        response = client.get(path)
+        # Under the CLI's app context requests share one session; don't let it grow
+        db.session.remove()
+        if response.status_code != 200:
+            failed.append((language, path, response.status_code))
+            continue
+
+        html = _localize(response.get_data(as_text=True), language, path)
+        target = page_file(output, language, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, target)
+        rendered.append((language, path))
+    return rendered, failed
+
+
+def copy_static(output):
+    """Copy static/ (CSS, JS, uploads) into the export, skipping unchanged files"""
+    source = app.static_folder
+    target = os.path.join(output, 'static')
+    copied = 0
+    for directory, _, filenames in os.walk(source):
+        relative = os.path.relpath(directory, source)
+        os.makedirs(os.path.join(target, relative), exist_ok=True)
+        for name in filenames:
+            src = os.path.join(directory, name)
+            dst = os.path.join(target, relative, name)
+            src_stat = os.stat(src)
+            try:
+                dst_stat = os.stat(dst)
+                if dst_stat.st_size == src_stat.st_size and int(dst_stat.st_mtime) == int(src_stat.st_mtime):
+                    continue
+            except FileNotFoundError:
+                pass
+            shutil.copy2(src, dst)
+            copied += 1
+    return copied
+
+
+def _read_manifest(output):
+    try:
+        with open(os.path.join(output, 'manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _remove_page(output, language, path):
+    target = page_file(output, language, path)
+    if os.path.exists(target):
+        os.remove(target)
+        try:
+            os.removedirs(os.path.dirname(target))
+        except OSError:
+            pass
+
+
+def export_static(output, workers=None, full=False):
+    """Render changed pages and copy assets; returns counts for reporting"""
+    os.makedirs(output, exist_ok=True)
+    # --full only forces re-rendering; pages dropped since the last run are still removed
+    manifest = _read_manifest(output)
+    code = _code_fingerprint()
+    previous = manifest.get('pages', {}) if manifest.get('code') == code and not full else {}
+
+    fingerprints = source_fingerprints()
+    current = {f'{language}:{path}': fingerprint
+               for path, fingerprint in fingerprints.items() for language in LANGUAGES}
+    todo = [tuple(key.split(':', 1)) for key, fingerprint in current.items()
+            if previous.get(key) != fingerprint or not os.path.exists(page_file(output, *key.split(':', 1)))]
+
+    removed = [key for key in manifest.get('pages', {}) if key not in current]
+    for key in removed:
+        _remove_page(output, *key.split(':', 1))
+
+    # The pool's workers inherit the app; drop pooled connections before forking
+    db.session.remove()
+    db.engine.dispose()
+
+    rendered, failed = [], []
+    chunks = [todo[start:start + CHUNK_SIZE] for start in range(0, len(todo), CHUNK_SIZE)]
+    if chunks:
+        workers = workers or min(os.cpu_count() or 1, len(chunks))
+        if workers == 1:
+            _init_worker()
+            results = [render_pages(output, chunk) for chunk in chunks]
+        else:
+            method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                                     initializer=_init_worker) as pool:
+                results = list(pool.map(render_pages, [output] * len(chunks), chunks))
+        for chunk_rendered, chunk_failed in results:
+            rendered.extend(chunk_rendered)
+            failed.extend(chunk_failed)
+
+    for language, path, status in failed:
+        logger.error(f"Static export of {page_url(language, path)} failed with status {status}")
+        current.pop(f'{language}:{path}', None)
+
+    copied = copy_static(output)
+
+    fd, tmp_path = tempfile.mkstemp(dir=output, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'code': code, 'pages': current}, f)
+    os.replace(tmp_path, os.path.join(output, 'manifest.json'))
+
+    return {
+        'pages': len(current),
+        'rendered': len(rendered),
+        'failed': len(failed),
+        'removed': len(removed),
+        'static_files_copied': copied,
+    }
@@ -0,0 +1,162 @@
+"""
+Search suggestions
+/search/suggest?q= answers from a per-worker prefix index over published
+project titles, technologies and categories: a sorted list of lower-cased
+keys searched with bisect. Every word start of a title is a key, so "api"
+finds "Flask API". The index is built on first use and rebuilt when the
+content version changes; the version itself is read at most every
+SUGGEST_VERSION_CHECK_SECONDS, so a lookup normally runs no SQL.
+"""
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+from flask import jsonify, request, url_for
+from sqlalchemy import select, func
+
+from app import app, db
+from models import Project, Category, Technology, project_technologies
+from content_version import current_version
+
+logger = logging.getLogger(__name__)
+
+VERSION_CHECK_SECONDS = float(os.environ.get('SUGGEST_VERSION_CHECK_SECONDS', 5))
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+SCAN_LIMIT = 200  # matching keys looked at per query before ranking
+
+# Ranking between suggestion types when everything else is equal
+TYPE_ORDER = {'technology': 0, 'category': 1, 'project': 2}
+
+
+def normalize(text):
+    return ' '.join((text or '').split()).lower()
+
+
+def _word_starts(text):
+    """'Flask REST API' -> ['flask rest api', 'rest api', 'api']"""
+    words = normalize(text).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    """Sorted (key, entry) pairs; entries are (type, label, target, count)"""
+
+    def __init__(self, items=()):
+        pairs = sorted(set(items), key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.entries = [entry for _, entry in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def matches(self, query):
+        """Entries with a key starting with ``query`` -> whether the match is
+        on the start of the label rather than a later word"""
+        matches = {}
+        position = bisect_left(self.keys, query)
+        end = min(len(self.keys), position + SCAN_LIMIT)
+        while position < end and self.keys[position].startswith(query):
+            entry = self.entries[position]
+            matches[entry] = matches.get(entry, False) or self.keys[position] == normalize(entry[1])
+            position += 1
+        return matches
+
+
+def search(indexes, query, limit=DEFAULT_LIMIT):
+    query = normalize(query)
+    if not query:
+        return []
+    matches = {}
+    for prefix_index in indexes:
+        matches.update(prefix_index.matches(query))
+    # Exact label, then label start, then type, popularity and shorter labels first
+    ranked = sorted(matches.items(), key=lambda item: (
+        normalize(item[0][1]) != query, not item[1], TYPE_ORDER[item[0][0]], -item[0][3], len(item[0][1]), item[0][1]))
+    return [entry for entry, _ in ranked[:limit]]
+
+
+def build_indexes():
+    """Read titles, technologies and categories of published projects; titles
+    get their own index so they can't crowd the few terms out of a scan"""
+    titles = []
+    terms = []
+    published = Project.is_published.is_(True)
+
+    for project_id, title in db.session.execute(select(Project.id, Project.title).where(published)):
+        entry = ('project', title, project_id, 0)
+        titles.extend((key, entry) for key in _word_starts(title))
+
+    technologies = db.session.execute(
+        select(Technology.slug, Technology.name, func.count())
+        .select_from(project_technologies)
+        .join(Technology, Technology.id == project_technologies.c.technology_id)
+        .join(Project, Project.id == project_technologies.c.project_id)
+        .where(published).group_by(Technology.id)
+    )
+    for slug, name, count in technologies:
+        entry = ('technology', name, slug, count)
+        terms.extend((key, entry) for key in _word_starts(name))
+
+    categories = db.session.execute(
+        select(Category.id, Category.name, func.count(Project.id))
+        .join(Project, (Project.category_id == Category.id) & published)
+        .group_by(Category.id)
+    )
+    for category_id, name, count in categories:
+        entry = ('category', name, category_id, count)
+        terms.extend((key, entry) for key in _word_starts(name))
+
+    return PrefixIndex(terms), PrefixIndex(titles)
+
+
+class SuggestIndex:
+    """The current prefix indexes and the content version they were built from"""
+
+    def __init__(self):
+        self._indexes = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = current_version(max_age=VERSION_CHECK_SECONDS)
+        if self._indexes is None or self._version != version:
+            with self._lock:
+                if self._indexes is None or self._version != version:
+                    started = time.perf_counter()
+                    self._indexes = build_indexes()
+                    self._version = version
+                    logger.info(f"Suggestion index built for content version {version}: "
+                                f"{sum(map(len, self._indexes))} keys in {time.perf_counter() - started:.3f}s")
+        return self._indexes
+
+
+index = SuggestIndex()
+
+
+def _url(kind, target):
+    if kind == 'project':
+        return url_for('project_detail', id=target)
+    if kind == 'technology':
+        return url_for('projects', tech=target)
+    return url_for('projects', category=target)
+
+
+@app.route('/search/suggest')
+def search_suggest():
+    """Up to ?limit= suggestions for the prefix ?q="""
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+
+    suggestions = []
+    for kind, label, target, count in search(index.get(), query, limit):
+        suggestion = {'type': kind, 'label': label, 'url': _url(kind, target)}
+        if kind != 'project':
+            suggestion['count'] = count
+        suggestions.append(suggestion)
+
+    response = jsonify({'query': query, 'suggestions': suggestions})
+    response.headers['Cache-Control'] = 'public, max-age=30'
+    return response
@@ -0,0 +1,163 @@
+"""
+Background jobs for GitHub sync
+Jobs are rows in the sync_jobs table and run in a separate Python process, so
+a slow GitHub API can never hit the gunicorn worker timeout. Only one job runs
+at a time across all workers: claiming a job is a single conditional UPDATE.
+
+Run a queued job by hand with: python sync_jobs.py <job_id>
+or queue and run one in the foreground with: flask sync-github [--full]
+"""
+import os
+import sys
+import time
+import logging
+import subprocess
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, exists, and_, func
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# A running job that has not reported progress for this long is considered dead.
+# Runners beat every GITHUB_HEARTBEAT_SECONDS (15) even while a request waits
+# out a rate limit, so this only has to cover one slow request, not a page.
+STALE_AFTER = timedelta(seconds=int(os.environ.get('SYNC_JOB_STALE_SECONDS', 300)))
+
+
+def _fail_stale_jobs(db, SyncJob):
+    """Mark jobs whose runner process died as failed"""
+    cutoff = datetime.now() - STALE_AFTER
+    db.session.execute(
+        update(SyncJob)
+        .where(SyncJob.status.in_(('queued', 'running')))
+        .where(func.coalesce(SyncJob.heartbeat_at, SyncJob.created_at) < cutoff)
+        .values(status='failed', finished_at=datetime.now(), message='Sync runner stopped responding')
+    )
+
+
+def get_active_job():
+    """Return the queued or running sync job, if any"""
+    from app import db
+    from models import SyncJob
+
+    _fail_stale_jobs(db, SyncJob)
+    db.session.commit()
+    return SyncJob.query.filter(SyncJob.status.in_(('queued', 'running'))).order_by(SyncJob.id).first()
+
+
+def enqueue_sync_job(full=False, spawn=True):
+    """Queue a GitHub sync and start its runner process
+
+    Returns (job, created). When a sync is already queued or running, that job
+    is returned instead of starting a second one. ``full`` refreshes every
+    repository instead of only the ones that changed since the last sync;
+    with ``spawn=False`` the caller is expected to call run_job itself.
+    """
+    from app import db
+    from models import SyncJob
+
+    active = get_active_job()
+    if active:
+        return active, False
+
+    job = SyncJob()
+    job.kind = 'github-full' if full else 'github'
+    job.heartbeat_at = datetime.now()
+    db.session.add(job)
+    db.session.commit()
+
+    if spawn:
+        _spawn_runner(job.id)
+    return job, True
+
+
+def _spawn_runner(job_id):
+    """Start the job in a detached Python process"""
+    script = os.path.abspath(__file__)
+    subprocess.Popen(
+        [sys.executable, script, str(job_id)],
+        cwd=os.path.dirname(script),
+        start_new_session=True,
+        stdin=subprocess.DEVNULL,
+    )
+    logger.info(f"Started sync runner for job {job_id}")
+
+
+def _claim_job(db, SyncJob, job_id):
+    """Atomically move a queued job to running if no other job is running"""
+    now = datetime.now()
+    other = SyncJob.__table__.alias('other')
+    result = db.session.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job_id, SyncJob.status == 'queued')
+        .where(~exists().where(and_(other.c.status == 'running', other.c.id != job_id)))
+        .values(status='running', started_at=now, heartbeat_at=now)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _finish_job(db, SyncJob, job_id, status, message, stats=None):
+    values = dict(stats or {}, status=status, message=message, finished_at=datetime.now())
+    db.session.execute(update(SyncJob).where(SyncJob.id == job_id).values(**values))
+    db.session.commit()
+
+
+def run_job(job_id):
+    """Run a queued sync job, recording progress on its row"""
+    from app import app, db
+    from models import SyncJob
+    from github_sync import sync_github_projects
+
+    with app.app_context():
+        _fail_stale_jobs(db, SyncJob)
+        db.session.commit()
+
+        if not _claim_job(db, SyncJob, job_id):
+            _finish_job(db, SyncJob, job_id, 'skipped', 'Another sync is already running')
+            logger.info(f"Sync job {job_id} skipped, another job is running")
+            return
+
+        def report(stats):
+            db.session.execute(
+                update(SyncJob).where(SyncJob.id == job_id)
+                .values(heartbeat_at=datetime.now(), **stats)
+            )
+            db.session.commit()
+
+        engine = db.engine
+
+        def beat():
+            # Own connection: the session may be halfway through a page, and
+            # this can run on the prefetch thread
+            with engine.begin() as connection:
+                connection.execute(
+                    update(SyncJob).where(SyncJob.id == job_id).values(heartbeat_at=datetime.now())
+                )
+
+        full = db.session.get(SyncJob, job_id).kind == 'github-full'
+        started = time.perf_counter()
+        try:
+            result = sync_github_projects(progress=report, full=full, heartbeat=beat)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Sync job {job_id} crashed")
+            _finish_job(db, SyncJob, job_id, 'failed', str(e))
+            metrics.observe('job_duration_seconds', time.perf_counter() - started, job='github_sync', status='failed')
+            return
+
+        stats = {key: result[key] for key in ('processed', 'failed') if key in result}
+        stats['inserted'] = result.get('synced', 0)
+        stats['updated'] = result.get('updated', 0)
+        status = 'succeeded' if result['success'] else 'failed'
+        _finish_job(db, SyncJob, job_id, status, result['message'], stats)
+        metrics.observe('job_duration_seconds', time.perf_counter() - started, job='github_sync', status=status)
+        logger.info(f"Sync job {job_id} {status}: {result['message']}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or not sys.argv[1].isdigit():
+        sys.exit('usage: python sync_jobs.py <job_id>')
+    run_job(int(sys.argv[1]))
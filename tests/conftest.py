@@ -0,0 +1,79 @@
+"""
+Shared pytest fixtures
+The app is pointed at a scratch database before it is first imported (see
+benchmarks/_common.scratch_environment), so tests never touch instance/.
+
+    pip install pytest && python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+sys.path.insert(0, BENCHMARKS)
+
+from _common import scratch_environment, quiet_logging, StatementCounter  # noqa: E402
+
+scratch_environment(tempfile.mkdtemp(prefix='portfolio-tests-'), METRICS_ENABLED='0')
+quiet_logging()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    import routes  # noqa: F401
+    import api  # noqa: F401
+    import suggest  # noqa: F401
+
+    return flask_app
+
+
+@pytest.fixture
+def statement_counter(app):
+    """StatementCounter on the app's engine for the duration of a test"""
+    from app import db
+
+    with app.app_context():
+        engine = db.engine
+    counter = StatementCounter(engine)
+    yield counter
+    counter.close()
+
+
+@pytest.fixture
+def assert_max_queries(statement_counter):
+    """Context manager failing the test when the block runs more than ``n``
+    SQL statements; the failure lists the statements
+
+        with assert_max_queries(3):
+            client.get('/projects')
+    """
+    @contextmanager
+    def check(n):
+        statement_counter.reset()
+        yield statement_counter
+        count = statement_counter.count
+        statements = '\n'.join('    ' + ' '.join(s.split())[:160] for s in statement_counter.statements)
+        assert count <= n, f'{count} SQL statements, budget {n}:\n{statements}'
+    return check
+
+
+@pytest.fixture(scope='module')
+def content(app):
+    """The small query-budget dataset (benchmarks/seed_data.py), seeded into
+    fresh tables for each test module that asks for it"""
+    from app import db
+    from content_version import ensure_content_version
+    from query_budgets import BASE_SCALE
+    from seed_data import seed
+    import facets
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        ensure_content_version(db)
+        seed(db, **BASE_SCALE, verbose=False)
+    facets.cache.clear()
@@ -0,0 +1,132 @@
+"""
+JSON API (api.py): keyset paging, parameter validation, conditional
+requests and sparse fieldsets.
+"""
+import json
+import base64
+from datetime import datetime, date
+
+import pytest
+
+LISTS = {
+    'projects': '/api/v1/projects',
+    'achievements': '/api/v1/achievements',
+}
+
+
+@pytest.fixture(scope='module')
+def tied(app, content):
+    """Give most rows the same sort key, so pages have to break ties on id"""
+    from app import db
+    from models import Project, Achievement
+
+    with app.app_context():
+        Project.query.filter(Project.id % 3 != 0).update({'created_at': datetime(2025, 1, 1, 12, 0, 0, 123456)},
+                                                         synchronize_session=False)
+        Achievement.query.filter(Achievement.id % 2 == 0).update({'date_achieved': date(2025, 1, 1)},
+                                                                 synchronize_session=False)
+        db.session.commit()
+        return {
+            'projects': [project.id for project in Project.query.filter_by(is_published=True)
+                         .order_by(Project.created_at.desc(), Project.id.desc())],
+            'achievements': [achievement.id for achievement in Achievement.query.filter_by(is_published=True)
+                             .order_by(Achievement.date_achieved.desc(), Achievement.id.desc())],
+        }
+
+
+def cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('name', LISTS)
+@pytest.mark.parametrize('limit', [1, 7, 100])
+def test_pages_cover_every_row_once(app, tied, name, limit):
+    client = app.test_client()
+    ids, pages = [], 0
+    url = f'{LISTS[name]}?limit={limit}&fields=id'
+    while url:
+        body = client.get(url).get_json()
+        assert len(body['data']) <= limit
+        ids += [row['id'] for row in body['data']]
+        pages += 1
+        url = f"{LISTS[name]}?limit={limit}&fields=id&cursor={body['next_cursor']}" if body['next_cursor'] else None
+    assert ids == tied[name]
+    assert pages == max(1, -(-len(ids) // limit))
+
+
+def test_next_link_header_carries_the_cursor(app, tied):
+    response = app.test_client().get('/api/v1/projects?limit=5')
+    assert f"cursor={response.get_json()['next_cursor']}" in response.headers['Link']
+    assert response.headers['Link'].endswith('rel="next"')
+
+
+@pytest.mark.parametrize('query', [
+    'cursor=%21%21not-base64',
+    f'cursor={cursor([1])}',
+    f'cursor={cursor(["yesterday", 1])}',
+    f'cursor={cursor(["2025-01-01T00:00:00", "one"])}',
+    f'cursor={cursor({"id": 1})}',
+    'limit=0',
+    'limit=101',
+    'limit=-5',
+    'limit=abc',
+    'fields=id,password',
+])
+@pytest.mark.parametrize('name', LISTS)
+def test_bad_parameters_are_400(app, content, name, query):
+    response = app.test_client().get(f'{LISTS[name]}?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('path', ['/api/v1/projects?limit=5', '/api/v1/achievements', '/api/v1/projects/{project}'])
+def test_if_none_match_gets_304(app, content, path):
+    from models import Project
+
+    with app.app_context():
+        path = path.format(project=Project.query.filter_by(is_published=True).first().id)
+    client = app.test_client()
+    first = client.get(path)
+    etag = first.headers['ETag']
+
+    again = client.get(path, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert client.get(path, headers={'If-None-Match': '"something-else"'}).status_code == 200
+
+
+def test_etag_changes_with_the_rows(app, content):
+    from app import db
+    from models import Project
+
+    client = app.test_client()
+    etag = client.get('/api/v1/projects?limit=5').headers['ETag']
+    with app.app_context():
+        project = db.session.get(Project, client.get('/api/v1/projects?limit=1').get_json()['data'][0]['id'])
+        project.updated_at = datetime.now()
+        db.session.commit()
+    assert client.get('/api/v1/projects?limit=5', headers={'If-None-Match': etag}).status_code == 200
+
+
+@pytest.mark.parametrize('path, fields', [
+    ('/api/v1/projects?fields=id,title', {'id', 'title'}),
+    ('/api/v1/projects?fields=title,like_count', {'title', 'like_count'}),
+    ('/api/v1/achievements?fields=date_achieved', {'date_achieved'}),
+    ('/api/v1/projects/{project}?fields=id,technologies', {'id', 'technologies'}),
+])
+def test_sparse_fields(app, content, path, fields):
+    from models import Project
+
+    with app.app_context():
+        path = path.format(project=Project.query.filter_by(is_published=True).first().id)
+    body = app.test_client().get(path).get_json()
+    rows = body['data'] if 'data' in body else [body]
+    assert rows and all(set(row) == fields for row in rows)
+    if 'technologies' in fields:
+        assert all(isinstance(row['technologies'], list) for row in rows)
+
+
+def test_lists_leave_out_long_text_by_default(app, content):
+    row = app.test_client().get('/api/v1/projects?limit=1').get_json()['data'][0]
+    assert 'description' not in row and 'content' not in row
+    assert {'id', 'title', 'like_count', 'comment_count'} <= set(row)
@@ -0,0 +1,153 @@
+"""
+Comments: the denormalized projects.comment_count kept by the flush
+listeners in models.py, and the keyset-paginated comment thread.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, func
+
+
+def assert_counts_match():
+    """comment_count equals COUNT(*) of approved comments for every project"""
+    from app import db
+    from models import Project, Comment
+
+    approved = select(func.count(Comment.id)) \
+        .where(Comment.project_id == Project.id, Comment.is_approved.is_(True)).scalar_subquery()
+    mismatched = db.session.execute(
+        select(Project.id, Project.comment_count, approved).where(Project.comment_count != approved)
+    ).all()
+    assert mismatched == []
+
+
+def busiest_project():
+    from app import db
+    from models import Comment
+
+    return db.session.execute(select(Comment.project_id).group_by(Comment.project_id)
+                              .order_by(func.count().desc()).limit(1)).scalar()
+
+
+def new_comment(project_id, **values):
+    from models import Comment, User
+
+    return Comment(content='counted', project_id=project_id,
+                   user_id=User.query.filter(User.email.like('%@bench.local')).first().id, **values)
+
+
+def test_counter_follows_every_change(app, content):
+    from app import db
+    from models import Comment, Project
+
+    with app.app_context():
+        assert_counts_match()
+        project_id = busiest_project()
+        before = db.session.get(Project, project_id).comment_count
+
+        added = [new_comment(project_id) for _ in range(3)]
+        db.session.add_all(added + [new_comment(project_id, is_approved=False)])
+        db.session.commit()
+        assert_counts_match()
+        assert db.session.get(Project, project_id).comment_count == before + 3
+
+        added[0].is_approved = False
+        db.session.commit()
+        assert_counts_match()
+
+        added[0].is_approved = True
+        added[1].is_approved = False
+        db.session.commit()
+        assert_counts_match()
+
+        db.session.delete(added[2])
+        db.session.delete(Comment.query.filter_by(project_id=project_id, is_approved=False).first())
+        db.session.commit()
+        assert_counts_match()
+        assert db.session.get(Project, project_id).comment_count == before + 1
+
+        # Editing a comment's text leaves the counter alone
+        added[0].content = 'edited'
+        db.session.commit()
+        assert_counts_match()
+
+
+def test_counter_survives_a_project_cascade(app, content):
+    from app import db
+    from models import Project, Comment
+
+    with app.app_context():
+        project_id = busiest_project()
+        assert Comment.query.filter_by(project_id=project_id).count() > 0
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+        assert Comment.query.filter_by(project_id=project_id).count() == 0
+        assert_counts_match()
+
+
+@pytest.fixture(scope='module')
+def thread(app, content):
+    """A published project whose approved comments mostly share one timestamp"""
+    from app import db
+    from models import Comment, Project
+
+    with app.app_context():
+        project_id = db.session.execute(
+            select(Comment.project_id).join(Project).where(Project.is_published.is_(True))
+            .group_by(Comment.project_id).order_by(func.count().desc()).limit(1)).scalar()
+        Comment.query.filter(Comment.project_id == project_id, Comment.id % 3 != 0) \
+            .update({'created_at': datetime(2025, 1, 1, 9, 30)}, synchronize_session=False)
+        db.session.commit()
+        expected = [comment.id for comment in Comment.query.filter_by(project_id=project_id, is_approved=True)
+                    .order_by(Comment.created_at, Comment.id)]
+    return project_id, expected
+
+
+@pytest.mark.parametrize('limit', [1, 4, 50])
+def test_comment_pages_cover_the_thread_once(app, thread, limit):
+    from routes import comment_page
+
+    project_id, expected = thread
+    ids, cursor = [], None
+    with app.app_context():
+        while True:
+            comments, cursor = comment_page(project_id, cursor, limit=limit)
+            assert len(comments) <= limit
+            ids += [comment.id for comment in comments]
+            if cursor is None:
+                break
+    assert ids == expected
+
+
+def test_comments_route_pages_as_json(app, thread):
+    project_id, expected = thread
+    client = app.test_client()
+    ids, url = [], f'/project/{project_id}/comments?format=json'
+    while url:
+        body = client.get(url).get_json()
+        ids += [comment['id'] for comment in body['comments']]
+        url = f"/project/{project_id}/comments?format=json&after={body['next_cursor']}" if body['next_cursor'] else None
+    assert ids == expected
+
+
+def test_comments_route_html_fragment_has_next_cursor(app, thread):
+    from routes import COMMENTS_PAGE_SIZE
+
+    project_id, expected = thread
+    response = app.test_client().get(f'/project/{project_id}/comments')
+    assert response.status_code == 200
+    assert ('X-Next-Cursor' in response.headers) == (len(expected) > COMMENTS_PAGE_SIZE)
+
+
+@pytest.mark.parametrize('after', ['garbage', '2025-01-01T09:30:00_x', 'nounderscore'])
+def test_bad_comment_cursor_is_400(app, thread, after):
+    project_id, _ = thread
+    assert app.test_client().get(f'/project/{project_id}/comments?after={after}').status_code == 400
+
+
+def test_unpublished_project_comments_are_404(app, content):
+    from models import Project
+
+    with app.app_context():
+        project_id = Project.query.filter_by(is_published=False).first().id
+    assert app.test_client().get(f'/project/{project_id}/comments').status_code == 404
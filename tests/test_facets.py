@@ -0,0 +1,52 @@
+"""
+Facet counts on /projects (facets.py) against one plain COUNT per facet
+value, with the other filters applied as the listing applies them.
+"""
+import pytest
+
+CASES = [
+    (None, '', ''),
+    (1, '', ''),
+    (None, '', 'python'),
+    (2, '', 'Flask'),
+    (None, 'Java', ''),
+    (None, 'java', ''),
+    (None, 'lorem', 'sql'),
+    (3, 'Project 1', 'docker'),
+]
+
+
+def plain_counts(category_id, search, tech):
+    from models import Project, Category, Technology
+
+    def count(category, technology):
+        return Project.query.filter(Project.is_published.is_(True),
+                                    *Project.listing_filters(category, search, technology).values()).count()
+
+    categories = {category.id: count(category.id, tech) for category in Category.query}
+    technologies = [(technology.slug, technology.name, count(category_id, technology.slug))
+                    for technology in Technology.query]
+    technologies.sort(key=lambda item: (-item[2], item[0]))
+    return {'categories': {key: value for key, value in categories.items() if value},
+            'technologies': [item for item in technologies if item[2]]}
+
+
+@pytest.mark.parametrize('category_id, search, tech', CASES)
+def test_facet_counts_match_plain_counts(app, content, category_id, search, tech):
+    from facets import facet_counts
+
+    with app.app_context():
+        expected = plain_counts(category_id, search, tech)
+        assert facet_counts(category_id, search, tech) == expected
+        # Served from the cache the second time
+        assert facet_counts(category_id, search, tech) == expected
+
+
+def test_searches_differing_in_case_are_cached_apart(app, content):
+    import facets
+
+    with app.app_context():
+        facets.facet_counts(None, 'Java', '')
+        facets.facet_counts(None, 'java', '')
+    assert (None, 'Java', '') in facets.cache._entries
+    assert (None, 'java', '') in facets.cache._entries
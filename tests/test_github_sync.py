@@ -0,0 +1,55 @@
+"""
+GitHub sync against the fake API in benchmarks/fake_github.py
+A repository whose languages can't be fetched keeps its project and its
+watermark as they were, so the next incremental sync retries it.
+"""
+import pytest
+
+import github_http
+import github_sync
+from fake_github import FakeGitHub, make_languages
+
+OWNER = 'sync-test'
+
+
+@pytest.fixture
+def fake(app, monkeypatch):
+    fake = FakeGitHub(repo_count=12, owner=OWNER).serve()
+    monkeypatch.setattr(github_sync, 'GITHUB_API_URL', fake.base_url)
+    monkeypatch.setattr(github_http, 'MAX_RETRIES', 1)
+    monkeypatch.setattr(github_http, 'BACKOFF_BASE', 0.001)
+    yield fake
+    fake.shutdown()
+
+
+def technologies():
+    from models import Project
+
+    return {project.github_url: project.technologies
+            for project in Project.query.filter(Project.github_url.like(f'%/{OWNER}/%'))}
+
+
+def expected(fake):
+    return {repo['html_url']: ', '.join(list(make_languages(OWNER, repo['name'])) + repo['topics'])
+            for repo in fake.repos if not repo['fork']}
+
+
+def test_failed_languages_are_retried_on_the_next_sync(app, fake):
+    with app.app_context():
+        result = github_sync.sync_github_projects([OWNER])
+        assert result['success'] and result['failed'] == 0
+        assert technologies() == expected(fake)
+
+        fake.touch(3)
+        pushed = [repo for repo in fake.repos[:3] if not repo['fork']]
+        fake.error_rate, fake.error_endpoints = 1.0, {'languages'}
+        result = github_sync.sync_github_projects([OWNER])
+        assert result['failed'] == len(pushed)
+        assert technologies() == expected(fake)
+
+        fake.error_rate = 0.0
+        fake.reset_counters()
+        result = github_sync.sync_github_projects([OWNER])
+        assert result['failed'] == 0
+        assert fake.calls['languages'] == len(pushed)
+        assert technologies() == expected(fake)
@@ -0,0 +1,96 @@
+"""
+Host-wide password hashing slots (passwords.py)
+Logins that find every slot taken, by this process or another one on the
+host, get a 503 with Retry-After instead of waiting for a worker.
+"""
+import os
+import sys
+import time
+import threading
+import subprocess
+
+import pytest
+
+import passwords
+import ratelimit
+from passwords import HashPool, HostSlots
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL = 'hashing@example.com'
+PASSWORD = 'correct horse battery staple'
+
+
+@pytest.fixture(scope='module')
+def user(app):
+    from app import db
+    from models import User
+
+    with app.app_context():
+        User.query.filter_by(email=EMAIL).delete()
+        db.session.add(User.create_local_user(email=EMAIL, password=PASSWORD, wait=True))
+        db.session.commit()
+
+
+@pytest.fixture
+def slots(app, user, monkeypatch, tmp_path):
+    """Swap in a pool with ``count`` slots under ``tmp_path``"""
+    def use(count):
+        monkeypatch.setattr(passwords, 'pool', HashPool(workers=count, slots=HostSlots(str(tmp_path), count)))
+        return str(tmp_path)
+
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    monkeypatch.setattr(ratelimit, 'ENABLED', False)
+    return use
+
+
+def login(app):
+    return app.test_client().post('/login', data={'email': EMAIL, 'password': PASSWORD})
+
+
+def test_login_gets_503_while_another_process_holds_the_slots(app, slots):
+    directory = slots(1)
+    holder = subprocess.Popen(
+        [sys.executable, '-c',
+         'import sys; from passwords import HostSlots; '
+         f'HostSlots({directory!r}, 1).acquire(); print("held", flush=True); sys.stdin.read()'],
+        cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'held'
+        response = login(app)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        holder.communicate('')
+
+    assert login(app).status_code == 302
+
+
+def test_concurrent_logins_past_the_slots_get_503(app, slots, monkeypatch):
+    slots(2)
+    check = passwords.check_password_hash
+    entered = threading.Semaphore(0)
+    release = threading.Event()
+
+    def slow_check(password_hash, password):
+        entered.release()
+        release.wait(10)
+        return check(password_hash, password)
+
+    monkeypatch.setattr(passwords, 'check_password_hash', slow_check)
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(login(app).status_code)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+
+    # Two logins hash, the other three are turned away without waiting
+    for _ in range(2):
+        assert entered.acquire(timeout=10)
+    deadline = time.monotonic() + 10
+    while len(statuses) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert statuses == [503, 503, 503]
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert sorted(statuses) == [302, 302, 503, 503, 503]
@@ -0,0 +1,34 @@
+"""
+SQL statement budgets per route (table in benchmarks/query_budgets.py)
+Every route runs against a small dataset and one ten times bigger; a page
+that runs more statements on the bigger one (an N+1) goes over its budget.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from query_budgets import BASE_SCALE, BUDGETS, prepare, clients
+
+FACTOR = 10
+
+
+@pytest.fixture(scope='module', params=[1, FACTOR], ids=['n', f'{FACTOR}n'])
+def seeded(request, app):
+    from app import db
+
+    scale = {name: value * request.param for name, value in BASE_SCALE.items()}
+    scale['categories'] = BASE_SCALE['categories']
+    with app.app_context():
+        project_id, user_ids = prepare(app, db, scale)
+    return SimpleNamespace(project_id=project_id, clients=clients(app, user_ids))
+
+
+@pytest.mark.parametrize('url, who, budget', BUDGETS, ids=[f'{who}:{url}' for url, who, _ in BUDGETS])
+def test_query_budget(seeded, assert_max_queries, url, who, budget):
+    client = seeded.clients[who]
+    path = url.format(project=seeded.project_id)
+    client.get(path)  # warm up: first render of a template may query
+
+    with assert_max_queries(budget):
+        response = client.get(path)
+    assert response.status_code == 200
@@ -0,0 +1,83 @@
+"""
+Token-bucket rate limits (ratelimit.py)
+A request takes a token from every bucket that applies or from none,
+refusals are 429 with Retry-After, and X-Forwarded-For only picks the
+client address when TRUSTED_PROXIES says a proxy is in front.
+"""
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import ratelimit
+from ratelimit import MemoryStore, SQLiteStore, parse_limit
+from query_budgets import USER_EMAIL
+
+
+@pytest.fixture
+def limiter(app, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'store', MemoryStore())
+    monkeypatch.setattr(ratelimit, 'ENABLED', True)
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    return ratelimit.store
+
+
+def login(client, **headers):
+    return client.post('/login', data={'email': 'nobody@example.com', 'password': 'wrong'}, headers=headers)
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_buckets_are_charged_all_or_none(kind, tmp_path):
+    store = MemoryStore() if kind == 'memory' else SQLiteStore(str(tmp_path / 'ratelimit.db'))
+    user = ('comment:user:1', *parse_limit('5/minute'))
+    ip = ('comment:ip:10.0.0.1', *parse_limit('2/minute'))
+
+    assert [store.consume([user, ip])[0] for _ in range(4)] == [True, True, False, False]
+    # Only the two allowed requests were charged to the user
+    assert [store.consume([user])[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_refused_comment_leaves_the_user_bucket_alone(app, content, limiter):
+    from models import Project, User
+    from query_budgets import clients
+
+    with app.app_context():
+        user_id = User.query.filter_by(email=USER_EMAIL).one().id
+        project_id = Project.query.filter_by(is_published=True).first().id
+    client = clients(app, {'user': user_id})['user']
+    url = f'/project/{project_id}/comment'
+
+    # Someone else on 10.0.0.1 used up the address's budget
+    while limiter.consume([('comment:ip:10.0.0.1', *parse_limit('20/minute'))])[0]:
+        pass
+    for _ in range(3):
+        response = client.post(url, data={'content': 'hi'}, environ_base={'REMOTE_ADDR': '10.0.0.1'})
+        assert response.status_code == 429
+
+    statuses = [client.post(url, data={'content': 'hi'}, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code
+                for _ in range(6)]
+    assert statuses == [302] * 5 + [429]
+
+
+def test_refusal_is_429_with_retry_after(app, limiter):
+    client = app.test_client()
+    assert [login(client).status_code for _ in range(10)] == [200] * 10
+
+    response = login(client)
+    assert response.status_code == 429
+    # 10/minute refills a token every 6 seconds
+    assert 1 <= int(response.headers['Retry-After']) <= 6
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(app, limiter):
+    import app as app_module
+
+    assert app_module.TRUSTED_PROXIES == 0
+    client = app.test_client()
+    statuses = [login(client, **{'X-Forwarded-For': f'203.0.113.{i}'}).status_code for i in range(11)]
+    assert statuses == [200] * 10 + [429]
+
+
+def test_forwarded_for_is_used_behind_a_trusted_proxy(app, limiter, monkeypatch):
+    monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app.app, x_for=1, x_proto=1, x_host=1))
+    client = app.test_client()
+    statuses = [login(client, **{'X-Forwarded-For': f'203.0.113.{i}'}).status_code for i in range(11)]
+    assert statuses == [200] * 11
@@ -0,0 +1,139 @@
+"""
+Related projects (related.py): after each kind of edit, the lists that
+update_related() maintains incrementally equal a full rebuild_related().
+"""
+from sqlalchemy import select
+
+
+def stored():
+    from app import db
+    from models import RelatedProject
+
+    return db.session.execute(select(RelatedProject.project_id, RelatedProject.rank, RelatedProject.related_id,
+                                     RelatedProject.score)
+                              .order_by(RelatedProject.project_id, RelatedProject.rank)).all()
+
+
+def assert_matches_rebuild():
+    from related import rebuild_related
+
+    incremental = stored()
+    rebuild_related()
+    assert incremental == stored()
+
+
+def save(project):
+    """What the admin views do after editing ``project``"""
+    from app import db
+    from models import Project
+    from related import update_related
+
+    db.session.flush()
+    Project.sync_technologies([project.id])
+    update_related([project.id])
+    db.session.commit()
+
+
+def published(offset):
+    from models import Project
+
+    return Project.query.filter_by(is_published=True).order_by(Project.id).offset(offset).first()
+
+
+def test_retag(app, content):
+    with app.app_context():
+        project = published(0)
+        project.technologies = 'Python, Rust, Go'
+        save(project)
+        assert_matches_rebuild()
+
+
+def test_retag_to_nothing_in_common(app, content):
+    with app.app_context():
+        project = published(1)
+        project.technologies = 'Cobol'
+        project.category_id = None
+        save(project)
+        assert_matches_rebuild()
+
+
+def test_move_category(app, content):
+    from models import Category
+
+    with app.app_context():
+        project = published(2)
+        project.category_id = Category.query.filter(Category.id != project.category_id).first().id
+        save(project)
+        assert_matches_rebuild()
+
+
+def test_unpublish_and_publish(app, content):
+    with app.app_context():
+        project = published(3)
+        project.is_published = False
+        save(project)
+        assert_matches_rebuild()
+
+        project.is_published = True
+        save(project)
+        assert_matches_rebuild()
+
+
+def test_new_project(app, content):
+    from app import db
+    from models import Project
+
+    with app.app_context():
+        project = Project(title='New', description='New project', technologies='Python, Flask, SQL',
+                          category_id=1, is_published=True)
+        db.session.add(project)
+        save(project)
+        assert_matches_rebuild()
+
+
+def test_delete(app, content):
+    from app import db
+    from related import update_related
+
+    with app.app_context():
+        project = published(4)
+        project_id = project.id
+        db.session.delete(project)
+        db.session.flush()
+        update_related([project_id])
+        db.session.commit()
+        assert_matches_rebuild()
+
+
+def test_bulk_retag(app, content):
+    from models import Project
+    from related import update_related
+    from app import db
+
+    with app.app_context():
+        projects = Project.query.order_by(Project.id.desc()).limit(8).all()
+        for index, project in enumerate(projects):
+            project.technologies = ['Python', 'Go, Rust', 'HTML, CSS', 'Java'][index % 4]
+        db.session.flush()
+        Project.sync_technologies([project.id for project in projects])
+        update_related([project.id for project in projects])
+        db.session.commit()
+        assert_matches_rebuild()
+
+
+def test_partial_catalog_holds_the_neighbourhood_only(app, content):
+    from models import Project
+    from related import Catalog
+
+    with app.app_context():
+        full = Catalog.load()
+        project = published(5)
+        partial = Catalog.load(around=[project.id])
+        assert set(partial.categories) == full.candidates(project.id) | {project.id}
+        assert partial.neighbors(project.id) == full.neighbors(project.id)
+
+        project.technologies = 'Fortran'
+        project.category_id = None
+        save(project)
+        assert set(Catalog.load(around=[project.id]).categories) == {project.id}
+        assert Project.query.filter_by(is_published=True).count() > 1
@@ -0,0 +1,102 @@
+"""
+On-disk GitHub response cache (github_http.ResponseCache): ETag
+revalidation, one entry per credential, LRU eviction.
+"""
+import os
+import json
+import time
+
+import pytest
+
+from github_http import ResponseCache, CachedResponse
+
+URL = 'https://api.github.com/users/someone/repos'
+
+
+class FakeServer:
+    """``fetch`` for ResponseCache.get: 304 when the ETag matches, otherwise
+    a 200 whose body names the credentials it was served to"""
+
+    def __init__(self):
+        self.requests = []
+        self.status = None
+
+    def __call__(self, url, headers=None, timeout=10, endpoint=None):
+        self.requests.append(dict(headers or {}))
+        if self.status:
+            return CachedResponse(self.status, '{"message": "error"}')
+        body = f'{{"for": "{(headers or {}).get("Authorization", "anonymous")}", "url": "{url}"}}'
+        etag = f'"{abs(hash(body))}"'
+        if (headers or {}).get('If-None-Match') == etag:
+            return CachedResponse(304, '', {'ETag': etag})
+        return CachedResponse(200, body, {'ETag': etag})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(directory=str(tmp_path / 'cache'))
+
+
+def auth(token):
+    return {'Authorization': f'Bearer {token}', 'Accept': 'application/vnd.github.v3+json'}
+
+
+def test_revalidates_with_etag_and_serves_the_body_on_304(cache):
+    server = FakeServer()
+    first = cache.get(URL, headers=auth('a'), fetch=server)
+    assert first.status_code == 200 and not first.from_cache
+    assert 'If-None-Match' not in server.requests[0]
+
+    second = cache.get(URL, headers=auth('a'), fetch=server)
+    assert server.requests[1]['If-None-Match'] == first.headers['ETag']
+    assert second.status_code == 200 and second.from_cache
+    assert second.json() == first.json()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_responses_are_kept_per_credential(cache, tmp_path):
+    server = FakeServer()
+    cache.get(URL, headers=auth('token-a'), fetch=server)
+
+    other = cache.get(URL, headers=auth('token-b'), fetch=server)
+    # No conditional request on B's behalf with A's ETag, and B gets its own body
+    assert 'If-None-Match' not in server.requests[1]
+    assert other.json()['for'] == 'Bearer token-b'
+    anonymous = cache.get(URL, fetch=server)
+    assert anonymous.json()['for'] == 'anonymous'
+
+    assert cache.get(URL, headers=auth('token-a'), fetch=server).json()['for'] == 'Bearer token-a'
+    # Only hashes of the credentials reach the disk (the fake bodies echo them)
+    for name in os.listdir(tmp_path / 'cache'):
+        with open(tmp_path / 'cache' / name, encoding='utf-8') as f:
+            entry = json.load(f)
+        assert 'token' not in name and 'token' not in json.dumps(entry['headers'])
+
+
+def test_errors_are_not_cached(cache):
+    server = FakeServer()
+    server.status = 502
+    assert cache.get(URL, fetch=server).status_code == 502
+    server.status = None
+    cache.get(URL, fetch=server)
+    assert 'If-None-Match' not in server.requests[1]
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    server = FakeServer()
+    urls = [f'{URL}?page={page}' for page in range(4)]
+    paths = []
+    for url in urls[:3]:
+        cache.get(url, fetch=server)
+        paths.append(cache._path(cache._key(url, {})))
+    size = os.path.getsize(paths[0])
+    cache.max_bytes = int(size * 3.5)
+    now = time.time()
+    for age, path in zip((30, 20, 10), paths):
+        os.utime(path, (now - age, now - age))
+
+    cache.get(urls[0], fetch=server)  # page 0 is used again, page 1 is now the oldest
+    cache.get(urls[3], fetch=server)
+
+    assert [os.path.exists(path) for path in paths] == [True, False, True]
+    assert os.path.exists(cache._path(cache._key(urls[3], {})))
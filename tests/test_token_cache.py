@@ -0,0 +1,91 @@
+"""
+Connector token cache (token_cache.TokenCache): reuse until the refresh
+margin, one refresh across workers under the flock, fallbacks when the
+connector fails.
+"""
+import os
+import time
+import threading
+
+from token_cache import TokenCache
+
+
+class Connector:
+    """``fetch`` returning numbered tokens valid for ``ttl`` seconds"""
+
+    def __init__(self, ttl=3600, delay=0.0):
+        self.ttl = ttl
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.fail:
+            return None, None
+        return f'token-{calls}', time.time() + self.ttl
+
+
+def test_token_is_reused_until_the_margin(tmp_path):
+    connector = Connector(ttl=3600)
+    cache = TokenCache(str(tmp_path / 'token.json'), connector, refresh_margin=300)
+    assert [cache.get() for _ in range(3)] == ['token-1'] * 3
+    assert connector.calls == 1
+
+
+def test_token_inside_the_margin_is_refreshed(tmp_path):
+    connector = Connector(ttl=200)  # already inside the 300s margin when issued
+    cache = TokenCache(str(tmp_path / 'token.json'), connector, refresh_margin=300)
+    assert cache.get() == 'token-1'
+    assert cache.get() == 'token-2'
+    assert connector.calls == 2
+
+
+def test_workers_share_the_token_through_the_file(tmp_path):
+    path = str(tmp_path / 'token.json')
+    first, second = Connector(), Connector()
+    assert TokenCache(path, first).get() == 'token-1'
+    assert TokenCache(path, second).get() == 'token-1'
+    assert second.calls == 0
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_concurrent_refresh_fetches_once(tmp_path):
+    # Separate caches stand in for workers: only the flock keeps them apart
+    path = str(tmp_path / 'token.json')
+    connector = Connector(delay=0.2)
+    caches = [TokenCache(path, connector) for _ in range(8)]
+    start = threading.Barrier(len(caches))
+    tokens = []
+
+    def run(cache):
+        start.wait()
+        tokens.append(cache.get())
+
+    threads = [threading.Thread(target=run, args=(cache,)) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert connector.calls == 1
+    assert tokens == ['token-1'] * len(caches)
+
+
+def test_old_token_is_kept_while_valid_when_the_connector_fails(tmp_path):
+    connector = Connector(ttl=200)
+    cache = TokenCache(str(tmp_path / 'token.json'), connector, refresh_margin=300)
+    assert cache.get() == 'token-1'
+    connector.fail = True
+    assert cache.get() == 'token-1'
+
+
+def test_no_token_once_expired_and_the_connector_fails(tmp_path):
+    connector = Connector(ttl=-1)
+    cache = TokenCache(str(tmp_path / 'token.json'), connector, refresh_margin=0)
+    assert cache.get() == 'token-1'
+    connector.fail = True
+    assert cache.get() is None
@@ -0,0 +1,111 @@
+"""
+Access token cache shared by threads and gunicorn workers
+The token lives in a small JSON file guarded by an exclusive flock, so one
+worker refreshes it while the others wait and then reuse the result.
+"""
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; fall back to per-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Refresh this many seconds before the token actually expires
+REFRESH_MARGIN = int(os.environ.get('GITHUB_TOKEN_REFRESH_MARGIN', 300))
+# Lifetime assumed for tokens the connector returns without expires_at
+DEFAULT_TTL = int(os.environ.get('GITHUB_TOKEN_DEFAULT_TTL', 600))
+
+
+class TokenCache:
+    """Caches the token returned by ``fetch`` until shortly before it expires
+
+    ``fetch`` returns ``(token, expires_at)`` with ``expires_at`` as a Unix
+    timestamp or None, or ``(None, None)`` when no token is available.
+    """
+
+    def __init__(self, path, fetch, refresh_margin=REFRESH_MARGIN, default_ttl=DEFAULT_TTL):
+        self.path = path
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    def _fresh(self, expires_at):
+        return expires_at - self.refresh_margin > time.time()
+
+    def _read_file(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry.get('token'), float(entry.get('expires_at', 0))
+        except (OSError, ValueError):
+            return None, 0.0
+
+    def _write_file(self, token, expires_at):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'token': token, 'expires_at': expires_at}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist access token cache: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def get(self):
+        """Return a valid token, refreshing it at most once across workers"""
+        if self._token and self._fresh(self._expires_at):
+            return self._token
+
+        # Threads in this worker queue here and reuse the refreshed token
+        with self._lock:
+            if self._token and self._fresh(self._expires_at):
+                return self._token
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + '.lock', 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Another worker may have refreshed while we waited for the lock
+                    token, expires_at = self._read_file()
+                    if token and self._fresh(expires_at):
+                        self._token, self._expires_at = token, expires_at
+                        return token
+
+                    new_token, new_expires_at = self.fetch()
+                    if not new_token:
+                        # Keep using the old token while it is still valid
+                        if token and expires_at > time.time():
+                            return token
+                        return None
+
+                    new_expires_at = new_expires_at or time.time() + self.default_ttl
+                    self._write_file(new_token, new_expires_at)
+                    self._token, self._expires_at = new_token, new_expires_at
+                    return new_token
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def clear(self):
+        with self._lock:
+            self._token, self._expires_at = None, 0.0
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -53,6 +53,7 @@ translations = {
         'technologies_used': 'Technologies Used',
         'project_details': 'Details',
         'project_overview': 'Project Overview',
+        'related_projects': 'Related Projects',
         'add_comment': 'Add Comment',
         'share_linkedin': 'Share on LinkedIn',
         'share_twitter': 'Twitter',
@@ -61,6 +62,7 @@ translations = {
         'search': 'Search',
         'search_placeholder': 'Search projects...',
         'category': 'Category',
+        'technology': 'Technology',
         'all_categories': 'All Categories',
         'filter': 'Filter',
         'clear': 'Clear',
@@ -81,6 +83,7 @@ translations = {
         'post_comment': 'Post Comment',
         'login_to_comment': 'Login to leave a comment and interact with projects.',
         'no_comments': 'No comments yet. Be the first to share your thoughts!',
+        'load_more_comments': 'Load more comments',
         'share_thoughts': 'Share your thoughts about this project...',
         
         # Certifications
@@ -147,6 +150,7 @@ translations = {
         'add_category': 'Add Category',
         'sync_github': 'Sync GitHub',
         'syncing': 'Syncing...',
+        'slow_queries': 'Slow Queries',
         
         # Messages
         'login_success': 'Login successful!',
@@ -178,6 +182,10 @@ translations = {
         'error_403_text': 'You don\'t have permission to access this resource. This area is restricted to authorized users only.',
         'error_404': 'Page Not Found',
         'error_404_text': 'Sorry, the page you are looking for doesn\'t exist or has been moved.',
+        'error_429': 'Too Many Requests',
+        'error_429_text': 'You are doing that too often. Please wait a moment and try again.',
+        'error_503': 'Service Busy',
+        'error_503_text': 'The server is handling too many requests right now. Please try again in a moment.',
         'error_500': 'Internal Server Error',
         'error_500_text': 'Something went wrong on our end. We\'re working to fix the issue.',
         'go_home': 'Go Home',
@@ -255,6 +263,7 @@ translations = {
         'technologies_used': 'Tecnologias Utilizadas',
         'project_details': 'Detalhes',
         'project_overview': 'Visão Geral do Projeto',
+        'related_projects': 'Projetos Relacionados',
         'add_comment': 'Adicionar Comentário',
         'share_linkedin': 'Compartilhar no LinkedIn',
         'share_twitter': 'Twitter',
@@ -263,6 +272,7 @@ translations = {
         'search': 'Pesquisar',
         'search_placeholder': 'Pesquisar projetos...',
         'category': 'Categoria',
+        'technology': 'Tecnologia',
         'all_categories': 'Todas as Categorias',
         'filter': 'Filtrar',
         'clear': 'Limpar',
@@ -283,6 +293,7 @@ translations = {
         'post_comment': 'Postar Comentário',
         'login_to_comment': 'Faça login para deixar um comentário e interagir com os projetos.',
         'no_comments': 'Nenhum comentário ainda. Seja o primeiro a compartilhar seus pensamentos!',
+        'load_more_comments': 'Carregar mais comentários',
         'share_thoughts': 'Compartilhe seus pensamentos sobre este projeto...',
         
         # Certifications
@@ -349,6 +360,7 @@ translations = {
         'add_category': 'Adicionar Categoria',
         'sync_github': 'Sincronizar GitHub',
         'syncing': 'Sincronizando...',
+        'slow_queries': 'Consultas Lentas',
         
         # Messages
         'login_success': 'Login realizado com sucesso!',
@@ -380,6 +392,10 @@ translations = {
         'error_403_text': 'Você não tem permissão para acessar este recurso. Esta área é restrita apenas a usuários autorizados.',
         'error_404': 'Página Não Encontrada',
         'error_404_text': 'Desculpe, a página que você está procurando não existe ou foi movida.',
+        'error_429': 'Muitas Requisições',
+        'error_429_text': 'Você está fazendo isso com muita frequência. Aguarde um momento e tente novamente.',
+        'error_503': 'Serviço Ocupado',
+        'error_503_text': 'O servidor está atendendo muitas requisições no momento. Tente novamente em instantes.',
         'error_500': 'Erro Interno do Servidor',
         'error_500_text': 'Algo deu errado do nosso lado. Estamos trabalhando para corrigir o problema.',
         'go_home': 'Ir para Início',
@@ -1,9 +1,12 @@
 import os
+import time
 import uuid
 from PIL import Image
 from werkzeug.utils import secure_filename
 from flask import current_app
 
+import metrics
+
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 def allowed_file(filename):
@@ -25,6 +28,7 @@ def save_uploaded_file(file, folder='uploads'):
         file_path = os.path.join(upload_path, filename)
         
         # Save and optimize image
+        started = time.perf_counter()
         try:
             image = Image.open(file.stream)
             
@@ -41,11 +45,13 @@ def save_uploaded_file(file, folder='uploads'):
             
             # Save with optimization
             image.save(file_path, optimize=True, quality=85)
+            metrics.observe('job_duration_seconds', time.perf_counter() - started, job='upload', status='succeeded')
             
             # Return relative path for database storage
             return f"{folder}/{filename}"
             
         except Exception as e:
+            metrics.observe('job_duration_seconds', time.perf_counter() - started, job='upload', status='failed')
             print(f"Error saving image: {e}")
             return None
     